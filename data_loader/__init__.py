@@ -3,6 +3,13 @@ Data loaders for T1D datasets (AZT1D, OhioT1DM, OpenAPS, DiaData).
 Falls back to synthetic data when no external data is available.
 """
 
+from .events import EventStore
 from .load_simdata import load_simdata, load_training_data
+from .profile import Profile
+from .resample import resample_series
+from .series import GlucoseSeries
+from .store import CGMStore
+from .timeindex import TimeIndex
 
-__all__ = ['load_simdata', 'load_training_data']
+__all__ = ['load_simdata', 'load_training_data', 'Profile', 'EventStore', 'GlucoseSeries', 'CGMStore',
+           'resample_series', 'TimeIndex']
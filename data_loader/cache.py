@@ -0,0 +1,97 @@
+"""
+On-disk cache of parsed datasets.
+
+Parsing a dataset's CSV/XML (or even glucose.json) on every run is the
+slow part of loading. The parsed GlucoseSeries and training pairs are saved
+as one uncompressed .npz under data/cache/, named after a fingerprint of
+the source files (path, size, mtime) and the loader's version. A repeat
+run memory-loads the arrays; a changed file or a loader change gives a new
+fingerprint, so the data is re-parsed and the stale entry replaced.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .series import GlucoseSeries
+
+KEY_LENGTH = 16
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+
+
+def fingerprint(paths, version=None):
+    """Hex digest of each file's absolute path, size and mtime plus the loader version."""
+    digest = hashlib.sha1(b'' if version is None else f'v{version}'.encode())
+    for path in sorted(os.path.abspath(p) for p in paths):
+        st = os.stat(path)
+        digest.update(f'\0{path}\0{st.st_size}\0{st.st_mtime_ns}'.encode())
+    return digest.hexdigest()[:KEY_LENGTH]
+
+
+def pair_array(training_pairs):
+    """(glucose, insulin) pairs, from a list of tuples or an array, as an (n, 2) float64 array."""
+    return np.asarray(training_pairs if training_pairs is not None else [], dtype=np.float64).reshape(-1, 2)
+
+
+def cache_path(name, paths, version, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, f'{name}-{fingerprint(paths, version)}.npz')
+
+
+def save(path, glucose_data, training_pairs=None, profile=None):
+    """Write one cache entry atomically and drop older entries of the same name."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    arrays = glucose_data.arrays()
+    arrays['training_pairs'] = pair_array(training_pairs)
+    arrays['profile'] = np.array(json.dumps(profile if profile is not None else {}))
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    name = os.path.basename(path).rsplit('-', 1)[0]
+    for stale in glob.glob(os.path.join(directory, f'{name}-{"?" * KEY_LENGTH}.npz')):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def load(path):
+    """
+    Read a cache entry.
+
+    Returns:
+        (GlucoseSeries, (n, 2) float64 training pairs, profile dict), or
+        None if there is no entry at path
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as archive:
+        glucose_data = GlucoseSeries.from_arrays(archive)
+        pairs = archive['training_pairs']
+        profile = json.loads(archive['profile'].item())
+    return glucose_data, pairs, profile
+
+
+def cached(name, paths, version, parse, cache_dir=None):
+    """
+    parse()'s (glucose_data, training_pairs, profile), from the cache when
+    the files at paths and version are unchanged since it was stored.
+    Either way glucose_data is a GlucoseSeries and training_pairs an
+    (n, 2) float64 array.
+    """
+    path = cache_path(name, paths, version, cache_dir)
+    entry = load(path)
+    if entry is not None:
+        return entry
+    glucose_data, training_pairs, profile = parse()
+    if not isinstance(glucose_data, GlucoseSeries):
+        glucose_data = GlucoseSeries.from_records(glucose_data)
+    training_pairs = pair_array(training_pairs)
+    try:
+        save(path, glucose_data, training_pairs, profile)
+    except OSError:
+        pass  # read-only checkout: just parse every time
+    return glucose_data, training_pairs, profile
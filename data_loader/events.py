@@ -0,0 +1,201 @@
+"""
+Columnar event store for OhioT1DM channels.
+
+One parse of a subject's XML fills a Channel per element type (glucose_level,
+finger_stick, basal, temp_basal, bolus, meal, exercise, sleep, ...). A
+channel holds its start times as a sorted int64 ms array and one array per
+attribute: other ts* attributes become int64 ms, numbers float64 and text
+int32 codes into an interned label table. Time-range queries are two binary
+searches and return views.
+"""
+
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .timeutil import iso, parse_timestamp
+
+TIME_FORMATS = ('%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M')
+MISSING_TIME = -1
+MISSING_CODE = -1
+
+
+def _parse_ts(ts_str):
+    """Parse OhioT1DM timestamp ('DD-MM-YYYY HH:MM:SS', or ISO) to ms, or None."""
+    return parse_timestamp(ts_str, TIME_FORMATS)
+
+
+def iter_events(path, patient=None):
+    """
+    Stream (channel, attributes) for every <event> in an OhioT1DM file,
+    where channel is the enclosing element's tag (glucose_level, bolus,
+    meal, ...). Elements are cleared once read, so memory stays flat.
+    The root element's attributes are copied into `patient` if given.
+    """
+    channel = None
+    root = None
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+                if patient is not None:
+                    patient.update(elem.attrib)
+            elif channel is None and elem.tag != 'event':
+                channel = elem.tag
+            continue
+        if elem.tag == 'event':
+            yield channel or root.tag, dict(elem.attrib)
+            elem.clear()
+        elif elem.tag == channel:
+            channel = None
+            root.clear()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class Channel(object):
+    """
+    Events of one type as columns.
+
+    Args:
+        name: Channel (element) name
+        time: (n,) int64 epoch ms start times, sorted
+        columns: Dict of attribute name -> (n,) array
+        labels: Dict of text attribute name -> list of labels for its codes
+    """
+
+    def __init__(self, name, time=None, columns=None, labels=None):
+        self.name = name
+        self.time = np.zeros(0, dtype=np.int64) if time is None else time
+        self.columns = columns or {}
+        self.labels = labels or {}
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, column):
+        if column == 'time':
+            return self.time
+        return self.columns[column]
+
+    def __contains__(self, column):
+        return column == 'time' or column in self.columns
+
+    def text(self, column):
+        """A text column decoded back to strings (None where missing)."""
+        table = self.labels[column]
+        return [table[code] if code >= 0 else None for code in self.columns[column].tolist()]
+
+    def between(self, start_ms, end_ms):
+        """Events with start_ms <= time < end_ms, as a channel of views."""
+        lo, hi = np.searchsorted(self.time, [start_ms, end_ms])
+        return Channel(self.name, self.time[lo:hi],
+                       {k: v[lo:hi] for k, v in self.columns.items()}, self.labels)
+
+
+class _ChannelBuilder(object):
+    """Collects one channel's attributes row by row during the parse."""
+
+    def __init__(self, name):
+        self.name = name
+        self.n = 0
+        self.values = {}
+
+    def add(self, attrib):
+        for key, value in attrib.items():
+            if key not in self.values:
+                self.values[key] = [None] * self.n
+            self.values[key].append(value)
+        self.n += 1
+        for column in self.values.values():
+            if len(column) < self.n:
+                column.append(None)
+
+    def build(self):
+        time_key = 'ts' if 'ts' in self.values else 'ts_begin'
+        columns, labels = {}, {}
+        for key, raw in self.values.items():
+            if key.startswith('ts'):
+                parsed = [_parse_ts(v) if v else None for v in raw]
+                columns[key] = np.array([MISSING_TIME if t is None else t for t in parsed], dtype=np.int64)
+                continue
+            numbers = [_to_float(v) for v in raw]
+            if all(x is not None or v in (None, '') for x, v in zip(numbers, raw)):
+                columns[key] = np.array([np.nan if x is None else x for x in numbers], dtype=np.float64)
+            else:
+                table, codes = {}, []
+                for v in raw:
+                    codes.append(MISSING_CODE if v in (None, '') else table.setdefault(v, len(table)))
+                columns[key] = np.array(codes, dtype=np.int32)
+                labels[key] = list(table)
+        time = columns.pop(time_key, np.full(self.n, MISSING_TIME, dtype=np.int64))
+        order = np.argsort(time, kind='stable')
+        return Channel(self.name, time[order], {k: v[order] for k, v in columns.items()}, labels)
+
+
+class EventStore(object):
+    """
+    Every channel of one subject.
+
+    Args:
+        channels: Dict of name -> Channel
+        patient: The <patient> element's attributes (id, weight, insulin_type)
+    """
+
+    def __init__(self, channels=None, patient=None):
+        self.channels = channels or {}
+        self.patient = patient or {}
+
+    @classmethod
+    def from_events(cls, events, patient=None):
+        """Build from (channel, attributes) pairs, e.g. iter_events()."""
+        builders = {}
+        for channel, attrib in events:
+            if channel not in builders:
+                builders[channel] = _ChannelBuilder(channel)
+            builders[channel].add(attrib)
+        return cls({name: b.build() for name, b in builders.items()}, patient)
+
+    @classmethod
+    def from_xml(cls, path):
+        """Parse one OhioT1DM XML file in a single streaming pass."""
+        patient = {}
+        return cls.from_events(iter_events(path, patient), patient)
+
+    def __getitem__(self, name):
+        return self.channels[name] if name in self.channels else Channel(name)
+
+    def __contains__(self, name):
+        return name in self.channels
+
+    def between(self, start_ms, end_ms):
+        """Every channel restricted to [start_ms, end_ms)."""
+        return EventStore({k: c.between(start_ms, end_ms) for k, c in self.channels.items()}, self.patient)
+
+    def pumphistory(self):
+        """Boluses and temp basals as simdata/pumphistory.json events."""
+        events = []
+        bolus = self['bolus']
+        if 'dose' in bolus:
+            for ts, dose in zip(bolus.time.tolist(), bolus['dose'].tolist()):
+                events.append({'_type': 'Bolus', 'amount': dose, 'timestamp': iso(ts)})
+        temp = self['temp_basal']
+        if 'value' in temp and 'ts_end' in temp:
+            for ts, end, rate in zip(temp.time.tolist(), temp['ts_end'].tolist(), temp['value'].tolist()):
+                duration = max(0, int(round((end - ts) / 60000))) if end != MISSING_TIME else 30
+                events.append({'_type': 'TempBasal', 'temp': 'absolute', 'rate': rate,
+                               'duration': duration, 'timestamp': iso(ts)})
+        return sorted(events, key=lambda e: e['timestamp'])
+
+    def treatments(self):
+        """Meals as treatment records with carbs, for the simulator's meal data."""
+        meal = self['meal']
+        if 'carbs' not in meal:
+            return []
+        return [{'date': ts, 'carbs': carbs} for ts, carbs in zip(meal.time.tolist(), meal['carbs'].tolist())
+                if carbs > 0]
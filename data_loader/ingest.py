@@ -0,0 +1,114 @@
+"""
+Parallel ingestion of every subject file under data/external/.
+
+Subject files are discovered across every registered dataset (see
+registry.py) and parsed in a process pool, one task per file. Each worker
+goes through the parsed-dataset cache with the file as its own entry, so
+only new or changed subjects are parsed; unchanged ones are loaded. The
+parent collects the results in discovery order and, if given a CGMStore,
+appends every subject to it (the store has a single writer). The store
+keeps each subject's file fingerprint, so a subject whose file changed
+is replaced rather than served stale.
+"""
+
+import hashlib
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import cache, registry
+from .registry import discover
+from .series import GlucoseSeries
+
+
+def _ingest(task, cache_dir):
+    """Worker: one subject's (series, pairs) via the cache, or the error that stopped it."""
+    module = registry.get(task['source']).module()
+    # Readable, plus a hash so subjects that sanitize alike do not share (and evict) an entry
+    digest = hashlib.sha1(task['subject'].encode('utf-8')).hexdigest()[:8]
+    name = f"{re.sub(r'[^A-Za-z0-9_.]+', '_', task['subject'])}-{digest}"
+
+    def parse():
+        series, pairs = module.read_subject(task['path'], module.DEFAULT_PROFILE)
+        return series, pairs, module.DEFAULT_PROFILE
+
+    try:
+        if cache_dir:
+            series, pairs, _ = cache.cached(name, [task['path']], module.LOADER_VERSION, parse, cache_dir)
+        else:
+            series, pairs, _ = parse()
+    except Exception as e:
+        return task, None, None, f'{type(e).__name__}: {e}'
+    return task, series, cache.pair_array(pairs), None
+
+
+def ingest(external_dir, cache_dir=None, store=None, processes=None, sources=None):
+    """
+    Parse every discovered subject across a process pool.
+
+    Args:
+        external_dir: Directory holding one folder per source (data/external)
+        cache_dir: Parsed-dataset cache (None disables caching)
+        store: CGMStore to append subjects it does not hold yet, or holds
+            from an older version of their file
+        processes: Pool size (default: CPU count); 1 parses in this process
+
+    Returns:
+        List of (task, GlucoseSeries, (n, 2) training pairs array, error) in
+        discovery order; series and pairs are None for files that failed
+    """
+    tasks = discover(external_dir, sources)
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        results = [_ingest(task, cache_dir) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_ingest, tasks, [cache_dir] * len(tasks)))
+
+    if store is not None:
+        for task, series, _, error in results:
+            if error is not None:
+                continue
+            key = cache.fingerprint([task['path']])
+            if store.fingerprint(task['subject']) != key:
+                store.remove(task['subject'])
+                store.append_series(task['subject'], series, key)
+    return results
+
+
+def load_external(external_dir, cache_dir=None, processes=None, sources=None):
+    """
+    All datasets under external_dir combined, as load_simdata() returns them.
+    Files that fail to parse are skipped with a warning naming them; with a
+    cache_dir, what was found is recorded in its manifest.json.
+
+    Returns:
+        (GlucoseSeries, (n, 2) training pairs array, profile), or None when
+        nothing parsed. The profile is the first source's DEFAULT_PROFILE;
+        a warning names any source whose pairs used a different one.
+    """
+    results = ingest(external_dir, cache_dir, processes=processes, sources=sources)
+    for task, _, _, error in results:
+        if error is not None:
+            warnings.warn(f"Skipping {task['path']}: {error}")
+    if cache_dir:
+        manifest = registry.scan(external_dir, sources)
+        registry.write_manifest(manifest, os.path.join(cache_dir, registry.MANIFEST_FILE))
+
+    results = [r for r in results if r[3] is None and len(r[1])]
+    if not results:
+        return None
+    glucose_data = GlucoseSeries.concat([series for _, series, _, _ in results])
+    training_pairs = np.concatenate([pairs for _, _, pairs, _ in results])
+    profiles = {}
+    for task, _, _, _ in results:
+        profiles.setdefault(task['source'], registry.get(task['source']).module().DEFAULT_PROFILE)
+    first, profile = next(iter(profiles.items()))
+    differing = [name for name, other in profiles.items() if other != profile]
+    if differing:
+        warnings.warn(f"Training pairs combine sources computed with different profiles; "
+                      f"returning {first}'s profile, not that of {', '.join(differing)}")
+    return glucose_data, training_pairs, dict(profile)
@@ -2,84 +2,163 @@
 Loader for AZT1D dataset (Mendeley Data).
 Expects CSV files with columns: glucose/CGM, bolus, carbs, etc.
 See: https://data.mendeley.com/datasets/gk9m674wcx/1
+
+Files are streamed row by row and parsed into fixed-size chunks, so every
+subject in the directory can be ingested in constant memory.
 """
 
 import csv
 import glob
-import json
 import os
-from datetime import datetime
 
+from .series import GlucoseSeries
+from .timeutil import parse_timestamp
 
-def load_azt1d(data_dir):
+LOADER_VERSION = 1  # bump when parsing changes, to invalidate data/cache/
+CHUNK_SIZE = 10000
+TIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%d-%m-%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M',
+)
+FIVE_MINUTES_MS = 5 * 60 * 1000
+DEFAULT_PROFILE = {'target_bg': 110, 'sens': 50, 'carb_ratio': 10}
+
+
+def _parse_ts(value):
+    """Parse an AZT1D timestamp (naive times are UTC) to epoch ms, or None."""
+    return parse_timestamp(value, TIME_FORMATS)
+
+
+def _columns(fieldnames):
+    """Infer glucose, bolus, carb and time column names (AZT1D may use various names)."""
+    lower = {c: c.lower() for c in fieldnames}
+    gl_col = next((c for c in fieldnames if 'glucose' in lower[c] or 'bgl' in lower[c] or 'cgm' in lower[c] or c == 'sgv'), None)
+    if not gl_col:
+        gl_col = next((c for c in fieldnames if c in ['value', 'glucose', 'sgv']), fieldnames[0])
+    insulin_cols = [c for c in fieldnames if ('bolus' in lower[c] or 'insulin' in lower[c]) and 'type' not in lower[c]]
+    bolus_col = next((c for c in insulin_cols if 'delivered' in lower[c] or 'total' in lower[c]),
+                     insulin_cols[0] if insulin_cols else None)
+    carb_col = next((c for c in fieldnames if 'carb' in lower[c]), None)
+    time_col = next((c for c in fieldnames if 'time' in lower[c] or 'date' in lower[c]), None)
+    return gl_col, bolus_col, carb_col, time_col
+
+
+def _float(row, col):
+    try:
+        return float(row[col]) if col and row.get(col) not in (None, '') else None
+    except (ValueError, TypeError):
+        return None
+
+
+def csv_files(data_dir):
+    """Every CSV under data_dir (subject folders included), in a stable order."""
+    return sorted(glob.glob(os.path.join(data_dir, '**', '*.csv'), recursive=True))
+
+
+def iter_rows(path):
     """
-    Load AZT1D format data. Supports multiple CSV naming conventions.
-    Returns (glucose_data, training_pairs, profile).
+    Stream one AZT1D CSV as dicts with date (epoch ms), glucose, bolus and carbs.
+    Rows without a readable timestamp are skipped; a file with no time
+    column at all is spaced 5 minutes apart from its modification time.
     """
-    glucose_data = []
-    training_pairs = []
-    profile = {'target_bg': 110, 'sens': 50, 'carb_ratio': 10}
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames:
+            return
+        gl_col, bolus_col, carb_col, time_col = _columns(reader.fieldnames)
+        base_ts = int(os.path.getmtime(path) * 1000)
+        for i, row in enumerate(reader):
+            ts = _parse_ts(row.get(time_col)) if time_col else base_ts + i * FIVE_MINUTES_MS
+            if ts is None:
+                continue
+            yield {
+                'date': ts,
+                'glucose': _float(row, gl_col),
+                'bolus': _float(row, bolus_col),
+                'carbs': _float(row, carb_col),
+            }
+
+
+def iter_readings(path, profile):
+    """Stream one CSV's (date, glucose, insulin) for rows with a glucose value."""
+    for row in iter_rows(path):
+        if row['glucose'] is None:
+            continue
+        gl = max(40, min(400, round(row['glucose'])))
+        if row['bolus'] is not None:
+            insulin = row['bolus']
+        elif row['carbs'] is not None:
+            insulin = row['carbs'] / profile['carb_ratio']
+        else:
+            # Use correction formula
+            insulin = max(0, (gl - profile['target_bg']) / profile['sens']) if gl > profile['target_bg'] else 0.05
+        yield row['date'], gl, insulin
+
 
-    csv_files = glob.glob(os.path.join(data_dir, '*.csv'))
-    if not csv_files:
+def read_subject(path, profile=None):
+    """
+    Parse one subject's CSV.
+
+    Returns:
+        (GlucoseSeries, training_pairs)
+    """
+    profile = profile or DEFAULT_PROFILE
+    dates, values, training_pairs = [], [], []
+    for ts, gl, insulin in iter_readings(path, profile):
+        dates.append(ts)
+        values.append(gl)
+        training_pairs.append((float(gl), float(insulin)))
+    return GlucoseSeries(dates, values, device='azt1d'), training_pairs
+
+
+def iter_azt1d(data_dir, chunk_size=CHUNK_SIZE, profile=None):
+    """
+    Stream every AZT1D CSV in data_dir.
+
+    Yields:
+        (GlucoseSeries, training_pairs) chunks of at most chunk_size readings
+    """
+    profile = profile or DEFAULT_PROFILE
+    files = csv_files(data_dir)
+    if not files:
         raise FileNotFoundError(f"No CSV files found in {data_dir}")
 
-    base_ts = int(datetime.now().timestamp() * 1000)
+    dates, values = [], []
+    training_pairs = []
+    for path in files:
+        for ts, gl, insulin in iter_readings(path, profile):
+            dates.append(ts)
+            values.append(gl)
+            training_pairs.append((float(gl), float(insulin)))
+
+            if len(dates) >= chunk_size:
+                yield GlucoseSeries(dates, values, device='azt1d'), training_pairs
+                dates, values = [], []
+                training_pairs = []
+    if dates:
+        yield GlucoseSeries(dates, values, device='azt1d'), training_pairs
 
-    for path in csv_files[:3]:  # Limit to first 3 files for memory
-        with open(path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            if not rows:
-                continue
 
-            # Infer column names (AZT1D may use various names)
-            first = rows[0]
-            gl_col = next((c for c in first if 'glucose' in c.lower() or 'bgl' in c.lower() or 'cgm' in c.lower() or c == 'sgv'), None)
-            bolus_col = next((c for c in first if 'bolus' in c.lower() or 'insulin' in c.lower()), None)
-            carb_col = next((c for c in first if 'carb' in c.lower()), None)
-
-            if not gl_col:
-                gl_col = next((c for c in first if c in ['value', 'glucose', 'sgv']), list(first.keys())[0])
-
-            for i, row in enumerate(rows):
-                try:
-                    gl = float(row.get(gl_col, row.get('glucose', row.get('Pre-meal BGL', 120))))
-                except (ValueError, TypeError):
-                    continue
-                gl = max(40, min(400, round(gl)))
-
-                ts = base_ts + i * 5 * 60 * 1000
-                glucose_data.append({
-                    'date': ts,
-                    'glucose': gl,
-                    'sgv': gl,
-                    'direction': 'Flat',
-                    'noise': 1,
-                    'filtered': gl,
-                    'unfiltered': gl,
-                    'rssi': 100,
-                    'device': 'azt1d',
-                })
-
-                insulin = 0.05
-                if bolus_col and row.get(bolus_col):
-                    try:
-                        insulin = float(row[bolus_col])
-                    except (ValueError, TypeError):
-                        pass
-                elif carb_col and row.get(carb_col):
-                    try:
-                        insulin = float(row.get(carb_col, 0)) / profile['carb_ratio']
-                    except (ValueError, TypeError):
-                        pass
-                else:
-                    # Use correction formula
-                    insulin = max(0, (gl - profile['target_bg']) / profile['sens']) if gl > profile['target_bg'] else 0.05
-
-                training_pairs.append((float(gl), float(insulin)))
-
-    if not glucose_data:
+def load_azt1d(data_dir):
+    """
+    Load AZT1D format data. Supports multiple CSV naming conventions.
+    Returns (glucose_data, training_pairs, profile); glucose_data is a GlucoseSeries.
+    Use iter_azt1d() to process the dataset chunk by chunk instead.
+    """
+    parts = []
+    training_pairs = []
+    profile = dict(DEFAULT_PROFILE)
+
+    for chunk, pairs in iter_azt1d(data_dir, profile=profile):
+        parts.append(chunk)
+        training_pairs.extend(pairs)
+
+    glucose_data = GlucoseSeries.concat(parts)
+    if not len(glucose_data):
         raise ValueError(f"Could not parse any data from {data_dir}")
 
     return glucose_data, training_pairs, profile
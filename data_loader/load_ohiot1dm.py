@@ -1,84 +1,99 @@
 """
 Loader for OhioT1DM dataset (XML format).
 Expects XML files from OhioT1DM. See: https://webpages.charlotte.edu/rbunescu/data/ohiot1dm/
+
+Each file is read into a columnar EventStore (see events.py) in one
+streaming iterparse pass that clears elements as it goes. Boluses are
+matched to glucose readings by binary search over the sorted reading
+times.
 """
 
+import glob
 import os
-import xml.etree.ElementTree as ET
-from datetime import datetime
 
+import numpy as np
+
+from .events import MISSING_TIME, EventStore
+from .series import GlucoseSeries
+
+LOADER_VERSION = 1  # bump when parsing changes, to invalidate data/cache/
+BOLUS_WINDOW_MS = 15 * 60 * 1000
+DEFAULT_PROFILE = {'target_bg': 110, 'sens': 50, 'carb_ratio': 10}
+
+
+def xml_files(data_dir):
+    return sorted(glob.glob(os.path.join(data_dir, '*.xml')))
 
-def _parse_ts(ts_str):
-    """Parse OhioT1DM timestamp to ms."""
-    try:
-        dt = datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
-        return int(dt.timestamp() * 1000)
-    except Exception:
-        return int(datetime.now().timestamp() * 1000)
+
+def align_boluses(glucose_dates, bolus_dates, window_ms=BOLUS_WINDOW_MS):
+    """
+    Index of the first reading within window_ms of each bolus, or -1.
+
+    Args:
+        glucose_dates: Sorted reading times (epoch ms)
+        bolus_dates: Bolus times (epoch ms)
+    """
+    glucose_dates = np.asarray(glucose_dates, dtype=np.int64)
+    bolus_dates = np.asarray(bolus_dates, dtype=np.int64)
+    idx = np.searchsorted(glucose_dates, bolus_dates - window_ms, side='right')
+    found = idx < len(glucose_dates)
+    found[found] = glucose_dates[idx[found]] - bolus_dates[found] < window_ms
+    return np.where(found, idx, -1)
+
+
+def read_subject(path, profile=None):
+    """
+    Parse one subject's XML file.
+
+    Returns:
+        (GlucoseSeries, training_pairs)
+    """
+    profile = profile or DEFAULT_PROFILE
+    store = EventStore.from_xml(path)
+    readings = store['glucose_level']
+    boluses = store['bolus']
+    if 'value' not in readings:
+        return GlucoseSeries([], [], device='ohiot1dm'), []
+    keep = ~np.isnan(readings['value']) & (readings.time != MISSING_TIME)
+    dates = readings.time[keep]
+    values = np.clip(np.round(readings['value'][keep]), 40, 400).astype(np.int64)
+    bolus_dates, bolus_amounts = np.zeros(0, dtype=np.int64), np.zeros(0)
+    dose_col = 'dose' if 'dose' in boluses else 'amount'
+    if dose_col in boluses:
+        dose = boluses[dose_col]
+        keep = ~np.isnan(dose) & (boluses.time != MISSING_TIME)
+        bolus_dates, bolus_amounts = boluses.time[keep], dose[keep]
+
+    insulin = np.where(values > profile['target_bg'], (values - profile['target_bg']) / profile['sens'], 0.05)
+    matched = align_boluses(dates, bolus_dates)
+    # Later boluses win where several match the same reading, as before
+    insulin[matched[matched >= 0]] = np.asarray(bolus_amounts)[matched >= 0]
+
+    glucose_data = GlucoseSeries(dates, values, device='ohiot1dm')
+    training_pairs = list(zip(values.astype(np.float64).tolist(), insulin.astype(np.float64).tolist()))
+    return glucose_data, training_pairs
 
 
 def load_ohiot1dm(data_dir):
     """
     Load OhioT1DM XML files.
-    Returns (glucose_data, training_pairs, profile).
+    Returns (glucose_data, training_pairs, profile); glucose_data is a GlucoseSeries.
     """
-    import glob
-    glucose_data = []
+    parts = []
     training_pairs = []
-    profile = {'target_bg': 110, 'sens': 50, 'carb_ratio': 10}
+    profile = dict(DEFAULT_PROFILE)
 
-    xml_files = glob.glob(os.path.join(data_dir, '*.xml'))
-    if not xml_files:
+    files = xml_files(data_dir)
+    if not files:
         raise FileNotFoundError(f"No XML files found in {data_dir}")
 
-    for path in xml_files[:2]:
-        tree = ET.parse(path)
-        root = tree.getroot()
-
-        # CGM: typically in 'glucose_level' or similar
-        for elem in root.iter():
-            tag = elem.tag.lower()
-            if 'glucose' in tag or 'cgm' in tag or tag == 'value':
-                ts = elem.get('ts', elem.get('timestamp', ''))
-                ts_ms = _parse_ts(ts) if ts else 0
-                try:
-                    gl = float(elem.text or elem.get('value', 120))
-                except (ValueError, TypeError):
-                    continue
-                gl = max(40, min(400, round(gl)))
-
-                glucose_data.append({
-                    'date': ts_ms,
-                    'glucose': gl,
-                    'sgv': gl,
-                    'direction': 'Flat',
-                    'noise': 1,
-                    'filtered': gl,
-                    'unfiltered': gl,
-                    'rssi': 100,
-                    'device': 'ohiot1dm',
-                })
-
-                # Estimate insulin from correction formula
-                insulin = max(0, (gl - profile['target_bg']) / profile['sens']) if gl > profile['target_bg'] else 0.05
-                training_pairs.append((float(gl), float(insulin)))
-
-        # Bolus data for better training pairs
-        for elem in root.iter():
-            tag = elem.tag.lower()
-            if 'bolus' in tag:
-                ts = elem.get('ts', '')
-                try:
-                    amount = float(elem.get('amount', elem.text or 0))
-                    # Find nearest glucose reading and update training pair
-                    for i, gd in enumerate(glucose_data):
-                        if abs(gd['date'] - _parse_ts(ts)) < 15 * 60 * 1000 and i < len(training_pairs):
-                            training_pairs[i] = (training_pairs[i][0], amount)
-                            break
-                except (ValueError, TypeError):
-                    pass
-
-    if not glucose_data:
+    for path in files:
+        data, pairs = read_subject(path, profile)
+        parts.append(data)
+        training_pairs.extend(pairs)
+
+    glucose_data = GlucoseSeries.concat(parts)
+    if not len(glucose_data):
         raise ValueError(f"Could not parse any data from {data_dir}")
 
     return glucose_data, training_pairs, profile
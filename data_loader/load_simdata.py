@@ -1,56 +1,73 @@
 """
 Load simulation data from simdata/ or external datasets.
 Prioritizes: external datasets > synthetic data > existing simdata.
+Datasets come from the registry (registry.py) and are ingested in parallel
+(ingest.py); parsed files are cached under data/cache/ (cache.py).
 """
 
 import json
 import os
 
+import numpy as np
 
-def _load_external_if_exists(root_dir):
-    """Check for external dataset files. Returns (glucose_data, training_pairs, profile) or None."""
+from . import cache
+from .ingest import load_external
+from .profile import Profile
+from .series import GlucoseSeries
+from .store import CGMStore
+
+SIMDATA_VERSION = 1
+
+
+def _parse(root_dir, name, files, version, parse, use_cache):
+    if not use_cache:
+        return parse()
+    return cache.cached(name, files, version, parse, os.path.join(root_dir, 'data', 'cache'))
+
+
+def _load_external_if_exists(root_dir, use_cache=True, processes=None):
+    """
+    Ingest every subject of every dataset under data/external/ in parallel.
+    Returns (glucose_data, training_pairs, profile) or None.
+    """
     external_dir = os.path.join(root_dir, 'data', 'external')
     if not os.path.exists(external_dir):
         return None
+    cache_dir = os.path.join(root_dir, 'data', 'cache') if use_cache else None
+    return load_external(external_dir, cache_dir, processes)
 
-    # AZT1D: look for CSV files
-    azt1d_dir = os.path.join(external_dir, 'azt1d')
-    if os.path.exists(azt1d_dir):
-        try:
-            from .load_azt1d import load_azt1d
-            return load_azt1d(azt1d_dir)
-        except Exception:
-            pass
 
-    # OhioT1DM: look for XML files
-    ohiot1dm_dir = os.path.join(external_dir, 'ohiot1dm')
-    if os.path.exists(ohiot1dm_dir):
-        try:
-            from .load_ohiot1dm import load_ohiot1dm
-            return load_ohiot1dm(ohiot1dm_dir)
-        except Exception:
-            pass
+def _read_glucose_json(path):
+    with open(path) as f:
+        return GlucoseSeries.from_records(json.load(f)), [], {}
 
-    return None
 
+def _correction_pairs(glucose, profile):
+    """(n, 2) float64 (glucose, insulin) pairs from the profile's correction formula."""
+    target = profile.get('target_bg', 110)
+    isf = profile.get('sens', 50)
+    gl = np.asarray(glucose, dtype=np.float64)
+    return np.column_stack([gl, np.where(gl > target, (gl - target) / isf, 0.05)])
 
-def load_simdata(root_dir=None):
-    """
-    Load glucose data and profile for simulation.
-    Uses external datasets if available, otherwise synthetic data.
 
-    Returns:
-        glucose_data: List of glucose readings (simdata format)
-        profile: Dict with target_bg, sens, carb_ratio
-        training_pairs: List of (glucose, insulin) for model training
-    """
+def _store_pairs(store, profile, subjects, start_ms, end_ms):
+    """Correction pairs for the subjects' readings in a CGMStore (or store directory)."""
+    if not isinstance(store, CGMStore):
+        store = CGMStore(store)
+    subjects = store.subjects if subjects is None else subjects
+    glucose = [store.read(subject, start_ms, end_ms)[1] for subject in subjects]
+    return _correction_pairs(np.concatenate(glucose) if glucose else [], profile)
+
+
+def _load(root_dir, use_cache):
+    """(glucose_data, profile, (n, 2) float64 training pairs array) from the first source available."""
     if root_dir is None:
         root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
     simdata_dir = os.path.join(root_dir, 'simdata')
 
     # Try external datasets first
-    external = _load_external_if_exists(root_dir)
+    external = _load_external_if_exists(root_dir, use_cache)
     if external is not None:
         glucose_data, training_pairs, profile = external
         return glucose_data, profile, training_pairs
@@ -60,33 +77,18 @@ def load_simdata(root_dir=None):
     profile_path = os.path.join(simdata_dir, 'profile.json')
 
     if os.path.exists(glucose_path):
-        with open(glucose_path) as f:
-            glucose_data = json.load(f)
+        glucose_data, _, _ = _parse(root_dir, 'simdata-glucose', [glucose_path], SIMDATA_VERSION,
+                                    lambda: _read_glucose_json(glucose_path), use_cache)
         profile = {}
         if os.path.exists(profile_path):
-            with open(profile_path) as f:
-                p = json.load(f)
-                profile = {
-                    'target_bg': p.get('target_bg', p.get('min_bg', 110)),
-                    'sens': p.get('sens', 50),
-                    'carb_ratio': p.get('carb_ratio', [{'ratio': 10}])[0]['ratio'] if isinstance(p.get('carb_ratio'), list) else 10,
-                }
+            profile = Profile.load(profile_path).params()
         # Build training pairs from glucose using correction formula
-        target = profile.get('target_bg', 110)
-        isf = profile.get('sens', 50)
-        training_pairs = []
-        for g in glucose_data:
-            gl = g.get('glucose', g.get('sgv', 120))
-            if gl > target:
-                insulin = (gl - target) / isf
-            else:
-                insulin = 0.05
-            training_pairs.append((float(gl), float(insulin)))
+        training_pairs = _correction_pairs(glucose_data.glucose, profile)
         # If very few points, augment with synthetic data for better training
         if len(training_pairs) < 50:
             from .synthetic_data import generate_synthetic_t1d_data
             _, synth_pairs, _ = generate_synthetic_t1d_data(simdata_dir, n_glucose_points=300, n_training_pairs=250)
-            training_pairs = training_pairs + synth_pairs
+            training_pairs = np.concatenate([training_pairs, cache.pair_array(synth_pairs)])
         return glucose_data, profile, training_pairs
 
     # Fall back to synthetic data
@@ -97,17 +99,48 @@ def load_simdata(root_dir=None):
         'sens': profile['sens'],
         'carb_ratio': profile['carb_ratio'],
     }
-    return glucose_data, profile_params, training_pairs
+    return glucose_data, profile_params, cache.pair_array(training_pairs)
+
+
+def load_simdata(root_dir=None, use_cache=True):
+    """
+    Load glucose data and profile for simulation.
+    Uses external datasets if available, otherwise synthetic data.
+    With use_cache, parsed files are reused from data/cache/ until they change.
+
+    Returns:
+        glucose_data: GlucoseSeries of glucose readings (simdata format)
+        profile: Dict with target_bg, sens, carb_ratio
+        training_pairs: List of (glucose, insulin) for model training
+    """
+    glucose_data, profile, training_pairs = _load(root_dir, use_cache)
+    return glucose_data, profile, [tuple(pair) for pair in training_pairs.tolist()]
 
 
-def load_training_data(root_dir=None):
+def load_training_data(root_dir=None, use_cache=True, store=None, profile=None, subjects=None, start_ms=None,
+                       end_ms=None):
     """
-    Load (glucose, insulin) pairs for model training.
-    Returns: (X, y, profile_params) where X=glucose, y=insulin.
+    Load (glucose, insulin) pairs for model training, without building
+    Python lists along the way.
+    With store (a CGMStore or its directory), pairs come from the store's
+    readings instead of the loaders: the subjects' glucose in
+    [start_ms, end_ms) (default: every subject, all of it) through the
+    correction formula of profile (a target_bg/sens dict; default: the
+    simdata profile's params()).
+    Returns: (X, y, profile_params) where X=glucose as a contiguous (n, 1)
+    float32 array and y=insulin as an (n,) float32 array.
     """
-    _, profile, pairs = load_simdata(root_dir)
-    if not pairs:
+    if store is not None:
+        if profile is None:
+            if root_dir is None:
+                root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            profile_path = os.path.join(root_dir, 'simdata', 'profile.json')
+            profile = Profile.load(profile_path).params() if os.path.exists(profile_path) else {}
+        pairs = _store_pairs(store, profile, subjects, start_ms, end_ms)
+    else:
+        _, profile, pairs = _load(root_dir, use_cache)
+    if not len(pairs):
         return None, None, profile
-    X = [[g] for g, _ in pairs]
-    y = [i for _, i in pairs]
+    X = np.ascontiguousarray(pairs[:, :1], dtype=np.float32)
+    y = np.ascontiguousarray(pairs[:, 1], dtype=np.float32)
     return X, y, profile
@@ -0,0 +1,151 @@
+"""
+Compiled pump profile.
+Parses simdata/profile.json once and compiles its time-of-day schedules
+(basalprofile, isfProfile.sens, carb ratios) into 1440-entry per-minute
+tables, so lookups for any array of timestamps are a single index.
+"""
+
+import json
+import os
+
+import numpy as np
+
+MINUTES_PER_DAY = 1440
+
+DEFAULTS = {
+    'target_bg': 110,
+    'sens': 50,
+    'carb_ratio': 10,
+    'min_bg': 70,
+    'max_bg': 180,
+    'current_basal': 1.0,
+    'dia': 3,
+}
+
+_cache = {}
+
+
+def _start_minute(entry):
+    if 'minutes' in entry:
+        return int(entry['minutes'])
+    if 'offset' in entry:
+        return int(entry['offset'])
+    h, m, *_ = (entry.get('start') or '00:00:00').split(':')
+    return int(h) * 60 + int(m)
+
+
+def compile_schedule(entries, key, default):
+    """
+    Per-minute table for a schedule of {start, <key>} entries. Each entry
+    holds until the next one starts; before the first entry the last one
+    of the previous day applies.
+    """
+    table = np.full(MINUTES_PER_DAY, float(default))
+    entries = sorted(entries or [], key=_start_minute)
+    if entries:
+        starts = np.array([_start_minute(e) for e in entries])
+        values = np.array([float(e[key]) for e in entries])
+        idx = np.searchsorted(starts, np.arange(MINUTES_PER_DAY), side='right') - 1
+        table = values[idx]  # idx -1 wraps to the last entry
+    table.flags.writeable = False
+    return table
+
+
+def _carb_ratio_entries(data):
+    if isinstance(data.get('carb_ratios'), dict):
+        return data['carb_ratios'].get('schedule')
+    if isinstance(data.get('carb_ratio'), list):
+        return data['carb_ratio']
+    return None
+
+
+class Profile(object):
+    """
+    A profile.json with compiled schedules.
+
+    Args:
+        data: The parsed profile.json dict
+        utc_offset_minutes: Offset of the schedules' local time from UTC
+            (default: the profile's own utc_offset_minutes, else 0, so the
+            schedules resolve the same on any host)
+    """
+
+    def __init__(self, data=None, utc_offset_minutes=None):
+        self.data = dict(data or {})
+        if utc_offset_minutes is None:
+            utc_offset_minutes = self.data.get('utc_offset_minutes', 0)
+        self.utc_offset_minutes = int(utc_offset_minutes)
+
+        sens = self.data.get('sens', DEFAULTS['sens'])
+        carb_ratio = self.data.get('carb_ratio', DEFAULTS['carb_ratio'])
+        self.basal = compile_schedule(self.data.get('basalprofile'), 'rate',
+                                      self.data.get('current_basal', DEFAULTS['current_basal']))
+        self.sens = compile_schedule((self.data.get('isfProfile') or {}).get('sens'), 'sensitivity',
+                                     sens if not isinstance(sens, list) else DEFAULTS['sens'])
+        self.carb_ratio = compile_schedule(_carb_ratio_entries(self.data), 'ratio',
+                                           carb_ratio if not isinstance(carb_ratio, list) else DEFAULTS['carb_ratio'])
+
+    @classmethod
+    def load(cls, path, utc_offset_minutes=None):
+        """Profile for path, reused until the file's size or mtime changes."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns, utc_offset_minutes)
+        if key not in _cache:
+            with open(path) as f:
+                _cache[key] = cls(json.load(f), utc_offset_minutes)
+        return _cache[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, DEFAULTS.get(key) if default is None else default)
+
+    @property
+    def min_bg(self):
+        return self.get('min_bg')
+
+    @property
+    def max_bg(self):
+        return self.get('max_bg')
+
+    @property
+    def target_bg(self):
+        return self.data.get('target_bg', self.data.get('min_bg', DEFAULTS['target_bg']))
+
+    @property
+    def dia(self):
+        return self.get('dia')
+
+    def minute_of_day(self, times_ms):
+        """Local minute of day (0-1439) for epoch-ms timestamps."""
+        minutes = np.asarray(times_ms, dtype=np.int64) // 60000 + self.utc_offset_minutes
+        return minutes % MINUTES_PER_DAY
+
+    def basal_at(self, times_ms):
+        return self.basal[self.minute_of_day(times_ms)]
+
+    def sens_at(self, times_ms):
+        return self.sens[self.minute_of_day(times_ms)]
+
+    def carb_ratio_at(self, times_ms):
+        return self.carb_ratio[self.minute_of_day(times_ms)]
+
+    def at(self, time_ms):
+        """
+        The profile dict as oref0-get-profile would emit it at time_ms:
+        current_basal, sens and carb_ratio resolved from the schedules.
+        """
+        i = int(self.minute_of_day(time_ms))
+        return dict(self.data, current_basal=float(self.basal[i]), sens=float(self.sens[i]),
+                    carb_ratio=float(self.carb_ratio[i]))
+
+    def params(self):
+        """
+        The target_bg/sens/carb_ratio summary used for model training.
+        carb_ratio is the schedule's entry at local midnight; use
+        carb_ratio_at() or at() for the ratio in effect at a given time.
+        """
+        return {
+            'target_bg': self.target_bg,
+            'sens': self.get('sens'),
+            'carb_ratio': float(self.carb_ratio[0]),
+        }
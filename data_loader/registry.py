@@ -0,0 +1,149 @@
+"""
+Registry of dataset loaders.
+
+Each dataset registers a name (also its folder under data/external/), glob
+patterns for its subject files and the module implementing it. Discovery
+only globs and stats files; a loader module is imported the first time one
+of its files has to be parsed. A loader module provides:
+
+    read_subject(path, profile) -> (GlucoseSeries, training_pairs)
+    LOADER_VERSION   bumped when parsing changes (invalidates the cache)
+    DEFAULT_PROFILE  profile its training pairs were computed with
+
+scan() records what was found, with per-file fingerprints, in a manifest.
+"""
+
+import glob
+import importlib
+import json
+import os
+
+from .cache import fingerprint
+
+MANIFEST_FILE = 'manifest.json'
+
+_datasets = {}
+
+
+class Dataset(object):
+    """
+    One registered source.
+
+    Args:
+        name: Dataset name and folder under data/external/
+        patterns: Glob patterns for subject files, relative to that folder
+        entry_point: Module path of the loader, imported on first use
+    """
+
+    def __init__(self, name, patterns, entry_point):
+        self.name = name
+        self.patterns = list(patterns)
+        self.entry_point = entry_point
+        self._module = None
+
+    def files(self, data_dir):
+        paths = set()
+        for pattern in self.patterns:
+            paths.update(glob.glob(os.path.join(data_dir, pattern), recursive=True))
+        return sorted(p for p in paths if os.path.isfile(p))
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.entry_point)
+        return self._module
+
+
+def register(name, patterns, entry_point):
+    """Add (or replace) a dataset; its module is not imported here."""
+    _datasets[name] = Dataset(name, patterns, entry_point)
+    return _datasets[name]
+
+
+def unregister(name):
+    _datasets.pop(name, None)
+
+
+def get(name):
+    return _datasets[name]
+
+
+def datasets():
+    """Registered dataset names, in registration order."""
+    return list(_datasets)
+
+
+def discover(external_dir, names=None):
+    """
+    Every subject file of every registered dataset under external_dir.
+
+    Returns:
+        List of dicts with source, subject (source/relative path without
+        extension) and path
+    """
+    tasks = []
+    for name in names or datasets():
+        data_dir = os.path.join(external_dir, name)
+        if not os.path.isdir(data_dir):
+            continue
+        for path in get(name).files(data_dir):
+            relative = os.path.splitext(os.path.relpath(path, data_dir))[0]
+            tasks.append({'source': name, 'subject': f'{name}/{relative}', 'path': path})
+    return tasks
+
+
+def scan(external_dir, names=None):
+    """
+    Stat pass over everything discover() finds.
+
+    Returns:
+        Manifest dict: per dataset, its entry point, fingerprint and files
+        (path relative to external_dir, size, mtime_ns, fingerprint)
+    """
+    manifest = {'datasets': {}}
+    for task in discover(external_dir, names):
+        st = os.stat(task['path'])
+        entry = manifest['datasets'].setdefault(task['source'], {
+            'entry_point': get(task['source']).entry_point,
+            'files': {},
+        })
+        entry['files'][task['subject']] = {
+            'path': os.path.relpath(task['path'], external_dir),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'fingerprint': fingerprint([task['path']]),
+        }
+    for name, entry in manifest['datasets'].items():
+        paths = [os.path.join(external_dir, f['path']) for f in entry['files'].values()]
+        entry['fingerprint'] = fingerprint(paths)
+    return manifest
+
+
+def changed(manifest, previous):
+    """Names of datasets added or changed since previous (a manifest or None)."""
+    before = (previous or {}).get('datasets', {})
+    return [name for name, entry in manifest['datasets'].items()
+            if before.get(name, {}).get('fingerprint') != entry['fingerprint']]
+
+
+def read_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+register('azt1d', ['**/*.csv'], 'data_loader.load_azt1d')
+register('ohiot1dm', ['*.xml'], 'data_loader.load_ohiot1dm')
@@ -0,0 +1,135 @@
+"""
+Resampling of irregular CGM streams onto a 5-minute grid.
+
+Real exports jitter around the sensor's 5-minute cadence, repeat readings
+and drop out for minutes to hours. resample() snaps each reading to the
+nearest slot of a clock-aligned grid (keeping the closest reading when
+several land in one slot), fills gaps up to max_gap_ms by linear
+interpolation and leaves longer gaps as NaN, returning masks so later
+steps can tell observed, interpolated and missing slots apart. Everything
+is sorts, searchsorted and np.interp over whole arrays.
+"""
+
+import numpy as np
+
+from .series import GlucoseSeries
+
+GRID_MS = 5 * 60 * 1000
+MAX_GAP_MS = 30 * 60 * 1000  # longest run (reading to reading) filled by interpolation
+
+
+def dedupe(dates, glucose):
+    """Readings sorted by date with repeated timestamps dropped (the first kept)."""
+    dates = np.asarray(dates, dtype=np.int64)
+    glucose = np.asarray(glucose)
+    if np.all(dates[1:] >= dates[:-1]):
+        order = np.arange(len(dates))
+    else:
+        order = np.argsort(dates, kind='stable')
+        dates, glucose = dates[order], glucose[order]
+    keep = np.ones(len(dates), dtype=bool)
+    keep[1:] = dates[1:] != dates[:-1]
+    return dates[keep], glucose[keep], order[keep]
+
+
+def snap(dates, grid_ms=GRID_MS, origin_ms=0):
+    """Index of the grid slot nearest each time; slots are origin_ms + k * grid_ms."""
+    return np.floor_divide(np.asarray(dates, dtype=np.int64) - origin_ms + grid_ms // 2, grid_ms)
+
+
+def resample(dates, glucose, grid_ms=GRID_MS, max_gap_ms=MAX_GAP_MS, origin_ms=0):
+    """
+    Put readings on a regular grid.
+
+    Args:
+        dates: Reading times (epoch ms), any order, duplicates allowed
+        glucose: Values; NaN readings count as missing
+        grid_ms: Grid spacing
+        max_gap_ms: Gaps whose surrounding readings are at most this far
+            apart are interpolated; longer ones stay NaN
+        origin_ms: Grid alignment (default: epoch, i.e. wall-clock :00, :05, ...)
+
+    Returns:
+        Dict of arrays over every slot from the first to the last reading:
+        date (int64 ms), glucose (float64, NaN in gaps), source (index into
+        the input of the reading in each observed slot, else -1), and masks
+        observed, interpolated and gap
+    """
+    dates, glucose, source = dedupe(dates, np.asarray(glucose, dtype=np.float64))
+    valid = ~np.isnan(glucose)
+    dates, glucose, source = dates[valid], glucose[valid], source[valid]
+    if not len(dates):
+        empty = np.zeros(0, dtype=bool)
+        return {'date': np.zeros(0, dtype=np.int64), 'glucose': np.zeros(0), 'source': np.zeros(0, dtype=np.int64),
+                'observed': empty, 'interpolated': empty, 'gap': empty}
+
+    slots = snap(dates, grid_ms, origin_ms)
+    # Several readings in one slot (they are adjacent, as dates are
+    # sorted): keep the one closest to the slot time
+    start = np.ones(len(slots), dtype=bool)
+    start[1:] = slots[1:] != slots[:-1]
+    run = np.cumsum(start) - 1
+    shared = np.bincount(run)[run] > 1
+    if shared.any():
+        idx = np.flatnonzero(shared)
+        distance = np.abs(dates[idx] - (origin_ms + slots[idx] * grid_ms))
+        idx = idx[np.lexsort((distance, run[idx]))]
+        keep = ~shared
+        best = np.ones(len(idx), dtype=bool)
+        best[1:] = run[idx][1:] != run[idx][:-1]
+        keep[idx[best]] = True
+        slots, dates, glucose, source = slots[keep], dates[keep], glucose[keep], source[keep]
+
+    grid = np.arange(slots[0], slots[-1] + 1)
+    n = len(grid)
+    at = slots - slots[0]
+    values = np.full(n, np.nan)
+    values[at] = glucose
+    observed = np.zeros(n, dtype=bool)
+    observed[at] = True
+    source_index = np.full(n, -1, dtype=np.int64)
+    source_index[at] = source
+
+    # Each missing slot lies between two readings; fill it if they are close enough
+    before = np.cumsum(observed) - 1
+    after = np.minimum(before + ~observed, len(at) - 1)
+    span = (at[after] - at[before]) * grid_ms
+    fill = ~observed & (span <= max_gap_ms)
+    values[fill] = np.interp(grid[fill], slots, glucose)
+    return {
+        'date': origin_ms + grid * grid_ms,
+        'glucose': values,
+        'source': source_index,
+        'observed': observed,
+        'interpolated': fill,
+        'gap': ~observed & ~fill,
+    }
+
+
+def resample_series(series, grid_ms=GRID_MS, max_gap_ms=MAX_GAP_MS, origin_ms=0, keep_gaps=False):
+    """
+    resample() for a GlucoseSeries (or glucose.json records).
+
+    Returns:
+        (GlucoseSeries on the grid, resample() result). Interpolated slots
+        take direction, noise and device from the reading before them.
+        Unfilled gap slots are left out unless keep_gaps, in which case
+        their glucose is NaN.
+    """
+    if not isinstance(series, GlucoseSeries):
+        series = GlucoseSeries.from_records(series)
+    result = resample(series.date, series.glucose, grid_ms, max_gap_ms, origin_ms)
+    # Index of the latest observed slot at or before each slot
+    latest = np.maximum.accumulate(np.where(result['observed'], np.arange(len(result['date'])), 0))
+    source = result['source'][latest]
+    keep = slice(None) if keep_gaps else ~result['gap']
+    source = source[keep]
+    resampled = GlucoseSeries(
+        result['date'][keep],
+        result['glucose'][keep],
+        direction=(series.direction_codes[source], series.directions),
+        noise=series.noise[source],
+        device=(series.device_codes[source], series.devices),
+        rssi=series.rssi[source],
+    )
+    return resampled, result
@@ -0,0 +1,225 @@
+"""
+Array-backed glucose series.
+
+Loaders used to build one simdata/glucose.json dict per reading, repeating
+the same value under glucose, sgv, filtered and unfiltered and the same
+rssi and device strings every time. GlucoseSeries keeps one contiguous
+array per field instead (int64 ms dates, float32 glucose, small integer
+noise/rssi and codes into interned direction and device tables), about
+20 bytes a reading. Records are only built when asked for, so the series
+still indexes, iterates and serializes like the old list of dicts.
+"""
+
+import numpy as np
+
+DEFAULT_DIRECTION = 'Flat'
+DEFAULT_NOISE = 1
+DEFAULT_RSSI = 100
+
+
+def _intern(values, default):
+    """(codes, labels) for a sequence of strings; codes are int8 where they fit."""
+    table = {}
+    codes = np.fromiter((table.setdefault(default if v is None else v, len(table)) for v in values),
+                        dtype=np.int16, count=len(values))
+    labels = list(table) or [default]
+    if len(labels) <= np.iinfo(np.int8).max:
+        codes = codes.astype(np.int8)
+    return codes, labels
+
+
+def _column(values, dtype, n):
+    """A per-reading column; a single value is repeated, an array of the right dtype is not copied."""
+    values = np.asarray(values, dtype=dtype)
+    if values.ndim == 0:
+        return np.full(n, values, dtype=dtype)
+    if values.shape != (n,):
+        raise ValueError(f'expected {n} values per column, got shape {values.shape}')
+    return np.ascontiguousarray(values)
+
+
+def _number(value):
+    """A stored float back to the int it was read as, where it was one."""
+    return int(value) if value.is_integer() else round(value, 3)
+
+
+class GlucoseSeries(object):
+    """
+    CGM readings as columns.
+
+    Args:
+        date: (n,) epoch ms reading times
+        glucose: (n,) mg/dL
+        direction: Trend arrow per reading, a single label, or None for Flat
+        noise: (n,) noise levels or a single level
+        device: Device per reading or a single label
+        rssi: (n,) signal strengths or a single value
+        filtered, unfiltered: (n,) raw sensor values; None when they equal glucose
+    """
+
+    def __init__(self, date, glucose, direction=None, noise=DEFAULT_NOISE, device='', rssi=DEFAULT_RSSI,
+                 filtered=None, unfiltered=None):
+        self.date = np.ascontiguousarray(date, dtype=np.int64)
+        n = len(self.date)
+        self.glucose = np.ascontiguousarray(glucose, dtype=np.float32)
+        self.noise = _column(noise, np.int8, n)
+        self.rssi = _column(rssi, np.int16, n)
+        self.direction_codes, self.directions = self._codes(direction, DEFAULT_DIRECTION, n)
+        self.device_codes, self.devices = self._codes(device, '', n)
+        self.filtered = None if filtered is None else np.ascontiguousarray(filtered, dtype=np.float32)
+        self.unfiltered = None if unfiltered is None else np.ascontiguousarray(unfiltered, dtype=np.float32)
+
+    @staticmethod
+    def _codes(values, default, n):
+        if values is None or isinstance(values, str):
+            return np.zeros(n, dtype=np.int8), [default if values is None else values]
+        if isinstance(values, tuple):  # (codes, labels) from another series
+            return values
+        return _intern(list(values), default)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from simdata/glucose.json dicts."""
+        records = list(records)
+        glucose = [r.get('glucose', r.get('sgv')) for r in records]
+        filtered = [r.get('filtered', g) for r, g in zip(records, glucose)]
+        unfiltered = [r.get('unfiltered', g) for r, g in zip(records, glucose)]
+        return cls(
+            [r['date'] for r in records],
+            glucose,
+            direction=[r.get('direction') for r in records],
+            noise=[r.get('noise', DEFAULT_NOISE) for r in records],
+            device=[r.get('device', '') for r in records],
+            rssi=[r.get('rssi', DEFAULT_RSSI) for r in records],
+            filtered=None if filtered == glucose else filtered,
+            unfiltered=None if unfiltered == glucose else unfiltered,
+        )
+
+    @classmethod
+    def concat(cls, parts):
+        """One series from several, e.g. a loader's per-file results."""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls([], [])
+        if len(parts) == 1:
+            return parts[0]
+
+        def labels(attr, codes_attr):
+            table, codes = {}, []
+            for p in parts:
+                remap = np.array([table.setdefault(label, len(table)) for label in getattr(p, attr)], dtype=np.int16)
+                codes.append(remap[getattr(p, codes_attr)])
+            codes = np.concatenate(codes)
+            return codes.astype(np.int8) if len(table) <= np.iinfo(np.int8).max else codes, list(table)
+
+        def raw(attr):
+            if all(getattr(p, attr) is None for p in parts):
+                return None
+            return np.concatenate([p.glucose if getattr(p, attr) is None else getattr(p, attr) for p in parts])
+
+        return cls(
+            np.concatenate([p.date for p in parts]),
+            np.concatenate([p.glucose for p in parts]),
+            direction=labels('directions', 'direction_codes'),
+            noise=np.concatenate([p.noise for p in parts]),
+            device=labels('devices', 'device_codes'),
+            rssi=np.concatenate([p.rssi for p in parts]),
+            filtered=raw('filtered'),
+            unfiltered=raw('unfiltered'),
+        )
+
+    def __len__(self):
+        return len(self.date)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or isinstance(index, np.ndarray):
+            return self.take(index)
+        return self._record(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._record(i)
+
+    def take(self, index):
+        """
+        A new series of the readings at index (slice, mask or positions).
+        A slice shares the columns' memory instead of copying them.
+        """
+        return GlucoseSeries(
+            self.date[index],
+            self.glucose[index],
+            direction=(self.direction_codes[index], self.directions),
+            noise=self.noise[index],
+            device=(self.device_codes[index], self.devices),
+            rssi=self.rssi[index],
+            filtered=None if self.filtered is None else self.filtered[index],
+            unfiltered=None if self.unfiltered is None else self.unfiltered[index],
+        )
+
+    def sorted(self):
+        """The series in date order (self if it already is)."""
+        if len(self) < 2 or np.all(self.date[1:] >= self.date[:-1]):
+            return self
+        return self.take(np.argsort(self.date, kind='stable'))
+
+    @property
+    def nbytes(self):
+        arrays = [self.date, self.glucose, self.noise, self.rssi, self.direction_codes, self.device_codes,
+                  self.filtered, self.unfiltered]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def _record(self, i):
+        glucose = _number(float(self.glucose[i]))
+        return {
+            'date': int(self.date[i]),
+            'glucose': glucose,
+            'sgv': glucose,
+            'direction': self.directions[self.direction_codes[i]],
+            'noise': int(self.noise[i]),
+            'filtered': glucose if self.filtered is None else _number(float(self.filtered[i])),
+            'unfiltered': glucose if self.unfiltered is None else _number(float(self.unfiltered[i])),
+            'rssi': int(self.rssi[i]),
+            'device': self.devices[self.device_codes[i]],
+        }
+
+    def arrays(self):
+        """Every column as a NumPy array (labels as str arrays), e.g. for np.savez."""
+        arrays = {
+            'date': self.date,
+            'glucose': self.glucose,
+            'noise': self.noise,
+            'rssi': self.rssi,
+            'direction_codes': self.direction_codes,
+            'directions': np.array(self.directions, dtype=str),
+            'device_codes': self.device_codes,
+            'devices': np.array(self.devices, dtype=str),
+        }
+        for name in ('filtered', 'unfiltered'):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of arrays(); works on an open np.load() archive."""
+        return cls(
+            arrays['date'],
+            arrays['glucose'],
+            direction=(arrays['direction_codes'], arrays['directions'].tolist()),
+            noise=arrays['noise'],
+            device=(arrays['device_codes'], arrays['devices'].tolist()),
+            rssi=arrays['rssi'],
+            filtered=arrays['filtered'] if 'filtered' in arrays else None,
+            unfiltered=arrays['unfiltered'] if 'unfiltered' in arrays else None,
+        )
+
+    def to_records(self):
+        """The readings as simdata/glucose.json dicts."""
+        return list(self)
+
+
+def as_series(glucose_data):
+    """A date-sorted GlucoseSeries from a series or a list of glucose.json dicts."""
+    if not isinstance(glucose_data, GlucoseSeries):
+        glucose_data = GlucoseSeries.from_records(glucose_data)
+    return glucose_data.sorted()
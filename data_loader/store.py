@@ -0,0 +1,179 @@
+"""
+Memory-mapped CGM store for corpora too large to hold in RAM.
+
+A store is a directory of fixed-width column files, date.i64 (epoch ms)
+and glucose.f32 (mg/dL), plus index.json, which maps each subject to its
+segments: (offset, length, first and last date) runs of rows in the
+columns, and optionally to the fingerprint of the file it was read from.
+Appends only ever add rows at the end; removing a subject only drops it
+from the index, leaving its rows unreferenced until compact() rewrites
+the columns without them. Reads open the columns
+with np.memmap, so a subject or a time range of one is a view onto the
+file and only the pages touched are read.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .series import GlucoseSeries
+
+COLUMNS = (('date', np.int64), ('glucose', np.float32))
+INDEX_FILE = 'index.json'
+
+
+class CGMStore(object):
+    """
+    Append-only on-disk CGM columns with a per-subject offset index.
+
+    Args:
+        path: Store directory (created if missing)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.index = {'length': 0, 'subjects': {}}
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+        self._maps = None
+
+    def _column_path(self, name, dtype):
+        return os.path.join(self.path, f'{name}.{np.dtype(dtype).kind}{np.dtype(dtype).itemsize * 8}')
+
+    def __len__(self):
+        return self.index['length']
+
+    def __contains__(self, subject):
+        return subject in self.index['subjects']
+
+    @property
+    def subjects(self):
+        return list(self.index['subjects'])
+
+    def columns(self):
+        """The whole corpus as read-only memmaps: {'date': ..., 'glucose': ...}."""
+        if self._maps is None:
+            n = len(self)
+            self._maps = {
+                name: (np.memmap(self._column_path(name, dtype), dtype=dtype, mode='r', shape=(n,)) if n
+                       else np.zeros(0, dtype=dtype))
+                for name, dtype in COLUMNS
+            }
+        return self._maps
+
+    def fingerprint(self, subject):
+        """Fingerprint recorded with the subject's last append (None if none was)."""
+        return self.index.get('fingerprints', {}).get(subject)
+
+    def remove(self, subject):
+        """Drop a subject from the index; its rows stay in the column files."""
+        self.index['subjects'].pop(subject, None)
+        self.index.get('fingerprints', {}).pop(subject, None)
+        self._write_index()
+
+    def compact(self):
+        """
+        Rewrite the columns keeping only rows the index still references,
+        each subject's segments merged into one. Returns the rows dropped.
+        Like append(), it must not run while another process uses the store.
+        """
+        before = len(self)
+        subjects, offset = {}, 0
+        parts = {name: [] for name, _ in COLUMNS}
+        for subject in self.subjects:
+            dates, glucose = self.read(subject)
+            if not len(dates):
+                continue
+            parts['date'].append(np.asarray(dates))
+            parts['glucose'].append(np.asarray(glucose))
+            subjects[subject] = [[offset, len(dates), int(dates[0]), int(dates[-1])]]
+            offset += len(dates)
+        self._maps = None
+        for name, dtype in COLUMNS:
+            path = self._column_path(name, dtype)
+            with open(f'{path}.tmp', 'wb') as f:
+                for part in parts[name]:
+                    part.astype(dtype, copy=False).tofile(f)
+        for name, dtype in COLUMNS:
+            path = self._column_path(name, dtype)
+            os.replace(f'{path}.tmp', path)
+        self.index['subjects'] = subjects
+        self.index['length'] = offset
+        self._write_index()
+        return before - offset
+
+    def append(self, subject, date, glucose, fingerprint=None):
+        """
+        Add one subject's readings (sorted by date here) as a new segment.
+        A subject appended again gets another segment; nothing is rewritten.
+        fingerprint (e.g. cache.fingerprint() of the source file) is kept
+        in the index so callers can tell when the source has changed.
+        """
+        date = np.asarray(date, dtype=np.int64)
+        order = np.argsort(date, kind='stable')
+        values = {'date': date[order], 'glucose': np.asarray(glucose, dtype=np.float32)[order]}
+        if not len(date):
+            return
+        offset = len(self)
+        for name, dtype in COLUMNS:
+            path = self._column_path(name, dtype)
+            with open(path, 'ab') as f:
+                # Drop rows a failed append wrote past the index
+                f.truncate(offset * np.dtype(dtype).itemsize)
+                values[name].tofile(f)
+        self.index['subjects'].setdefault(subject, []).append(
+            [offset, len(date), int(values['date'][0]), int(values['date'][-1])])
+        self.index['length'] = offset + len(date)
+        if fingerprint is not None:
+            self.index.setdefault('fingerprints', {})[subject] = fingerprint
+        self._write_index()
+        self._maps = None
+
+    def append_series(self, subject, series, fingerprint=None):
+        self.append(subject, series.date, series.glucose, fingerprint)
+
+    def _write_index(self):
+        path = os.path.join(self.path, INDEX_FILE)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, path)
+
+    def segments(self, subject, start_ms=None, end_ms=None):
+        """
+        (date, glucose) memmap views of each of a subject's segments, cut to
+        start_ms <= date < end_ms by binary search.
+        """
+        cols = self.columns()
+        views = []
+        for offset, length, first, last in self.index['subjects'].get(subject, []):
+            if (end_ms is not None and first >= end_ms) or (start_ms is not None and last < start_ms):
+                continue
+            dates = cols['date'][offset:offset + length]
+            lo = 0 if start_ms is None else np.searchsorted(dates, start_ms)
+            hi = length if end_ms is None else np.searchsorted(dates, end_ms)
+            views.append((dates[lo:hi], cols['glucose'][offset + lo:offset + hi]))
+        return views
+
+    def read(self, subject, start_ms=None, end_ms=None):
+        """
+        A subject's (date, glucose) in [start_ms, end_ms). Zero-copy views
+        when it lies in one segment; segments are concatenated otherwise.
+        """
+        views = self.segments(subject, start_ms, end_ms)
+        if len(views) == 1:
+            return views[0]
+        if not views:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        dates = np.concatenate([d for d, _ in views])
+        order = np.argsort(dates, kind='stable')
+        return dates[order], np.concatenate([g for _, g in views])[order]
+
+    def series(self, subject, start_ms=None, end_ms=None, device=''):
+        """read() as a GlucoseSeries, for code that takes loader output."""
+        dates, glucose = self.read(subject, start_ms, end_ms)
+        return GlucoseSeries(dates, glucose, device=device or subject)
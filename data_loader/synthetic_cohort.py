@@ -0,0 +1,135 @@
+"""
+Sharded synthetic cohort generator.
+
+N patients x M days are split into shards of a few patients each. Every
+shard is generated by a pool worker and written straight to disk as one
+compressed .npz (columns for all its patients plus per-patient offsets),
+so at most one shard per worker is in memory at a time. Each patient's
+data depends only on the cohort seed and the patient's index, never on
+the sharding or pool size. manifest.json lists the shards.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .series import GlucoseSeries
+from .synthetic_data import DIRECTIONS, TICK_MS, _load_profile, insulin_labels, synthesize
+
+MANIFEST_FILE = 'manifest.json'
+PATIENTS_PER_SHARD = 50
+READINGS_PER_DAY = 24 * 60 * 60 * 1000 // TICK_MS
+VARIABILITY = 0.2  # spread of per-patient ISF and carb ratio around the profile
+
+
+def _patient_rng(seed, patient):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(patient,)))
+
+
+def _write_shard(path, first_patient, n_patients, days, start_ms, profile, seed):
+    """Worker: generate patients [first_patient, first_patient + n_patients) into one shard."""
+    n_points = int(days * READINGS_PER_DAY)
+    columns = {name: [] for name in ('date', 'glucose', 'direction_codes', 'noise', 'insulin')}
+    isf = np.empty(n_patients)
+    carb_ratio = np.empty(n_patients)
+    for i in range(n_patients):
+        rng = _patient_rng(seed, first_patient + i)
+        isf[i], carb_ratio[i] = np.array([profile['sens'], profile['carb_ratio']]) * np.clip(
+            rng.normal(1, VARIABILITY, 2), 0.5, 1.5)
+        series = synthesize(rng, n_points, start_ms, isf[i], carb_ratio[i], utc_offset_minutes=0)
+        columns['date'].append(series.date)
+        columns['glucose'].append(series.glucose)
+        columns['direction_codes'].append(series.direction_codes)
+        columns['noise'].append(series.noise)
+        columns['insulin'].append(insulin_labels(rng, series.glucose.astype(np.float64), profile['target_bg'],
+                                                 isf[i], carb_ratio[i]).astype(np.float32))
+    arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+    arrays['offsets'] = np.arange(n_patients + 1, dtype=np.int64) * n_points
+    arrays['patients'] = np.arange(first_patient, first_patient + n_patients, dtype=np.int64)
+    arrays['isf'] = isf
+    arrays['carb_ratio'] = carb_ratio
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+    return {
+        'file': os.path.basename(path),
+        'first_patient': first_patient,
+        'patients': n_patients,
+        'readings': n_patients * n_points,
+        'bytes': os.path.getsize(path),
+    }
+
+
+def generate_cohort(output_dir, simdata_dir, n_patients, days, patients_per_shard=PATIENTS_PER_SHARD,
+                    processes=None, seed=0, start_ms=None):
+    """
+    Write a synthetic cohort as compressed shards plus manifest.json.
+
+    Args:
+        output_dir: Directory for shard-NNNNN.npz files and the manifest
+        simdata_dir: Where profile.json is read from (defaults otherwise)
+        n_patients, days: Cohort size; every patient gets days of 5-minute readings
+        patients_per_shard: Patients per shard (and per worker task)
+        processes: Pool size (default: CPU count); 1 generates in this process
+        seed: Cohort seed
+        start_ms: Time of everyone's first reading (default: midnight UTC, days ago)
+
+    Returns:
+        The manifest dict
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    profile = _load_profile(simdata_dir)
+    if start_ms is None:
+        day_ms = READINGS_PER_DAY * TICK_MS
+        start_ms = (int(time.time() * 1000) // day_ms - int(np.ceil(days))) * day_ms
+    firsts = list(range(0, n_patients, patients_per_shard))
+    tasks = [(os.path.join(output_dir, f'shard-{i:05d}.npz'), first, min(patients_per_shard, n_patients - first),
+              days, start_ms, profile, seed) for i, first in enumerate(firsts)]
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        shards = [_write_shard(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            shards = list(executor.map(_write_shard, *zip(*tasks)))
+
+    manifest = {
+        'patients': n_patients,
+        'days': days,
+        'seed': seed,
+        'start_ms': start_ms,
+        'readings': sum(s['readings'] for s in shards),
+        'bytes': sum(s['bytes'] for s in shards),
+        'directions': list(DIRECTIONS),
+        'profile': profile,
+        'shards': shards,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def iter_cohort(output_dir):
+    """
+    Read a cohort back one shard at a time.
+
+    Yields:
+        (patient index, GlucoseSeries, insulin labels) per patient
+    """
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    directions = manifest['directions']
+    for shard in manifest['shards']:
+        with np.load(os.path.join(output_dir, shard['file'])) as arrays:
+            columns = {name: arrays[name] for name in arrays.files}
+        offsets = columns['offsets']
+        for i, patient in enumerate(columns['patients'].tolist()):
+            lo, hi = offsets[i], offsets[i + 1]
+            series = GlucoseSeries(columns['date'][lo:hi], columns['glucose'][lo:hi],
+                                   direction=(columns['direction_codes'][lo:hi], directions),
+                                   noise=columns['noise'][lo:hi], device='synthetic')
+            yield patient, series, columns['insulin'][lo:hi]
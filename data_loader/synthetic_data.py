@@ -2,34 +2,128 @@
 Generate synthetic T1D data based on typical physiological parameters.
 Used when no external dataset (AZT1D, OhioT1DM, etc.) is available.
 Parameters are derived from profile.json and typical T1D ranges.
+
+Glucose is an AR(1) process around a mean (so consecutive readings are
+correlated the way CGM data is) plus an excursion after each of three
+daily meals. Every step is a whole-array NumPy operation driven by one
+seeded Generator, so a million points take a fraction of a second.
 """
 
-import json
 import os
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import numpy as np
+
+from .profile import Profile
+from .series import GlucoseSeries
+from .timeutil import TICK_MINUTES, TICK_MS
+
+MEAN_BG = 120
+AR_PHI = 0.99  # correlation between consecutive 5-minute readings
+AR_SD = 25  # mg/dL around the mean
+AR_BLOCK = 512
+AR_MAX_GROWTH = 300  # natural log of the largest phi**-k a block may reach
+MEALS = ((7, 45), (12.5, 60), (19, 70))  # (hour, grams)
+MEAL_JITTER_MINUTES = 45
+MEAL_PEAK_MINUTES = 60
+MEAL_PEAK_FRACTION = 0.3  # of the unbolused rise (carbs * ISF / CR) seen at the peak
+# Dexcom trend arrows by rate (mg/dL/min); see simulator.physiology._direction
+DIRECTIONS = ('DoubleDown', 'SingleDown', 'FortyFiveDown', 'Flat', 'FortyFiveUp', 'SingleUp', 'DoubleUp')
 
 
 def _load_profile(simdata_dir):
     """Load profile from simdata or use defaults."""
     profile_path = os.path.join(simdata_dir, 'profile.json')
-    defaults = {
-        'target_bg': 110,
-        'sens': 50,  # ISF: 1 unit drops glucose by 50 mg/dL
-        'carb_ratio': 10,  # 1 unit per 10g carbs
-        'min_bg': 70,
-        'max_bg': 180,
-    }
-    if os.path.exists(profile_path):
-        with open(profile_path) as f:
-            p = json.load(f)
-            defaults['target_bg'] = p.get('target_bg', p.get('min_bg', 110))
-            defaults['sens'] = p.get('sens', 50)
-            cr = p.get('carb_ratio', [{'ratio': 10}])
-            defaults['carb_ratio'] = cr[0]['ratio'] if isinstance(cr, list) else cr
-            defaults['min_bg'] = p.get('min_bg', 70)
-            defaults['max_bg'] = p.get('max_bg', 180)
-    return defaults
+    profile = Profile.load(profile_path) if os.path.exists(profile_path) else Profile()
+    params = profile.params()
+    params['min_bg'] = profile.min_bg
+    params['max_bg'] = profile.max_bg
+    params['utc_offset_minutes'] = profile.utc_offset_minutes
+    return params
+
+
+def ar1(rng, n, phi=AR_PHI, sd=AR_SD, block=AR_BLOCK):
+    """
+    Stationary AR(1) series x[t] = phi * x[t-1] + e[t] with standard deviation sd.
+    Solved in closed form a block at a time: within a block,
+    x[j] = phi**j * (phi * x_prev + cumsum(e[k] / phi**k)). Blocks are
+    shortened for small phi so that phi**-block stays finite.
+    """
+    eps = rng.normal(0, sd * np.sqrt(1 - phi ** 2), n)
+    if not n or phi == 0:
+        return eps
+    eps[0] = rng.normal(0, sd)  # x[0] from the stationary distribution
+    block = int(max(1, min(block, AR_MAX_GROWTH / -np.log(abs(phi)))))
+    out = np.empty(n)
+    steps = np.arange(block)
+    decay = phi ** steps
+    growth = phi ** -steps.astype(np.float64)
+    last = 0.0
+    for start in range(0, n, block):
+        e = eps[start:start + block]
+        m = len(e)
+        out[start:start + m] = decay[:m] * (phi * last + np.cumsum(e * growth[:m]))
+        last = out[start + m - 1]
+    return out
+
+
+def meal_carbs(rng, dates, utc_offset_minutes):
+    """Grams eaten at each reading: MEALS every local day, with timing jitter and 25% size spread."""
+    carbs = np.zeros(len(dates))
+    if not len(dates):
+        return carbs
+    offset_ms = utc_offset_minutes * 60000
+    day_ms = 24 * 3600 * 1000
+    days = np.arange((dates[0] + offset_ms) // day_ms, (dates[-1] + offset_ms) // day_ms + 1)
+    hours = np.array([hour for hour, _ in MEALS])
+    grams = np.array([g for _, g in MEALS], dtype=np.float64)
+    shape = (len(days), len(MEALS))
+    at = (days[:, None] * day_ms - offset_ms + hours[None, :] * 3600000
+          + rng.normal(0, MEAL_JITTER_MINUTES, shape) * 60000)
+    size = np.maximum(0, grams[None, :] * rng.normal(1, 0.25, shape))
+    idx = np.round((at - dates[0]) / TICK_MS).astype(np.int64).ravel()
+    ok = (idx >= 0) & (idx < len(dates))
+    np.add.at(carbs, idx[ok], size.ravel()[ok])
+    return carbs
+
+
+def meal_excursion(carbs, isf, carb_ratio):
+    """BG rise (mg/dL) from bolused meals: a gamma-shaped bump peaking MEAL_PEAK_MINUTES after each."""
+    ticks = np.arange(6 * MEAL_PEAK_MINUTES // TICK_MINUTES)
+    tp = MEAL_PEAK_MINUTES / TICK_MINUTES
+    kernel = MEAL_PEAK_FRACTION * (ticks / tp) * np.exp(1 - ticks / tp)
+    return np.convolve(carbs * isf / carb_ratio, kernel)[:len(carbs)]
+
+
+def trend_directions(glucose):
+    """Trend arrow index into DIRECTIONS from each reading's 5-minute delta."""
+    rate = np.diff(glucose, prepend=glucose[:1]) / TICK_MINUTES
+    return np.select([rate <= -3, rate <= -2, rate <= -1, rate < 1, rate < 2, rate < 3], range(6), 6)
+
+
+def synthesize(rng, n_points, start_ms, isf, carb_ratio, utc_offset_minutes=0):
+    """n_points 5-minute readings from start_ms as a GlucoseSeries; meals follow UTC+utc_offset_minutes."""
+    dates = start_ms + np.arange(n_points, dtype=np.int64) * TICK_MS
+    carbs = meal_carbs(rng, dates, utc_offset_minutes)
+    glucose = MEAN_BG + ar1(rng, n_points) + meal_excursion(carbs, isf, carb_ratio)
+    glucose = np.clip(np.round(glucose), 40, 400)
+
+    codes = trend_directions(glucose)
+    noise = np.where((glucose >= 70) & (glucose <= 180), 1, 2)
+    return GlucoseSeries(dates, glucose, direction=(codes.astype(np.int8), list(DIRECTIONS)),
+                         noise=noise, device='synthetic')
+
+
+def insulin_labels(rng, glucose, target_bg, isf, carb_ratio):
+    """
+    Insulin for each glucose value: correction + optional meal component
+    when above target (0-20g carbs equivalent 30% of the time), a small
+    basal-like amount when in/low range.
+    """
+    n = len(glucose)
+    extra_carbs = np.where(rng.random(n) < 0.3, rng.random(n) * 20, 0)
+    correction = (glucose - target_bg) / isf + extra_carbs / carb_ratio + rng.normal(0, 0.1, n)
+    return np.maximum(0, np.where(glucose > target_bg, correction, rng.normal(0.05, 0.02, n)))
 
 
 def generate_synthetic_t1d_data(
@@ -37,6 +131,8 @@ def generate_synthetic_t1d_data(
     n_glucose_points=500,
     n_training_pairs=200,
     seed=None,
+    start_ms=None,
+    utc_offset_minutes=None,
 ):
     """
     Generate synthetic glucose and insulin data using T1D parameters.
@@ -45,62 +141,32 @@ def generate_synthetic_t1d_data(
         correction_bolus = (glucose - target_bg) / ISF
     with added variation to simulate real-world behavior.
 
+    Args:
+        seed: Seed for the NumPy Generator; equal seeds give equal data
+        start_ms: Time of the first reading (default: ending now)
+        utc_offset_minutes: Local time the meals follow (default: the
+            simdata profile's offset, UTC unless it sets one)
+
     Returns:
-        glucose_data: List of dicts in simdata/glucose.json format
+        glucose_data: GlucoseSeries (to_records() gives simdata/glucose.json dicts)
         training_pairs: List of (glucose, insulin) tuples for model training
         profile_params: Dict with target_bg, sens, carb_ratio
     """
-    if seed is not None:
-        random.seed(seed)
+    rng = np.random.default_rng(seed)
 
     profile = _load_profile(simdata_dir)
     target_bg = profile['target_bg']
     isf = profile['sens']  # Insulin Sensitivity Factor
     carb_ratio = profile['carb_ratio']
 
-    # Generate glucose values (typical range 60-250 mg/dL with most in 80-180)
-    base_time = int(datetime.now().timestamp() * 1000) - (n_glucose_points * 5 * 60 * 1000)
-    glucose_data = []
-    training_pairs = []
-
-    for i in range(n_glucose_points):
-        # Glucose with realistic distribution: mostly 80-160, some excursions
-        r = random.random()
-        if r < 0.7:
-            glucose = random.gauss(120, 25)
-        elif r < 0.9:
-            glucose = random.gauss(180, 30)  # Hyperglycemia
-        else:
-            glucose = random.gauss(75, 15)  # Near hypoglycemia
-
-        glucose = max(40, min(400, round(glucose)))
-        ts = base_time + i * 5 * 60 * 1000  # 5-min intervals
-
-        direction = random.choice(['Flat', 'FortyFiveUp', 'FortyFiveDown', 'SingleUp', 'SingleDown'])
-        glucose_data.append({
-            'date': ts,
-            'glucose': glucose,
-            'sgv': glucose,
-            'direction': direction,
-            'noise': 1 if 70 <= glucose <= 180 else 2,
-            'filtered': glucose,
-            'unfiltered': glucose,
-            'rssi': 100,
-            'device': 'synthetic',
-        })
-
-        # Training pairs: insulin = correction + optional meal component
-        # Correction: (glucose - target) / ISF when above target
-        if glucose > target_bg:
-            correction = (glucose - target_bg) / isf
-            # Add small random meal component (0-20g carbs equivalent)
-            meal_carbs = random.random() * 20 if random.random() < 0.3 else 0
-            meal_bolus = meal_carbs / carb_ratio
-            insulin = max(0, correction + meal_bolus + random.gauss(0, 0.1))
-        else:
-            insulin = max(0, random.gauss(0.05, 0.02))  # Small basal-like amount when in/low range
-
-        if i < n_training_pairs:
-            training_pairs.append((float(glucose), float(insulin)))
+    if start_ms is None:
+        start_ms = int(datetime.now().timestamp() * 1000) - (n_glucose_points * TICK_MS)
+    if utc_offset_minutes is None:
+        utc_offset_minutes = profile['utc_offset_minutes']
+    glucose_data = synthesize(rng, n_glucose_points, start_ms, isf, carb_ratio, utc_offset_minutes)
+
+    g = glucose_data.glucose[:n_training_pairs].astype(np.float64)
+    insulin = insulin_labels(rng, g, target_bg, isf, carb_ratio)
+    training_pairs = list(zip(g.tolist(), insulin.tolist()))
 
     return glucose_data, training_pairs, profile
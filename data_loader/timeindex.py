@@ -0,0 +1,81 @@
+"""
+Time-indexed window queries.
+
+Consumers kept re-filtering readings by date in Python loops. TimeIndex
+wraps a date-sorted series (or a sorted array of times) once and answers
+"last N hours", "range [a, b)" and "nearest reading to t" by binary search
+over the int64 date column. Windows are slices, so the readings returned
+are views of the series' columns, not copies. Bounds and nearest() also
+take arrays of times, answering one query per tick in a single call.
+"""
+
+import numpy as np
+
+from .series import GlucoseSeries, as_series
+
+HOUR_MS = 60 * 60 * 1000
+
+
+class TimeIndex(object):
+    """
+    Binary-search index over reading times.
+
+    Args:
+        data: GlucoseSeries or list of glucose.json records (sorted here if
+            needed), or an array of epoch ms times, which must already be sorted
+    """
+
+    def __init__(self, data):
+        if isinstance(data, (GlucoseSeries, list)):
+            self.series = as_series(data)
+            self.dates = self.series.date
+        else:
+            self.series = None
+            self.dates = np.ascontiguousarray(data, dtype=np.int64)
+            if np.any(self.dates[1:] < self.dates[:-1]):
+                raise ValueError('TimeIndex needs times in ascending order')
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _window(self, lo, hi):
+        window = slice(int(lo), int(hi))
+        return self.dates[window] if self.series is None else self.series[window]
+
+    def bounds(self, start_ms=None, end_ms=None):
+        """(lo, hi) positions of the readings with start_ms <= date < end_ms; arrays give arrays."""
+        lo = 0 if start_ms is None else np.searchsorted(self.dates, start_ms)
+        hi = len(self.dates) if end_ms is None else np.searchsorted(self.dates, end_ms)
+        return lo, hi
+
+    def range(self, start_ms=None, end_ms=None):
+        """Readings with start_ms <= date < end_ms (None leaves that side open), as views."""
+        return self._window(*self.bounds(start_ms, end_ms))
+
+    def last(self, hours, at_ms=None):
+        """
+        Readings in the hours up to and including at_ms (default: the
+        latest reading), i.e. at_ms - hours < date <= at_ms, as views.
+        """
+        if at_ms is None:
+            if not len(self.dates):
+                return self._window(0, 0)
+            at_ms = self.dates[-1]
+        lo, hi = np.searchsorted(self.dates, [at_ms - int(hours * HOUR_MS), at_ms], side='right')
+        return self._window(lo, hi)
+
+    def nearest(self, at_ms, tolerance_ms=None):
+        """
+        Position of the reading closest to at_ms (the later one on a tie),
+        or -1 if there are no readings or the closest is further away than
+        tolerance_ms. An array of times gives an array of positions.
+        """
+        at = np.asarray(at_ms, dtype=np.int64)
+        if not len(self.dates):
+            return np.full(at.shape, -1, dtype=np.int64) if at.ndim else -1
+        after = np.clip(np.searchsorted(self.dates, at), 0, len(self.dates) - 1)
+        before = np.maximum(after - 1, 0)
+        closest = np.where(np.abs(self.dates[before] - at) < np.abs(self.dates[after] - at), before, after)
+        if tolerance_ms is not None:
+            closest = np.where(np.abs(self.dates[closest] - at) <= tolerance_ms, closest, -1)
+        return closest if at.ndim else int(closest)
@@ -0,0 +1,51 @@
+"""
+Tick size and timestamp helpers shared by the loaders and the simulator.
+Timestamps are epoch milliseconds, as in simdata/glucose.json.
+"""
+
+from datetime import datetime, timezone
+
+TICK_MINUTES = 5
+TICK_MS = TICK_MINUTES * 60 * 1000
+
+
+def iso(ms):
+    """Epoch ms to an ISO-8601 UTC string ending in Z."""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def parse_timestamp(value, formats=()):
+    """
+    Epoch ms from a dataset timestamp string, or None if it cannot be read.
+    Accepts epoch seconds or ms, ISO-8601 and any of the strptime formats;
+    times without a zone are taken as UTC.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+        return int(number if number > 1e11 else number * 1000)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in formats:
+            try:
+                dt = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def parse_ms(value):
+    """Accept epoch ms or an ISO string (as used in pumphistory/currenttemp)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
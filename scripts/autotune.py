@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tune the pump profile to glucose history, autotune-style.
+Fits the hourly basal schedule, ISF and carb ratio from the readings the
+data loaders provide, the pump history and (optionally) carb treatments,
+preparing days in parallel, and writes the tuned profile.json.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from data_loader import load_simdata
+from simulator.autotune import autotune, write_profile
+
+
+def _load_json(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profile', default=os.path.join(root, 'simdata', 'profile.json'),
+                        help='Pump profile to start from (also bounds the tuning)')
+    parser.add_argument('--pumphistory', default=os.path.join(root, 'simdata', 'pumphistory.json'))
+    parser.add_argument('--carbs', default=None, help='JSON list of treatments with carbs')
+    parser.add_argument('--processes', type=int, default=None, help='Process pool size (default: CPU count)')
+    parser.add_argument('--rounds', type=int, default=3, help='Tuning steps over the whole history')
+    parser.add_argument('--output', default=os.path.join(root, 'autotune', 'profile.json'))
+    args = parser.parse_args()
+
+    profile = _load_json(args.profile)
+    if profile is None:
+        parser.error(f'profile not found: {args.profile}')
+    glucose_data, _, _ = load_simdata(root)
+    started = time.time()
+    tuned, stats = autotune(glucose_data, profile, _load_json(args.pumphistory), _load_json(args.carbs),
+                            processes=args.processes, rounds=args.rounds)
+    write_profile(tuned, args.output)
+
+    days = stats['days'] if stats else 0
+    print(f"Tuned {days} days of {len(glucose_data)} readings in {time.time() - started:.1f}s")
+    print(f"ISF: {profile.get('sens')} -> {tuned.get('sens')}")
+    print(f"Basal: {', '.join(str(b['rate']) for b in tuned.get('basalprofile', []))}")
+    print(f"Tuned profile written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
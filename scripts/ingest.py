@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Ingest every subject under data/external/ across a process pool.
+Parses each AZT1D/OhioT1DM subject file once (unchanged files come from
+data/cache/) and appends the subjects to a memory-mapped CGM store.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from data_loader.ingest import ingest
+from data_loader.store import CGMStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--external', default=os.path.join(root, 'data', 'external'))
+    parser.add_argument('--cache', default=os.path.join(root, 'data', 'cache'))
+    parser.add_argument('--store', default=os.path.join(root, 'data', 'store'))
+    parser.add_argument('--processes', type=int, default=None, help='Process pool size (default: CPU count)')
+    args = parser.parse_args()
+
+    started = time.time()
+    results = ingest(args.external, args.cache, CGMStore(args.store), processes=args.processes)
+    failed = [(task, error) for task, _, _, error in results if error]
+    readings = sum(len(series) for _, series, _, error in results if error is None)
+
+    print(f"Ingested {len(results) - len(failed)} subjects ({readings} readings) in {time.time() - started:.1f}s")
+    for task, error in failed:
+        print(f"Failed {task['path']}: {error}")
+    print(f"Store written to {args.store}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,30 +3,55 @@
 Populate simdata/ with synthetic T1D data.
 Use this when you don't have access to real datasets (AZT1D, OhioT1DM, etc.)
 or want to test with richer data than the default 3-point static file.
+With --patients, writes a whole synthetic cohort instead: compressed shards
+generated in parallel workers, plus a manifest, under --output.
 """
 
+import argparse
 import json
 import os
 import sys
+import time
 
 # Add project root to path
 root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, root)
 
+from data_loader.synthetic_cohort import PATIENTS_PER_SHARD, generate_cohort
 from data_loader.synthetic_data import generate_synthetic_t1d_data
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--patients', type=int, default=None, help='Generate a cohort of this many patients')
+    parser.add_argument('--days', type=float, default=14, help='Days of readings per cohort patient')
+    parser.add_argument('--shard-patients', type=int, default=PATIENTS_PER_SHARD, help='Patients per shard')
+    parser.add_argument('--processes', type=int, default=None, help='Process pool size (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=os.path.join(root, 'data', 'synthetic'), help='Cohort directory')
+    args = parser.parse_args()
+
     simdata_dir = os.path.join(root, 'simdata')
+    if args.patients:
+        started = time.time()
+        manifest = generate_cohort(args.output, simdata_dir, args.patients, args.days,
+                                   patients_per_shard=args.shard_patients, processes=args.processes,
+                                   seed=args.seed or 0)
+        print(f"Wrote {manifest['readings']} readings for {args.patients} patients in "
+              f"{len(manifest['shards'])} shards ({manifest['bytes'] / 1e6:.1f} MB) in {time.time() - started:.1f}s")
+        print(f"Manifest: {os.path.join(args.output, 'manifest.json')}")
+        return
+
     glucose_data, training_pairs, profile = generate_synthetic_t1d_data(
         simdata_dir,
         n_glucose_points=500,
         n_training_pairs=400,
+        seed=args.seed,
     )
 
     glucose_path = os.path.join(simdata_dir, 'glucose.json')
     with open(glucose_path, 'w') as f:
-        json.dump(glucose_data, f, indent=2)
+        json.dump(glucose_data.to_records(), f, indent=2)
 
     print(f"Wrote {len(glucose_data)} glucose readings to {glucose_path}")
     print(f"Profile: target_bg={profile['target_bg']}, sens={profile['sens']}, carb_ratio={profile['carb_ratio']}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Record oref0's decisions for the determine-basal test fixtures.
+Runs every case of tests/fixtures/determine_basal.json through the oref0
+submodule (one persistent Node worker) and writes what it returned to
+tests/fixtures/determine_basal_oref0.json, which the port is then tested
+against. Needs Node and the oref0 submodule checked out.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Add project root to path
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from simulator import Oref0Worker, oref0_available
+from simulator.oref0 import OREF0_DIR
+
+FIXTURES = os.path.join(root, 'tests', 'fixtures')
+RECORDED_KEYS = ('temp', 'rate', 'duration', 'eventualBG', 'reason')
+
+
+def _oref0_commit(oref0_dir):
+    try:
+        return subprocess.run(['git', '-C', oref0_dir, 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--inputs', default=os.path.join(FIXTURES, 'determine_basal.json'))
+    parser.add_argument('--output', default=os.path.join(FIXTURES, 'determine_basal_oref0.json'))
+    parser.add_argument('--oref0', default=OREF0_DIR, help='oref0 checkout to record')
+    args = parser.parse_args()
+
+    if not oref0_available(args.oref0):
+        parser.error(f'oref0 not found at {args.oref0} (is the submodule checked out?)')
+    with open(args.inputs) as f:
+        fixtures = json.load(f)
+
+    recorded = {}
+    with Oref0Worker(args.oref0) as worker:
+        for case in fixtures['cases']:
+            result = worker.determine_basal(case['glucose'], case['iob'], case['currenttemp'], fixtures['profile'],
+                                            currentTime=fixtures['currentTime'])
+            recorded[case['name']] = {key: result[key] for key in RECORDED_KEYS if key in result}
+
+    with open(args.output, 'w') as f:
+        json.dump({'oref0': _oref0_commit(args.oref0), 'cases': recorded}, f, indent=2)
+        f.write('\n')
+    print(f"Recorded {len(recorded)} oref0 decisions to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
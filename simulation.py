@@ -1,9 +1,13 @@
-import subprocess
+import argparse
 import os
-from datetime import datetime
 import json
 
-# Debug: Check for oref0-determine-basal.js existence
+from simulator import (
+    ClosedLoopSimulator, Oref0Worker, PythonDetermineBasal, ReplaySource, StubWorker, VirtualClock, WallClock,
+    WorkerError, load_inputs, write_prediction,
+)
+
+# Debug: Check for oref0 determine-basal existence
 def check_script_exists(oref0_dir, script_rel_path):
     script_abs_path = os.path.join(oref0_dir, script_rel_path)
     print(f"Checking for script at: {script_abs_path}")
@@ -17,46 +21,61 @@ def check_script_exists(oref0_dir, script_rel_path):
 root = os.path.dirname(os.path.abspath(__file__))
 simdata = os.path.join(root, 'simdata')
 pred_dir = os.path.join(root, 'predictions')
+oref0_dir = os.path.join(root, 'oref0')
 
 
+def main():
+    parser = argparse.ArgumentParser(description='Run oref0 determine-basal against simdata/.')
+    parser.add_argument('--all', action='store_true',
+                        help='Simulate every 5-minute tick of simdata/glucose.json instead of only the latest reading')
+    parser.add_argument('--output', help='With --all, write the per-tick results to this JSON file')
+    parser.add_argument('--backend', choices=['oref0', 'python', 'stub'], default='oref0',
+                        help='oref0 worker (default), in-process Python port of determine-basal, '
+                             'or the pure-Python stand-in worker')
+    parser.add_argument('--clock', choices=['virtual', 'wall'], default='virtual',
+                        help='virtual pins "now" to each simulated reading (default); wall uses system time')
+    args = parser.parse_args()
 
-# Use relative paths from oref0 directory
-oref0_dir = os.path.join(root, 'oref0')
-iob_json = os.path.relpath(os.path.join(simdata, 'iob.json'), oref0_dir)
-currenttemp_json = os.path.relpath(os.path.join(simdata, 'currenttemp.json'), oref0_dir)
-glucose_json = os.path.relpath(os.path.join(simdata, 'glucose.json'), oref0_dir)
-profile_json = os.path.relpath(os.path.join(simdata, 'profile.json'), oref0_dir)
-
-# Output file
-now = datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
-pred_file = os.path.join(pred_dir, f'prediction-{now}.json')
-
-# Command to run oref0-determine-basal.js
-oref0_script_rel = os.path.join('bin', 'oref0-determine-basal.js')
-cmd = ['node', oref0_script_rel, iob_json, currenttemp_json, glucose_json, profile_json]
-
-try:
-    # Run from the oref0 directory
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=oref0_dir)
-    output = result.stdout
-    error = result.stderr
-    '''print("--- STDOUT ---")
-    print(output)
-    print("--- STDERR ---")
-    print(error)'''
-    if result.returncode != 0:
-        print(f"oref0 script exited with code {result.returncode}")
-except Exception as e:
-    output = f"Error running oref0: {str(e)}"
-    error = ''
-
-# Write output to file
-with open(pred_file, 'w') as f:
-    f.write(output)
-
-print(f"Prediction written to {pred_file}")
-
-with open(pred_file) as f:
-    data = json.load(f)
-    print("\nPrediction File Output:")
-    print(json.dumps(data, indent=4))
+    if args.backend == 'oref0':
+        check_script_exists(oref0_dir, os.path.join('lib', 'determine-basal', 'determine-basal.js'))
+    inputs = load_inputs(simdata)
+    source = ReplaySource(inputs['glucose'])
+    start = 0 if args.all else len(source) - 1
+    clock = VirtualClock() if args.clock == 'virtual' else WallClock()
+
+    try:
+        if args.backend == 'python':
+            controller = PythonDetermineBasal()
+        else:
+            # One persistent worker serves every tick of the run
+            controller = StubWorker() if args.backend == 'stub' else Oref0Worker(oref0_dir)
+        try:
+            simulator = ClosedLoopSimulator(controller, inputs['profile'], clock=clock)
+            ticks = simulator.run(source, currenttemp=inputs['currenttemp'],
+                                  pumphistory=inputs['pumphistory'], start=start)
+        finally:
+            if hasattr(controller, 'close'):
+                controller.close()
+    except (OSError, WorkerError) as e:
+        print(f"Error running {args.backend}: {e}")
+        return
+
+    if args.all:
+        print(f"Simulated {len(ticks)} ticks")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(ticks, f)
+            print(f"Results written to {args.output}")
+        return
+
+    pred_file = write_prediction(ticks[-1]['suggested'], pred_dir, when=clock.now())
+    print(f"Prediction written to {pred_file}")
+
+    with open(pred_file) as f:
+        data = json.load(f)
+        print("\nPrediction File Output:")
+        print(json.dumps(data, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import json
 import numpy as np
 from datetime import datetime
 from tensor import create_and_train_model, predict_insulin
+from data_loader import TimeIndex, resample_series
 
 def run_simulation():
     """
@@ -23,8 +24,11 @@ def run_simulation():
     try:
         with open(glucose_file, 'r') as f:
             glucose_data = json.load(f)
-        # Get the most recent glucose reading
-        latest_glucose_reading = glucose_data[-1]['glucose']
+        # Snap to the 5-minute grid (duplicates dropped, short gaps filled)
+        # and get the most recent glucose reading by time, not file order
+        glucose_data, _ = resample_series(glucose_data)
+        recent = TimeIndex(glucose_data).last(hours=1)
+        latest_glucose_reading = recent[-1]['glucose']
         print(f"Using latest glucose reading: {latest_glucose_reading}")
     except (FileNotFoundError, IndexError, KeyError) as e:
         print(f"Error reading glucose data: {e}")
@@ -0,0 +1,36 @@
+"""
+Closed-loop insulin pump simulation.
+Steps a controller (oref0 or a Python stand-in) through a glucose series
+in 5-minute ticks using the simdata/ JSON schemas.
+"""
+
+from .clock import VirtualClock, WallClock
+from .cohort import run_cohort, virtual_patients
+from .determine_basal import PythonDetermineBasal, determine_basal_batch, glucose_status
+from .engine import ClosedLoopSimulator, ReplaySource, load_inputs, write_prediction
+from .lockstep import LockstepSimulator
+from .oref0 import Oref0Error, Oref0Worker, oref0_available, oref0_pool
+from .workers import JsonLinesWorker, StubWorker, WorkerError, WorkerPool
+
+__all__ = [
+    'VirtualClock',
+    'WallClock',
+    'run_cohort',
+    'virtual_patients',
+    'PythonDetermineBasal',
+    'determine_basal_batch',
+    'glucose_status',
+    'LockstepSimulator',
+    'ClosedLoopSimulator',
+    'ReplaySource',
+    'load_inputs',
+    'write_prediction',
+    'Oref0Error',
+    'Oref0Worker',
+    'oref0_available',
+    'oref0_pool',
+    'JsonLinesWorker',
+    'StubWorker',
+    'WorkerError',
+    'WorkerPool',
+]
@@ -0,0 +1,154 @@
+"""
+Rolling autosens: sensitivity ratio from 24 hours of BG deviations.
+
+Each reading's deviation (observed 5-minute delta minus the insulin
+effect expected from activity) enters a time-bounded ring buffer; the
+oldest fall out as new ones arrive. A sorted copy is kept alongside with
+bisect, so each update is a constant-time ring push plus a binary-search
+insert, and the median behind the ratio is a direct index. Readings while
+carbs are on board are left out, as in oref0.
+"""
+
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+
+from data_loader.profile import Profile
+from data_loader.series import as_series
+from data_loader.timeutil import TICK_MINUTES, TICK_MS
+
+from .cob import carb_events, cob_series
+from .iob import iob_from_pumphistory
+
+WINDOW_MS = 24 * 60 * 60 * 1000
+AUTOSENS_MIN = 0.7
+AUTOSENS_MAX = 1.2
+MIN_DEVIATIONS = 96  # 8 hours; fewer are padded with zeros, as oref0 does
+DELTA_READINGS = 4  # avgDelta over the last 15 minutes
+
+
+def percentile(values, p):
+    """oref0 lib/percentile.js over an already sorted list."""
+    if p <= 0:
+        return values[0]
+    if p >= 1:
+        return values[-1]
+    index = len(values) * p
+    lower = int(index)
+    weight = index % 1
+    if lower + 1 >= len(values):
+        return values[lower]
+    return values[lower] * (1 - weight) + values[lower + 1] * weight
+
+
+class Autosens(object):
+    """
+    Streaming sensitivity detector.
+
+    Args:
+        profile: profile.json dict or data_loader Profile (sens, basal schedule)
+        window_ms: Span of deviations kept (24 hours)
+        autosens_min, autosens_max: Bounds on the ratio
+    """
+
+    def __init__(self, profile, window_ms=WINDOW_MS, autosens_min=AUTOSENS_MIN, autosens_max=AUTOSENS_MAX):
+        self.schedule = profile if isinstance(profile, Profile) else Profile(profile)
+        self.window_ms = window_ms
+        self.autosens_min = autosens_min
+        self.autosens_max = autosens_max
+        self.max_daily_basal = float(self.schedule.data.get('max_daily_basal', self.schedule.basal.max()))
+        self._recent = deque(maxlen=DELTA_READINGS)
+        self._deviations = deque(maxlen=int(window_ms // TICK_MS) + 1)
+        self._sorted = []
+        self.ratio = 1.0
+
+    def __len__(self):
+        return len(self._deviations)
+
+    def update(self, glucose, date_ms, activity, cob=0):
+        """
+        Add one reading and return the updated ratio.
+
+        Args:
+            glucose, date_ms: The reading (mg/dL, epoch ms)
+            activity: Insulin activity at the reading (U/min)
+            cob: Carbs on board; deviations are skipped while > 0
+        """
+        self._recent.append((float(glucose), int(date_ms)))
+        while self._deviations and self._deviations[0][0] <= date_ms - self.window_ms:
+            self._evict()
+        if len(self._recent) < DELTA_READINGS or cob > 0 or glucose < 39:
+            return self.ratio
+
+        then, then_ms = self._recent[0]
+        steps = (date_ms - then_ms) / TICK_MS
+        if steps <= 0:
+            return self.ratio
+        sens = float(self.schedule.sens_at(date_ms))
+        avg_delta = (glucose - then) / steps
+        bgi = -activity * sens * TICK_MINUTES
+        deviation = round(avg_delta - bgi, 2)
+
+        if len(self._deviations) == self._deviations.maxlen:
+            self._evict()
+        self._deviations.append((int(date_ms), deviation))
+        insort(self._sorted, deviation)
+        self.ratio = self._ratio(sens)
+        return self.ratio
+
+    def _evict(self):
+        _, deviation = self._deviations.popleft()
+        del self._sorted[bisect_left(self._sorted, deviation)]
+
+    def _ratio(self, sens):
+        deviations = self._sorted
+        if len(deviations) < MIN_DEVIATIONS:
+            pad = int(round((1 - len(deviations) / MIN_DEVIATIONS) * 18))
+            at = bisect_left(deviations, 0)
+            deviations = deviations[:at] + [0] * pad + deviations[at:]
+        median = percentile(deviations, 0.5)
+        basal_off = median * (60 / TICK_MINUTES) / sens if median else 0.0
+        ratio = 1 + basal_off / self.max_daily_basal
+        return round(min(self.autosens_max, max(self.autosens_min, ratio)), 2)
+
+
+def autosens_series(glucose, dates, activity, profile, cob=None, **kwargs):
+    """
+    Ratio after each reading of an oldest-first series, in one streaming pass.
+
+    Args:
+        glucose, dates, activity: (ticks,) arrays (mg/dL, epoch ms, U/min)
+        cob: Optional (ticks,) carbs on board
+
+    Returns:
+        (ticks,) array of ratios
+    """
+    detector = Autosens(profile, **kwargs)
+    cob = np.zeros(len(glucose)) if cob is None else np.asarray(cob)
+    update = detector.update
+    return np.array([update(g, d, a, c) for g, d, a, c in
+                     zip(np.asarray(glucose).tolist(), np.asarray(dates).tolist(),
+                         np.asarray(activity).tolist(), cob.tolist())])
+
+
+def autosens_records(glucose_data, profile, pumphistory=None, carbs=None, **kwargs):
+    """
+    autosens_series() for simdata/glucose.json records (any order), with
+    activity from pump history and COB from carb treatments.
+    """
+    schedule = profile if isinstance(profile, Profile) else Profile(profile)
+    readings = as_series(glucose_data)
+    glucose = readings.glucose.astype(np.float64)
+    dates = readings.date
+    start_ms = int(dates[0]) - int(schedule.dia * 60) * 60000
+    series = iob_from_pumphistory(pumphistory, schedule, start_ms, int(dates[-1]))
+    activity = series['activity'][(dates - start_ms) // 60000]
+
+    cob = None
+    times, grams = carb_events(carbs)
+    if len(times):
+        n_steps = int((dates[-1] - start_ms) // TICK_MS) + 1
+        meals = cob_series(times, grams, start_ms, n_steps, schedule.carb_ratio_at(dates[0]), schedule.sens_at(dates[0]))
+        cob = meals['cob'][(dates - start_ms) // TICK_MS]
+    return autosens_series(glucose, dates, activity, schedule, cob, **kwargs)
@@ -0,0 +1,263 @@
+"""
+Autotune-style profile fitting.
+
+History is split into days. Each day is prepared independently in a
+process pool: IOB activity and COB are computed for the day, every BG
+deviation (15-minute avg delta minus the expected insulin effect) is
+sorted into meal, ISF or basal data as oref0 autotune-prep does, and the
+day is reduced to sums per hour and per meal. The day summaries are merged
+and one tuning step adjusts the hourly basal schedule, ISF and carb ratio,
+each bounded relative to the pump profile.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data_loader.profile import MINUTES_PER_DAY, Profile
+from data_loader.timeindex import TimeIndex
+from data_loader.timeutil import TICK_MINUTES, TICK_MS, parse_ms
+
+from .cob import DEFAULT_ABSORPTION_MINUTES, carb_delivery, carb_events, cob_series
+from .iob import MINUTE_MS, iob_series, pumphistory_delivery
+
+DAY_MS = MINUTES_PER_DAY * MINUTE_MS
+ADJUSTMENT_MIN = 0.7  # tuned values stay within 70-120% of the pump profile
+ADJUSTMENT_MAX = 1.2
+MIN_ISF_POINTS = 10
+MIN_BASAL_POINTS = 6  # per hour, across all days
+DELTA_READINGS = 4
+
+
+def split_days(glucose_data, profile, pumphistory=None, carbs=None):
+    """
+    Group history by local day. Each day gets its readings (plus the few
+    before midnight needed for deltas) and the pump and carb events that
+    can still act on it.
+    """
+    schedule = profile if isinstance(profile, Profile) else Profile(profile)
+    offset_ms = schedule.utc_offset_minutes * MINUTE_MS
+    readings = TimeIndex(glucose_data)
+    dates = readings.dates
+    glucose = readings.series.glucose.astype(np.float64)
+    events = sorted(((parse_ms(e['timestamp']), e) for e in pumphistory or [] if 'timestamp' in e),
+                    key=lambda event: event[0])
+    event_times = TimeIndex(np.array([t for t, _ in events], dtype=np.int64))
+    carb_times, carb_grams = carb_events(carbs)
+    insulin_lookback = int(schedule.dia * 60) * MINUTE_MS
+    carb_lookback = DEFAULT_ABSORPTION_MINUTES * MINUTE_MS
+
+    days = []
+    for day in np.unique((dates + offset_ms) // DAY_MS):
+        start = int(day) * DAY_MS - offset_ms
+        end = start + DAY_MS
+        lo, hi = readings.bounds(start, end)
+        lo = max(0, lo - (DELTA_READINGS - 1))
+        first, last = event_times.bounds(start - insulin_lookback, end)
+        in_carbs = (carb_times >= start - carb_lookback) & (carb_times < end)
+        days.append({
+            'start': start,
+            'glucose': glucose[lo:hi],
+            'dates': dates[lo:hi],
+            'pumphistory': [e for _, e in events[first:last]],
+            'carb_times': carb_times[in_carbs],
+            'carb_grams': carb_grams[in_carbs],
+        })
+    return days
+
+
+def prepare_day(day, profile_data, pump_data, utc_offset_minutes=None):
+    """
+    Categorize one day's deviations against profile_data. Temps are netted
+    against the pump profile's basal, which is what was actually delivered;
+    where profile_data's basal differs, the unmet (or excess) basal need is
+    expected to move BG and is not counted as a deviation.
+
+    Returns:
+        Dict of sums that merge across days: basal_deviation and basal_n
+        per hour (24,), isf_ratios, meal_carbs and meal_insulin
+    """
+    schedule = Profile(profile_data, utc_offset_minutes)
+    pump = Profile(pump_data, utc_offset_minutes)
+    glucose, dates = day['glucose'], day['dates']
+    start_ms = day['start'] - int(schedule.dia * 60) * MINUTE_MS
+    n_minutes = int((day['start'] + DAY_MS - start_ms) // MINUTE_MS)
+    minutes_ms = start_ms + np.arange(n_minutes, dtype=np.int64) * MINUTE_MS
+    pump_basal = pump.basal_at(minutes_ms)
+    basal_gap = (schedule.basal_at(minutes_ms) - pump_basal) / 60  # U/min not delivered
+    bolus, basal_net = pumphistory_delivery(day['pumphistory'], start_ms, n_minutes, pump_basal)
+    insulin = iob_series(bolus, basal_net, schedule.dia, start_ms)
+    minute = np.clip((dates - start_ms) // MINUTE_MS, 0, n_minutes - 1)
+
+    n_steps = n_minutes // TICK_MINUTES
+    tick = np.clip((dates - start_ms) // TICK_MS, 0, n_steps - 1)
+    meals = cob_series(day['carb_times'], day['carb_grams'], start_ms, n_steps, 1.0, 1.0)
+    cob = meals['cob'][tick]
+    eaten = carb_delivery(day['carb_times'], day['carb_grams'], start_ms, n_steps)
+
+    stats = {
+        'basal_deviation': np.zeros(24),
+        'basal_n': np.zeros(24),
+        'isf_ratios': np.zeros(0),
+        'meal_carbs': 0.0,
+        'meal_insulin': 0.0,
+    }
+    if len(glucose) < DELTA_READINGS:
+        return stats
+
+    sens = schedule.sens_at(dates)
+    lag = DELTA_READINGS - 1
+    gap = np.full(len(dates), np.inf)
+    gap[lag:] = (dates[lag:] - dates[:-lag]) / TICK_MS
+    avg_delta = np.full(len(dates), np.nan)
+    avg_delta[lag:] = (glucose[lag:] - glucose[:-lag]) / gap[lag:]
+    bgi = -insulin['activity'][minute] * sens * TICK_MINUTES
+    deviation = avg_delta - bgi - basal_gap[minute] * sens * TICK_MINUTES
+    scored = (dates >= day['start']) & (np.abs(gap - lag) < 0.5) & (glucose >= 39)
+
+    # oref0 autotune-prep: carbs on board is meal data; otherwise insulin
+    # effects much larger than basal's are ISF data, unless BG still rises
+    meal = scored & (cob > 0)
+    basal_bgi = schedule.basal_at(dates) * sens * TICK_MINUTES / 60
+    rising = (avg_delta > 0) & (avg_delta > -2 * bgi)
+    isf = scored & ~meal & (basal_bgi <= -4 * bgi) & ~rising
+    basal_data = scored & ~meal & ~isf
+
+    hour = (schedule.minute_of_day(dates) // 60)[basal_data]
+    stats['basal_deviation'] = np.bincount(hour, weights=deviation[basal_data], minlength=24)
+    stats['basal_n'] = np.bincount(hour, minlength=24).astype(np.float64)
+    stats['isf_ratios'] = 1 + deviation[isf] / bgi[isf]
+
+    # Each meal runs from its first reading with carbs on board until COB
+    # is gone; the insulin that acted over it, plus the BG change in
+    # insulin units, covered its carbs
+    edges = np.diff(np.concatenate([[0], meal.astype(np.int8), [0]]))
+    for s, e in zip(np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]):
+        if e >= len(dates) or cob[e] > 0:
+            continue
+        first, last = minute[s], minute[e]
+        carbs = eaten[tick[s]:tick[e] + 1].sum()
+        if carbs <= 0:
+            continue
+        dosed = (bolus + basal_net - basal_gap)[first:last].sum()
+        # iob[m] already includes minute m's delivery
+        acted = insulin['iob'][first - 1] + dosed - insulin['iob'][last - 1]
+        stats['meal_carbs'] += float(carbs)
+        stats['meal_insulin'] += float(acted + (glucose[e] - glucose[s]) / sens[s:e + 1].mean())
+    return stats
+
+
+def merge_days(day_stats):
+    """Combine prepare_day() results."""
+    return {
+        'basal_deviation': np.sum([s['basal_deviation'] for s in day_stats], axis=0),
+        'basal_n': np.sum([s['basal_n'] for s in day_stats], axis=0),
+        'isf_ratios': np.concatenate([s['isf_ratios'] for s in day_stats]),
+        'meal_carbs': sum(s['meal_carbs'] for s in day_stats),
+        'meal_insulin': sum(s['meal_insulin'] for s in day_stats),
+        'days': len(day_stats),
+    }
+
+
+def _bounded(value, pump_value):
+    return float(np.clip(value, ADJUSTMENT_MIN * pump_value, ADJUSTMENT_MAX * pump_value))
+
+
+def tune(profile, pump_profile, stats):
+    """
+    One tuning step from merged day statistics.
+
+    Args:
+        profile: Current profile dict (the one the days were prepared with)
+        pump_profile: Original profile dict; bounds every adjustment
+
+    Returns:
+        New profile dict with a 24-entry hourly basalprofile and scaled
+        isfProfile and carb ratio schedules
+    """
+    current = Profile(profile, 0)
+    pump = Profile(pump_profile, 0)
+    hourly = current.basal[::60].copy()
+    pump_hourly = pump.basal[::60]
+    hourly_sens = current.sens[::60]
+
+    # Basal: the unexplained rise per hour in U/hr, given to the three hours
+    # before it, when that insulin would have been acting
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_deviation = np.where(stats['basal_n'] >= MIN_BASAL_POINTS,
+                                  stats['basal_deviation'] / stats['basal_n'], 0.0)
+    needed = mean_deviation * (60 / TICK_MINUTES) / hourly_sens
+    adjusted = hourly.copy()
+    for offset in (1, 2, 3):
+        adjusted += np.roll(needed, -offset) / 3
+    basal = [round(_bounded(rate, p), 3) for rate, p in zip(adjusted, pump_hourly)]
+
+    new = json.loads(json.dumps(pump_profile))
+    new['basalprofile'] = [{'i': h, 'start': f'{h:02d}:00:00', 'minutes': h * 60, 'rate': rate}
+                           for h, rate in enumerate(basal)]
+
+    sens_factor = 1.0
+    if len(stats['isf_ratios']) >= MIN_ISF_POINTS:
+        sens_factor = float(np.median(stats['isf_ratios']))
+    pump_sens = float(pump_profile.get('sens', pump.sens[0]))
+    new['sens'] = round(_bounded(float(profile.get('sens', current.sens[0])) * sens_factor, pump_sens), 1)
+    for entry in (new.get('isfProfile') or {}).get('sens', []):
+        entry['sensitivity'] = round(_bounded(entry['sensitivity'] * new['sens'] / pump_sens,
+                                              entry['sensitivity']), 1)
+
+    pump_cr = float(pump.carb_ratio[0])
+    cr = float(current.carb_ratio[0])
+    if stats['meal_insulin'] > 0 and stats['meal_carbs'] > 0:
+        cr = stats['meal_carbs'] / stats['meal_insulin']
+    cr = round(_bounded(cr, pump_cr), 2)
+    schedules = []
+    if isinstance(new.get('carb_ratio'), list):
+        schedules.append(new['carb_ratio'])
+    else:
+        new['carb_ratio'] = cr
+    if isinstance(new.get('carb_ratios'), dict):
+        schedules.append(new['carb_ratios'].get('schedule', []))
+    for schedule in schedules:
+        for entry in schedule:
+            entry['ratio'] = round(_bounded(entry['ratio'] * cr / pump_cr, entry['ratio']), 2)
+    return new
+
+
+def autotune(glucose_data, profile, pumphistory=None, carbs=None, processes=None, rounds=3):
+    """
+    Fit basal, ISF and carb ratio to history, preparing days in parallel.
+
+    Args:
+        glucose_data: Readings in simdata/glucose.json format
+        profile: Pump profile.json dict (also the bounds for tuning)
+        pumphistory: simdata/pumphistory.json events
+        carbs: Treatment records with carbs
+        processes: Pool size (default: CPU count)
+        rounds: Tuning steps; each re-prepares the days with the last result
+
+    Returns:
+        (tuned profile dict, merged statistics of the last round)
+    """
+    schedule = Profile(profile)
+    days = split_days(glucose_data, schedule, pumphistory, carbs)
+    processes = processes or os.cpu_count() or 1
+    tuned, stats = dict(profile), None
+    if not days:
+        return tuned, stats
+    chunksize = max(1, len(days) // (processes * 4))
+    offsets = [schedule.utc_offset_minutes] * len(days)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for _ in range(rounds):
+            stats = merge_days(list(executor.map(prepare_day, days, [tuned] * len(days), [profile] * len(days),
+                                                 offsets, chunksize=chunksize)))
+            tuned = tune(tuned, profile, stats)
+    return tuned, stats
+
+
+def write_profile(profile, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    return path
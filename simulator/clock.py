@@ -0,0 +1,47 @@
+"""
+Clocks for the simulation runner.
+WallClock reads system time. VirtualClock is pinned to the simulated tick,
+so historical data replays at full CPU speed without oref0 judging every
+reading "too old" against the real date.
+"""
+
+import time
+from datetime import datetime, timezone
+
+
+class WallClock(object):
+    """Real system time; set() is ignored."""
+
+    pinned = False
+
+    def now_ms(self):
+        return int(time.time() * 1000)
+
+    def set(self, ms):
+        pass
+
+    def now(self):
+        """Local naive datetime, as datetime.now() returns."""
+        return datetime.fromtimestamp(self.now_ms() / 1000)
+
+    def isoformat(self):
+        return datetime.fromtimestamp(self.now_ms() / 1000, tz=timezone.utc) \
+            .isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class VirtualClock(WallClock):
+    """Simulated time in epoch ms, moved by the engine rather than by waiting."""
+
+    pinned = True
+
+    def __init__(self, start_ms=0):
+        self._now_ms = int(start_ms)
+
+    def now_ms(self):
+        return self._now_ms
+
+    def set(self, ms):
+        self._now_ms = int(ms)
+
+    def advance(self, ms):
+        self._now_ms += int(ms)
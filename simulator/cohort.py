@@ -0,0 +1,151 @@
+"""
+Parallel multi-patient cohort runner.
+
+Patients are sharded across a ProcessPoolExecutor. Each process starts one
+long-lived worker (oref0, the stub or the in-process Python port) and runs
+its shard through the closed-loop engine on a virtual clock. Virtual patients are driven by the
+physiology model, so their glucose responds to the delivered insulin.
+Per-patient seeds come from one SeedSequence, so results do not depend on
+the number of processes.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import numpy as np
+
+from data_loader.timeutil import TICK_MINUTES
+
+from .clock import VirtualClock
+from .engine import ClosedLoopSimulator, ReplaySource
+from .physiology import PatientModel, PhysiologySource, sample_meals
+
+# Virtual patients start at midnight so meal times line up with the clock
+VIRTUAL_START_MS = 1735689600000  # 2025-01-01T00:00:00Z
+CGM_NOISE = 2.0
+
+_worker = None
+
+
+def virtual_patients(n_patients, days=1, seed=0):
+    """
+    Specs for n synthetic patients with deterministic per-patient seeds.
+    A spec is a dict with id, seed and n_points (or glucose for dataset patients).
+    """
+    seeds = np.random.SeedSequence(seed).spawn(n_patients)
+    n_points = int(days * 24 * 60 / TICK_MINUTES)
+    return [
+        {'id': f'virtual-{i:04d}', 'seed': int(s.generate_state(1)[0]), 'n_points': n_points}
+        for i, s in enumerate(seeds)
+    ]
+
+
+def _init_worker(backend, oref0_dir):
+    global _worker
+    if backend == 'python':
+        from .determine_basal import PythonDetermineBasal
+        _worker = PythonDetermineBasal()
+        return
+    if backend == 'oref0':
+        from .oref0 import Oref0Worker
+        _worker = Oref0Worker(oref0_dir)
+    else:
+        from .workers import StubWorker
+        _worker = StubWorker()
+    # Pool processes leave through os._exit, which skips atexit; multiprocessing
+    # finalizers with an exit priority still run as the process shuts down
+    Finalize(_worker, _worker.close, exitpriority=10)
+
+
+def _patient_source(spec, profile):
+    if spec.get('glucose') is not None:
+        return ReplaySource(spec['glucose'])
+    model_seed, meal_seed, noise_seed = np.random.SeedSequence(spec['seed']).spawn(3)
+    model = PatientModel.from_profile(1, profile, seed=model_seed)
+    carbs = sample_meals(1, spec['n_points'], seed=meal_seed)
+    return PhysiologySource(model, spec['n_points'], VIRTUAL_START_MS, carbs=carbs,
+                            cgm_noise=CGM_NOISE, seed=noise_seed)
+
+
+def summarize(ticks):
+    """Glycemic and delivery metrics for one patient's ticks."""
+    glucose = np.array([t['glucose'] for t in ticks], dtype=np.float64)
+    delivered = np.array([t['delivered'] for t in ticks], dtype=np.float64)
+    if len(glucose) == 0:
+        return {'ticks': 0}
+    return {
+        'ticks': len(ticks),
+        'mean_glucose': round(float(glucose.mean()), 2),
+        'time_in_range': round(float(np.mean((glucose >= 70) & (glucose <= 180))), 4),
+        'time_below_70': round(float(np.mean(glucose < 70)), 4),
+        'time_above_180': round(float(np.mean(glucose > 180)), 4),
+        'total_insulin': round(float(delivered.sum()), 3),
+    }
+
+
+def _run_shard(shard, profile, keep_ticks):
+    """Worker: (position, result) for each (position, spec) of the shard."""
+    results = []
+    for position, spec in shard:
+        patient_profile = spec.get('profile') or profile
+        simulator = ClosedLoopSimulator(_worker, patient_profile, clock=VirtualClock())
+        source = _patient_source(spec, patient_profile)
+        carbs = source.treatments() if hasattr(source, 'treatments') else spec.get('carbs')
+        ticks = simulator.run(source, carbs=carbs)
+        result = {'id': spec['id'], 'summary': summarize(ticks)}
+        if keep_ticks:
+            result['ticks'] = ticks
+        results.append((position, result))
+    return results
+
+
+def _shards(patients, n_shards):
+    indexed = list(enumerate(patients))
+    return [indexed[i::n_shards] for i in range(n_shards) if indexed[i::n_shards]]
+
+
+def run_cohort(patients, profile, processes=None, backend='stub', oref0_dir=None, keep_ticks=False):
+    """
+    Simulate every patient spec across a process pool.
+
+    Args:
+        patients: Specs from virtual_patients() or dicts with id, glucose
+            and optionally carbs (treatment records); any iterable
+        profile: simdata/profile.json dict used when a spec has no profile
+        processes: Pool size (default: CPU count)
+        backend: 'stub', 'oref0' or 'python'
+        keep_ticks: Include every tick per patient, not just the summary
+
+    Returns:
+        Dict with per-patient results in input order and cohort-wide summary
+    """
+    patients = list(patients)
+    processes = processes or os.cpu_count() or 1
+    # A few shards per process keeps the pool busy when patients differ in length
+    shards = _shards(patients, processes * 4)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(backend, oref0_dir)) as executor:
+        shard_results = list(executor.map(_run_shard, shards, [profile] * len(shards), [keep_ticks] * len(shards)))
+
+    # Merged by position, so repeated ids each keep their own result
+    merged = [None] * len(patients)
+    for results in shard_results:
+        for position, result in results:
+            merged[position] = result
+    summaries = [r['summary'] for r in merged if r['summary']['ticks']]
+    weights = np.array([s['ticks'] for s in summaries], dtype=np.float64)
+    cohort = {'patients': len(merged), 'ticks': int(weights.sum())}
+    if summaries:
+        for key in ['mean_glucose', 'time_in_range', 'time_below_70', 'time_above_180']:
+            values = np.array([s[key] for s in summaries])
+            cohort[key] = round(float(np.average(values, weights=weights)), 4)
+        cohort['total_insulin'] = round(float(sum(s['total_insulin'] for s in summaries)), 3)
+    return {'cohort': cohort, 'patients': merged}
+
+
+def write_cohort(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f)
+    return path
@@ -0,0 +1,367 @@
+"""
+In-process port of oref0's determine-basal temp-basal logic, vectorized.
+
+determine_basal_batch() evaluates any number of (glucose window, IOB,
+current temp, profile) cases as NumPy arrays in one call. It follows the
+oref0 decision ladder (lib/determine-basal/determine-basal.js and
+lib/basal-set-temp.js) for temp basals: stale/invalid BG handling, low
+glucose suspend, eventualBG below/in/above range, max IOB and the
+"no temp required" checks.
+
+Not ported: SMB/microbolus, UAM/COB prediction curves and averaging of
+near-duplicate readings in glucose-get-last. Without the curves there is
+no minPredBG or minGuardBG, and eventualBG stands in for both, so three
+decisions are known deviations from oref0 whenever those values differ:
+
+- low glucose suspend: oref0 suspends when bg or minGuardBG is below
+  threshold, the port only when bg is
+- in range: oref0 holds at basal while min(eventualBG, minPredBG) is
+  below max_bg, so it can take this branch where the port goes high
+- high temps: oref0 sizes insulinReq from min(eventualBG, minPredBG)
+
+known_deviation() tells which cases those are, given oref0's values.
+
+PythonDetermineBasal wraps a batch of one behind the controller interface
+used by ClosedLoopSimulator, returning dicts in the predictions/ format.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Decision codes, one per branch of the ladder
+NO_CHANGE = 0
+OLD_BG_NEUTRAL = 1
+OLD_BG_SHORTEN_ZERO = 2
+OLD_BG_NOTHING = 3
+LOW_SUSPEND = 4
+BELOW_RISING = 5
+BELOW_LOT_LESS = 6
+BELOW_TEMP_OK = 7
+BELOW_ZERO_LONG = 8
+BELOW_SET = 9
+FALLING_FASTER = 10
+IN_RANGE = 11
+MAX_IOB = 12
+HIGH_WAY_MORE = 13
+HIGH_NO_TEMP = 14
+HIGH_TEMP_OK = 15
+HIGH_SET = 16
+
+MAX_DAILY_SAFETY_MULTIPLIER = 3
+CURRENT_BASAL_SAFETY_MULTIPLIER = 4
+
+
+def round_basal(rate):
+    """Round to the 0.05 U/hr pump increment, as oref0's round-basal.js does."""
+    return np.round(np.round(np.asarray(rate, dtype=np.float64) * 20) / 20, 2)
+
+
+def _round(value, digits=0):
+    # JavaScript Math.round semantics (half up), which oref0 relies on
+    scale = 10.0 ** digits
+    return np.floor(np.asarray(value, dtype=np.float64) * scale + 0.5) / scale
+
+
+def glucose_status(glucose, dates):
+    """
+    Vectorized glucose-get-last.
+
+    Args:
+        glucose: (cases, window) newest-first readings, NaN where missing
+        dates: (cases, window) epoch ms matching glucose
+
+    Returns:
+        Dict of (cases,) arrays: glucose, date, delta, short_avgdelta, long_avgdelta
+    """
+    glucose = np.asarray(glucose, dtype=np.float64)
+    dates = np.asarray(dates, dtype=np.float64)
+    now = glucose[:, :1]
+    minutes_ago = _round((dates[:, :1] - dates[:, 1:]) / 60000)
+    then = glucose[:, 1:]
+    valid = (then > 38) & ~np.isnan(then) & (minutes_ago != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avgdelta = np.where(valid, (now - then) / minutes_ago * 5, 0.0)
+
+    def masked_mean(mask):
+        count = mask.sum(axis=1)
+        total = np.where(mask, avgdelta, 0.0).sum(axis=1)
+        return np.where(count > 0, total / np.maximum(count, 1), 0.0)
+
+    short = valid & (minutes_ago > 2.5) & (minutes_ago < 17.5)
+    last = valid & (minutes_ago > 2.5) & (minutes_ago < 7.5)
+    long_ = valid & (minutes_ago > 17.5) & (minutes_ago < 42.5)
+    return {
+        'glucose': glucose[:, 0],
+        'date': dates[:, 0],
+        'delta': _round(masked_mean(last), 2),
+        'short_avgdelta': _round(masked_mean(short), 2),
+        'long_avgdelta': _round(masked_mean(long_), 2),
+    }
+
+
+def _profile_arrays(profile, n):
+    """Broadcast a profile dict (scalars or (n,) arrays) to (n,) float arrays."""
+    get = lambda key, default: np.broadcast_to(
+        np.asarray(profile.get(key, default), dtype=np.float64), (n,))
+    current_basal = get('current_basal', 1.0)
+    return {
+        'current_basal': current_basal,
+        'sens': get('sens', 50),
+        'min_bg': get('min_bg', 100),
+        'max_bg': get('max_bg', 120),
+        'max_iob': get('max_iob', 0),
+        'max_basal': get('max_basal', 4 * current_basal),
+        'max_daily_basal': get('max_daily_basal', current_basal),
+    }
+
+
+def determine_basal_batch(status, iob, activity, temp_rate, temp_duration, profile,
+                          now_ms, sensitivity_ratio=1.0):
+    """
+    Temp-basal decisions for many cases at once.
+
+    Args:
+        status: glucose_status() dict of (cases,) arrays
+        iob, activity: Current IOB (U) and activity (U/min), (cases,)
+        temp_rate, temp_duration: Running temp, (cases,); duration 0 if none
+        profile: Dict of scalars or (cases,) arrays (simdata/profile.json keys)
+        now_ms: Current time in epoch ms, scalar or (cases,)
+        sensitivity_ratio: Autosens ratio, scalar or (cases,)
+
+    Returns:
+        Dict of (cases,) arrays: rate and duration (NaN / -1 where the
+        current temp is left alone), code (branch taken), bg, eventualBG,
+        naive_eventualBG, insulinReq, reqRate (the low or high temp the
+        ladder asked for, before the no-temp-required checks), minDelta,
+        expectedDelta, basal, min_ago and the sens used.
+    """
+    bg = np.asarray(status['glucose'], dtype=np.float64)
+    n = bg.shape[0]
+    p = _profile_arrays(profile, n)
+    iob = np.broadcast_to(np.asarray(iob, dtype=np.float64), (n,))
+    activity = np.broadcast_to(np.asarray(activity, dtype=np.float64), (n,))
+    temp_rate = np.broadcast_to(np.asarray(temp_rate, dtype=np.float64), (n,))
+    temp_duration = np.broadcast_to(np.asarray(temp_duration, dtype=np.float64), (n,))
+    ratio = np.broadcast_to(np.asarray(sensitivity_ratio, dtype=np.float64), (n,))
+
+    basal = round_basal(p['current_basal'] * ratio)
+    sens = _round(p['sens'] / ratio, 1)
+    target_bg = (p['min_bg'] + p['max_bg']) / 2
+    max_safe_basal = np.minimum(p['max_basal'], np.minimum(
+        MAX_DAILY_SAFETY_MULTIPLIER * p['max_daily_basal'],
+        CURRENT_BASAL_SAFETY_MULTIPLIER * p['current_basal']))
+    min_ago = _round((np.asarray(now_ms, dtype=np.float64) - status['date']) / 60000, 1)
+
+    rate_out = np.full(n, np.nan)
+    duration_out = np.full(n, -1, dtype=np.int64)
+    code = np.full(n, NO_CHANGE, dtype=np.int64)
+    decided = np.zeros(n, dtype=bool)
+
+    def finish(mask, branch):
+        """Leave the current temp running for mask rows."""
+        mask = mask & ~decided
+        code[mask] = branch
+        decided[mask] = True
+
+    def set_temp(mask, rate, duration, branch, checked=True):
+        """basal-set-temp.js setTempBasal for mask rows (checked=False sets rT.rate directly)."""
+        mask = mask & ~decided
+        rate = np.broadcast_to(rate, (n,))
+        duration = np.broadcast_to(np.asarray(duration, dtype=np.int64), (n,))
+        suggested = round_basal(np.clip(rate, 0, max_safe_basal)) if checked else rate
+        not_required = (mask & (temp_duration > duration - 10) & (temp_duration <= 120)
+                        & (suggested <= temp_rate * 1.2) & (suggested >= temp_rate * 0.8) & (duration > 0))
+        apply = mask & ~not_required if checked else mask
+        rate_out[apply] = suggested[apply]
+        duration_out[apply] = duration[apply]
+        code[mask] = branch
+        decided[mask] = True
+
+    # Stale, calibrating or invalid BG: cancel high temps, shorten long zero temps
+    bad_bg = (bg <= 10) | (bg == 38) | (min_ago > 12) | (min_ago < -5)
+    set_temp(bad_bg & (temp_rate > basal), basal, 30, OLD_BG_NEUTRAL, checked=False)
+    set_temp(bad_bg & (temp_rate == 0) & (temp_duration > 30), 0, 30, OLD_BG_SHORTEN_ZERO, checked=False)
+    finish(bad_bg, OLD_BG_NOTHING)
+
+    bgi = _round(-activity * sens * 5, 2)
+    min_delta = np.minimum(status['delta'], status['short_avgdelta'])
+    min_avg_delta = np.minimum(status['short_avgdelta'], status['long_avgdelta'])
+    deviation = _round(30 / 5 * (min_delta - bgi))
+    deviation = np.where(deviation < 0, _round(30 / 5 * (min_avg_delta - bgi)), deviation)
+    deviation = np.where(deviation < 0, _round(30 / 5 * (status['long_avgdelta'] - bgi)), deviation)
+    naive_eventual_bg = _round(bg - iob * sens)
+    eventual_bg = naive_eventual_bg + deviation
+    threshold = p['min_bg'] - 0.5 * (p['min_bg'] - 40)
+    expected_delta = _round(bgi + (target_bg - eventual_bg) / 24, 1)
+
+    # Low glucose suspend, long enough to bring BG back up to target, unless
+    # IOB is already well negative and BG is rising faster than predicted
+    worst_case_req = (target_bg - (naive_eventual_bg + eventual_bg) / 2) / sens
+    duration_req = _round(60 * worst_case_req / p['current_basal'])
+    duration_req = np.clip(_round(duration_req / 30) * 30, 30, 120)
+    recovering = (iob < -p['current_basal'] * 20 / 60) & (min_delta > 0) & (min_delta > expected_delta)
+    set_temp((bg < threshold) & ~recovering, 0, duration_req, LOW_SUSPEND)
+
+    near_basal = (temp_duration > 15) & (round_basal(basal) == round_basal(temp_rate))
+
+    # eventualBG below min_bg
+    below = eventual_bg < p['min_bg']
+    rising = below & (min_delta > expected_delta) & (min_delta > 0)
+    finish(rising & near_basal, BELOW_RISING)
+    set_temp(rising, basal, 30, BELOW_RISING)
+
+    insulin_req = _round(2 * np.minimum(0, (eventual_bg - target_bg) / sens), 2)
+    naive_insulin_req = np.minimum(0, (naive_eventual_bg - target_bg) / sens)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slower = (min_delta < 0) & (min_delta > expected_delta)
+        insulin_req = np.where(slower, _round(insulin_req * (min_delta / expected_delta), 2), insulin_req)
+    low_rate = round_basal(basal + 2 * insulin_req)
+    insulin_scheduled = temp_duration * (temp_rate - basal) / 60
+    lot_less = below & (insulin_scheduled < np.minimum(insulin_req, naive_insulin_req) - basal * 0.3)
+    set_temp(lot_less, low_rate, 30, BELOW_LOT_LESS)
+    finish(below & (temp_duration > 5) & (low_rate >= temp_rate * 0.8), BELOW_TEMP_OK)
+    zero_duration = _round(60 * (target_bg - naive_eventual_bg) / sens / p['current_basal'])
+    zero_duration = np.where(zero_duration < 0, 0, np.clip(_round(zero_duration / 30) * 30, 0, 120))
+    set_temp(below & (low_rate <= 0) & (zero_duration > 0), low_rate, zero_duration, BELOW_ZERO_LONG)
+    set_temp(below, low_rate, 30, BELOW_SET)
+
+    # Falling faster than expected, in range, or at max IOB: hold at basal
+    for mask, branch in [(min_delta < expected_delta, FALLING_FASTER),
+                         (eventual_bg < p['max_bg'], IN_RANGE),
+                         (iob > p['max_iob'], MAX_IOB)]:
+        finish(mask & near_basal, branch)
+        set_temp(mask, basal, 30, branch)
+
+    # eventualBG above max_bg: high temp, capped by max IOB and max safe basal
+    high_req = _round((eventual_bg - target_bg) / sens, 2)
+    high_req = np.where(high_req > p['max_iob'] - iob, p['max_iob'] - iob, high_req)
+    high_rate = np.minimum(round_basal(basal + 2 * high_req), round_basal(max_safe_basal))
+    insulin_req = np.where(below, insulin_req, _round(high_req, 3))
+    set_temp(insulin_scheduled >= high_req * 2, high_rate, 30, HIGH_WAY_MORE)
+    set_temp(temp_duration == 0, high_rate, 30, HIGH_NO_TEMP)
+    finish((temp_duration > 5) & (round_basal(high_rate) <= round_basal(temp_rate)), HIGH_TEMP_OK)
+    set_temp(np.ones(n, dtype=bool), high_rate, 30, HIGH_SET)
+
+    return {
+        'rate': rate_out,
+        'duration': duration_out,
+        'code': code,
+        'bg': bg,
+        'eventualBG': eventual_bg,
+        'naive_eventualBG': naive_eventual_bg,
+        'insulinReq': insulin_req,
+        'reqRate': np.where(below, low_rate, high_rate),
+        'minDelta': min_delta,
+        'expectedDelta': expected_delta,
+        'basal': basal,
+        'sens': sens,
+        'min_ago': min_ago,
+    }
+
+
+def known_deviation(bg, eventual_bg, min_pred_bg, min_guard_bg, profile):
+    """
+    Which cases oref0 may decide differently from the port because of its
+    minPredBG/minGuardBG (see the module docstring), as a (cases,) bool array.
+
+    Args:
+        bg, eventual_bg: Current BG and eventualBG, scalars or (cases,)
+        min_pred_bg, min_guard_bg: oref0's values for the same cases
+        profile: Dict of scalars or (cases,) arrays
+    """
+    bg, eventual_bg, min_pred_bg, min_guard_bg = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (bg, eventual_bg, min_pred_bg, min_guard_bg)])
+    p = _profile_arrays(profile, bg.shape[0])
+    threshold = p['min_bg'] - 0.5 * (p['min_bg'] - 40)
+    suspend = (bg < threshold) != (np.minimum(bg, min_guard_bg) < threshold)
+    high = (eventual_bg >= p['max_bg']) & (min_pred_bg < eventual_bg)
+    return suspend | high
+
+
+def _fmt(value):
+    """Format numbers the way JavaScript string concatenation does."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(round(value, 4))
+
+
+def _reason(i, out, status, temp_rate, temp_duration, now_ms, profile, cob=0):
+    code = int(out['code'][i])
+    basal = _fmt(out['basal'][i])
+    rate = _fmt(out['rate'][i]) if not np.isnan(out['rate'][i]) else None
+    req_rate = _fmt(out['reqRate'][i])
+    if code in (OLD_BG_NEUTRAL, OLD_BG_SHORTEN_ZERO, OLD_BG_NOTHING):
+        bg_time = datetime.fromtimestamp(status['date'][i] / 1000, tz=timezone.utc)
+        system_time = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        reason = (f"If current system time {system_time:%a %b %d %Y %H:%M:%S} GMT+0000 is correct, then BG data "
+                  f"is too old. The last BG data was read {_fmt(out['min_ago'][i])}m ago at "
+                  f"{bg_time:%a %b %d %Y %H:%M:%S} GMT+0000")
+        if code == OLD_BG_NEUTRAL:
+            return reason + f". Replacing high temp basal of {_fmt(temp_rate)} with neutral temp of {basal}"
+        if code == OLD_BG_SHORTEN_ZERO:
+            return reason + f". Shortening {_fmt(temp_duration)}m long zero temp to 30m. "
+        return reason + f". Temp {_fmt(temp_rate)} <= current basal {basal}U/hr; doing nothing. "
+    reason = (f"COB: {_fmt(cob)}, Dev: {_fmt(out['eventualBG'][i] - out['naive_eventualBG'][i])}, "
+              f"ISF: {_fmt(out['sens'][i])}, Target: {_fmt((profile['min_bg'] + profile['max_bg']) / 2)}; "
+              f"Eventual BG {_fmt(out['eventualBG'][i])}")
+    if code == LOW_SUSPEND:
+        return reason + f", BG {_fmt(out['bg'][i])} < threshold; setting {rate if rate is not None else 0}U/hr"
+    if code in (BELOW_RISING, FALLING_FASTER, IN_RANGE, MAX_IOB):
+        if rate is None:
+            return reason + f", temp {_fmt(temp_rate)} ~ req {basal}U/hr. "
+        return reason + f"; setting current basal of {basal} as temp. "
+    if code in (BELOW_LOT_LESS, BELOW_TEMP_OK, BELOW_ZERO_LONG, BELOW_SET):
+        if rate is None:
+            return reason + f" < {_fmt(profile['min_bg'])}, temp {_fmt(temp_rate)} ~< req {req_rate}U/hr. "
+        return reason + f" < {_fmt(profile['min_bg'])}, setting {rate}U/hr. "
+    if rate is None:
+        return reason + f" >= {_fmt(profile['max_bg'])}, temp {_fmt(temp_rate)} >~ req {req_rate}U/hr. "
+    return reason + f" >= {_fmt(profile['max_bg'])}, insulinReq {_fmt(out['insulinReq'][i])}; setting {rate}U/hr. "
+
+
+class PythonDetermineBasal(object):
+    """
+    Controller backed by determine_basal_batch, with the same
+    determine_basal(glucose, iob, currenttemp, profile, **extra) contract
+    as the oref0 worker. Needs no Node and no subprocess.
+    """
+
+    def determine_basal(self, glucose, iob, currenttemp, profile, **extra):
+        glucose = [g for g in glucose if g.get('glucose', g.get('sgv')) is not None]
+        values = np.array([[g.get('glucose', g.get('sgv')) for g in glucose]], dtype=np.float64)
+        dates = np.array([[g['date'] for g in glucose]], dtype=np.float64)
+        status = glucose_status(values, dates)
+        iob_now = iob[0] if isinstance(iob, list) else iob
+        currenttemp = currenttemp or {}
+        temp_rate = float(currenttemp.get('rate', 0) or 0)
+        temp_duration = float(currenttemp.get('duration', 0) or 0)
+
+        now = datetime.now(timezone.utc)
+        if extra.get('currentTime'):
+            current = extra['currentTime']
+            now = (datetime.fromtimestamp(current / 1000, tz=timezone.utc) if isinstance(current, (int, float))
+                   else datetime.fromisoformat(current.replace('Z', '+00:00')))
+        now_ms = now.timestamp() * 1000
+        ratio = (extra.get('autosens') or {}).get('ratio', 1.0)
+        cob = (extra.get('meal') or {}).get('mealCOB', 0)
+
+        out = determine_basal_batch(status, iob_now.get('iob', 0), iob_now.get('activity', 0),
+                                    temp_rate, temp_duration, profile, now_ms, sensitivity_ratio=ratio)
+        result = {
+            'reason': _reason(0, out, status, temp_rate, temp_duration, now_ms, profile, cob),
+            'deliverAt': now.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        }
+        if out['code'][0] not in (OLD_BG_NEUTRAL, OLD_BG_SHORTEN_ZERO, OLD_BG_NOTHING):
+            result = dict({
+                'temp': 'absolute',
+                'bg': int(out['bg'][0]),
+                'tick': f"{status['delta'][0]:+g}",
+                'eventualBG': int(out['eventualBG'][0]),
+                'insulinReq': float(out['insulinReq'][0]),
+                'sensitivityRatio': ratio,
+                'COB': cob,
+                'IOB': iob_now.get('iob', 0),
+            }, **result)
+        if not np.isnan(out['rate'][0]):
+            result.update(temp='absolute', duration=int(out['duration'][0]), rate=float(out['rate'][0]))
+        return result
@@ -0,0 +1,265 @@
+"""
+Closed-loop, time-stepped simulation engine.
+
+Walks a glucose series in 5-minute ticks. Each tick hands the controller a
+bounded newest-first glucose window, the current IOB and the current temp,
+applies the temp basal it returns and advances. Inputs and outputs use the
+simdata/*.json schemas, and each controller decision is in the predictions/
+format.
+"""
+
+import json
+import os
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from data_loader.profile import Profile
+from data_loader.series import as_series
+from data_loader.timeutil import TICK_MINUTES, TICK_MS, iso, parse_ms
+
+from .autosens import Autosens
+from .clock import WallClock
+from .cob import DEFAULT_ABSORPTION_MINUTES, carb_events, cob_series, meal_data
+from .insulin import curve_table
+
+DEFAULT_WINDOW = 36  # 3 hours of readings
+PROJECTION_TICKS = 48  # 4 hours of future IOB, as oref0-calculate-iob emits
+
+
+def load_inputs(simdata_dir):
+    """
+    Load the simdata/ JSON files the engine understands.
+    Returns a dict with glucose, currenttemp, profile and pumphistory
+    (missing files map to None). IOB is computed by the engine, not read.
+    """
+    inputs = {}
+    for name in ['glucose', 'currenttemp', 'profile', 'pumphistory']:
+        path = os.path.join(simdata_dir, f'{name}.json')
+        inputs[name] = None
+        if os.path.exists(path):
+            with open(path) as f:
+                inputs[name] = json.load(f)
+    return inputs
+
+
+def write_prediction(result, pred_dir, when=None):
+    """Write one decision to pred_dir exactly as simulation.py always has."""
+    when = when or datetime.now()
+    path = os.path.join(pred_dir, f"prediction-{when.strftime('%Y-%m-%d-%H-%M-%S')}.json")
+    with open(path, 'w') as f:
+        f.write(json.dumps(result, separators=(',', ':')))
+    return path
+
+
+class ReplaySource(object):
+    """Replays a recorded glucose series; delivered insulin does not change it."""
+
+    def __init__(self, glucose_data):
+        self.records = as_series(glucose_data)
+
+    def __len__(self):
+        return len(self.records)
+
+    def reading(self, tick):
+        return self.records[tick]
+
+    def deliver(self, tick, units):
+        pass
+
+
+class ClosedLoopSimulator(object):
+    """
+    Runs a controller against a glucose source tick by tick.
+
+    The controller is any object with
+    determine_basal(glucose, iob, currenttemp, profile, **extra) returning a
+    dict in the predictions/ format (rate, duration, temp, reason, ...).
+    With a VirtualClock the clock follows each tick and the controller gets
+    it as extra currentTime, so oref0 sees the simulated time as "now".
+    With autosens=True a rolling Autosens detector follows the run and its
+    ratio is passed as extra autosens, scaling the controller's ISF.
+    """
+
+    def __init__(self, controller, profile, window=DEFAULT_WINDOW, clock=None, autosens=False):
+        self.controller = controller
+        self.autosens = autosens
+        self.schedule = profile if isinstance(profile, Profile) else Profile(profile)
+        self.profile = self.schedule.data
+        self.window = window
+        self.clock = clock or WallClock()
+        iob_curve, activity_curve = curve_table(self.profile.get('dia', 3), TICK_MINUTES)
+        self._ages = len(iob_curve)
+        # Row k gives the contribution of each delivery age, k ticks ahead.
+        shift = np.arange(PROJECTION_TICKS)[:, None] + np.arange(self._ages)[None, :]
+        padded_iob = np.concatenate([iob_curve, np.zeros(PROJECTION_TICKS)])
+        padded_activity = np.concatenate([activity_curve, np.zeros(PROJECTION_TICKS)])
+        self._iob_matrix = padded_iob[shift]
+        self._activity_matrix = padded_activity[shift]
+        # Effect of a zero temp running from now until each projected tick, per U/hr of basal.
+        tick_hours = TICK_MINUTES / 60
+        self._zero_temp_iob = -tick_hours * np.concatenate([[0.0], np.cumsum(padded_iob[1:PROJECTION_TICKS])])
+        self._zero_temp_activity = -tick_hours * np.concatenate([[0.0], np.cumsum(padded_activity[1:PROJECTION_TICKS])])
+
+    def _reset(self, start_ms, pumphistory):
+        self._glucose = deque(maxlen=self.window)
+        self._basal_units = np.zeros(self._ages)
+        self._bolus_units = np.zeros(self._ages)
+        for event in pumphistory or []:
+            if event.get('_type') != 'Bolus':
+                continue
+            age = int(round((start_ms - parse_ms(event['timestamp'])) / TICK_MS))
+            if 0 <= age < self._ages:
+                self._bolus_units[age] += float(event.get('amount', 0))
+        self._temp = None
+        self._autosens = Autosens(self.schedule) if self.autosens else None
+
+    def _advance(self):
+        self._basal_units[1:] = self._basal_units[:-1]
+        self._bolus_units[1:] = self._bolus_units[:-1]
+        self._basal_units[0] = 0.0
+        self._bolus_units[0] = 0.0
+
+    def iob_array(self, now_ms):
+        """Project current IOB forward in 5-minute steps (simdata/iob.json schema)."""
+        basal_iob = self._iob_matrix @ self._basal_units
+        bolus_iob = self._iob_matrix @ self._bolus_units
+        activity = self._activity_matrix @ (self._basal_units + self._bolus_units)
+        net_basal = float(self._basal_units.sum())
+        high_temp = float(self._basal_units[self._basal_units > 0].sum())
+        iob = basal_iob + bolus_iob
+        basal = float(self.schedule.basal_at(now_ms))
+        zt_basal_iob = basal_iob + basal * self._zero_temp_iob
+        zt_iob = iob + basal * self._zero_temp_iob
+        zt_activity = activity + basal * self._zero_temp_activity
+        ticks = []
+        for k in range(PROJECTION_TICKS):
+            ticks.append({
+                'iob': round(float(iob[k]), 3),
+                'activity': round(float(activity[k]), 4),
+                'bolussnooze': 0.0,
+                'basaliob': round(float(basal_iob[k]), 3),
+                'netbasalinsulin': round(net_basal, 3),
+                'hightempinsulin': round(high_temp, 3),
+                'time': iso(now_ms + k * TICK_MS),
+                'iobWithZeroTemp': {
+                    'iob': round(float(zt_iob[k]), 3),
+                    'activity': round(float(zt_activity[k]), 4),
+                    'basaliob': round(float(zt_basal_iob[k]), 3),
+                    'bolussnooze': 0.0,
+                    'time': iso(now_ms + k * TICK_MS),
+                },
+            })
+        return ticks
+
+    def currenttemp(self, now_ms):
+        """The running temp in simdata/currenttemp.json format."""
+        if self._temp is None:
+            return {'duration': 0, 'temp': 'absolute', 'rate': 0}
+        elapsed = (now_ms - self._temp['start']) / 60000
+        remaining = self._temp['duration'] - elapsed
+        if remaining <= 0:
+            self._temp = None
+            return {'duration': 0, 'temp': 'absolute', 'rate': 0}
+        return {
+            'duration': int(round(remaining)),
+            'temp': 'absolute',
+            'rate': self._temp['rate'],
+            'timestamp': iso(self._temp['start']),
+        }
+
+    def _apply(self, suggestion, now_ms):
+        if 'rate' not in suggestion or 'duration' not in suggestion:
+            return
+        if int(suggestion['duration']) <= 0:
+            self._temp = None
+        else:
+            self._temp = {
+                'rate': float(suggestion['rate']),
+                'duration': int(suggestion['duration']),
+                'start': now_ms,
+            }
+
+    def _meals(self, carbs, start_ms, n_ticks):
+        """COB for the whole run, computed once on the tick grid."""
+        times, grams = carb_events(carbs)
+        grid_start = start_ms - 2 * DEFAULT_ABSORPTION_MINUTES * 60000
+        end_ms = max([start_ms + n_ticks * TICK_MS] + list(times))
+        n_steps = int((end_ms - grid_start) // TICK_MS) + 1
+        grid = grid_start + np.arange(n_steps, dtype=np.int64) * TICK_MS
+        series = cob_series(times, grams, grid_start, n_steps,
+                            self.schedule.carb_ratio_at(grid), self.schedule.sens_at(grid))
+        return grid_start, meal_data(series)
+
+    def run(self, source, currenttemp=None, pumphistory=None, carbs=None, start=0, stop=None):
+        """
+        Simulate ticks [start, stop) of `source`. Readings before `start` only
+        warm up the glucose window, so start=len(source)-1 gives one decision
+        on the latest reading. `carbs` is an optional list of treatment
+        records ({'date' or 'timestamp', 'carbs'}); their COB is computed once
+        up front and handed to the controller as oref0 meal data each tick.
+
+        Returns:
+            List of per-tick dicts: date, glucose, iob, rate, duration,
+            delivered units and the controller's raw suggestion.
+        """
+        stop = len(source) if stop is None else min(stop, len(source))
+        if stop <= start:
+            return []
+        start_ms = source.reading(start)['date']
+        self._reset(start_ms, pumphistory)
+        for tick in range(max(0, start - self.window), start):
+            self._glucose.appendleft(source.reading(tick))
+        if currenttemp and currenttemp.get('duration'):
+            self._temp = {
+                'rate': float(currenttemp['rate']),
+                'duration': int(currenttemp['duration']),
+                'start': start_ms,
+            }
+        meals = self._meals(carbs, start_ms, stop - start) if carbs else None
+
+        results = []
+        for tick in range(start, stop):
+            reading = source.reading(tick)
+            now_ms = reading['date']
+            self._glucose.appendleft(reading)
+
+            self.clock.set(now_ms)
+            extra = {'currentTime': self.clock.isoformat()} if self.clock.pinned else {}
+            if meals is not None:
+                grid_start, meal = meals
+                i = min(int((now_ms - grid_start) // TICK_MS), len(meal['carbs']) - 1)
+                extra['meal'] = {
+                    'carbs': round(float(meal['carbs'][i]), 1),
+                    'mealCOB': round(float(meal['mealCOB'][i]), 1),
+                    'lastCarbTime': int(meal['lastCarbTime'][i]),
+                }
+
+            iob = self.iob_array(now_ms)
+            if self._autosens is not None:
+                ratio = self._autosens.update(reading.get('glucose', reading.get('sgv')), now_ms,
+                                              iob[0]['activity'], extra.get('meal', {}).get('mealCOB', 0))
+                extra['autosens'] = {'ratio': ratio}
+            profile = self.schedule.at(now_ms)
+            suggestion = self.controller.determine_basal(
+                list(self._glucose), iob, self.currenttemp(now_ms), profile, **extra)
+            self._apply(suggestion, now_ms)
+
+            basal = profile['current_basal']
+            rate = self._temp['rate'] if self._temp else basal
+            units = rate * TICK_MINUTES / 60
+            self._basal_units[0] += units - basal * TICK_MINUTES / 60
+            self._advance()
+            source.deliver(tick, units)
+
+            results.append({
+                'date': now_ms,
+                'glucose': reading.get('glucose', reading.get('sgv')),
+                'iob': iob[0]['iob'],
+                'rate': rate,
+                'duration': self._temp['duration'] if self._temp else 0,
+                'delivered': round(units, 4),
+                'suggested': suggestion,
+            })
+        return results
@@ -0,0 +1,188 @@
+"""
+Vectorized BG forecast curves.
+
+Computes oref0-style predBGs (IOB, ZT, COB and UAM) for every tick of a
+glucose series at once, as (ticks, horizon) arrays in 5-minute steps with
+column 0 the current reading. Insulin and carb effects k steps ahead come
+from one convolution per step over the whole series, so a dataset's worth
+of forecasts costs a few dozen numpy passes rather than a call per tick.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data_loader.profile import Profile
+from data_loader.series import as_series
+from data_loader.timeindex import TimeIndex
+from data_loader.timeutil import TICK_MINUTES, TICK_MS
+
+from .cob import DEFAULT_ABSORPTION_MINUTES, absorption_kernels, carb_delivery, carb_events
+from .determine_basal import _round, glucose_status
+from .engine import DEFAULT_WINDOW, PROJECTION_TICKS
+from .iob import MINUTE_MS, kernels, pumphistory_delivery
+
+HORIZON = PROJECTION_TICKS  # 4 hours
+DEVIATION_TICKS = 60 // TICK_MINUTES  # current deviation fades out over an hour
+UAM_TICKS = 180 // TICK_MINUTES  # unannounced meal impact fades out over 3 hours
+MIN_PRED_BG = 39
+MAX_PRED_BG = 401
+
+
+def glucose_windows(glucose, dates, window=DEFAULT_WINDOW):
+    """
+    Newest-first (ticks, window) glucose and date windows for an
+    oldest-first series, NaN-padded before the first reading.
+    """
+    pad = window - 1
+    glucose = np.concatenate([np.full(pad, np.nan), np.asarray(glucose, dtype=np.float64)])
+    dates = np.concatenate([np.full(pad, np.nan), np.asarray(dates, dtype=np.float64)])
+    return (sliding_window_view(glucose, window)[:, ::-1],
+            sliding_window_view(dates, window)[:, ::-1])
+
+
+def projected_activity(delivery, dia, start_ms, times_ms, horizon=HORIZON):
+    """
+    Insulin activity (U/min) at times_ms + k steps from the insulin
+    delivered by times_ms, for k in range(horizon).
+
+    Args:
+        delivery: Per-minute units from start_ms (e.g. bolus + net basal)
+        times_ms: (ticks,) forecast times within the delivery span
+    """
+    activity_kernel = kernels(float(dia))[1]
+    n = len(delivery)
+    idx = np.clip(((np.asarray(times_ms, dtype=np.int64) - start_ms) // MINUTE_MS), 0, n - 1)
+    out = np.zeros((len(idx), horizon))
+    for k in range(horizon):
+        ahead = activity_kernel[k * TICK_MINUTES:]
+        if len(ahead):
+            out[:, k] = np.convolve(delivery, ahead)[:n][idx]
+    return out
+
+
+def zero_temp_activity(dia, basal, horizon=HORIZON):
+    """
+    Extra activity (U/min, negative) k steps ahead if a zero temp started
+    now, for a (ticks,) array of scheduled basal rates.
+    """
+    activity_kernel = kernels(float(dia))[1]
+    withheld = np.concatenate([[0.0], np.cumsum(activity_kernel)])
+    minutes = np.minimum(np.arange(horizon) * TICK_MINUTES, len(withheld) - 1)
+    return -np.asarray(basal, dtype=np.float64)[:, None] / 60 * withheld[minutes][None, :]
+
+
+def projected_carb_impact(carbs, idx, horizon=HORIZON, absorption_minutes=DEFAULT_ABSORPTION_MINUTES):
+    """
+    Grams absorbed during each of the next `horizon` steps from carbs
+    already eaten, for grid indices idx of a per-step carb array.
+    """
+    absorbed = absorption_kernels(float(absorption_minutes), TICK_MINUTES)[1]
+    n = len(carbs)
+    out = np.zeros((len(idx), horizon))
+    for k in range(min(horizon, len(absorbed))):
+        out[:, k] = np.convolve(carbs, absorbed[k:])[:n][idx]
+    return out
+
+
+def _integrate(bg, increments):
+    """Accumulate per-step increments from bg, clamped each step as oref0 does."""
+    pred = np.empty((len(bg), increments.shape[1] + 1))
+    pred[:, 0] = bg
+    for k in range(increments.shape[1]):
+        pred[:, k + 1] = np.clip(pred[:, k] + increments[:, k], MIN_PRED_BG, MAX_PRED_BG)
+    return pred
+
+
+def forecast_series(glucose, dates, profile, pumphistory=None, carbs=None, horizon=HORIZON,
+                    sensitivity_ratio=1.0, window=DEFAULT_WINDOW):
+    """
+    Forecast curves for every reading of a series.
+
+    Args:
+        glucose, dates: Oldest-first readings (mg/dL) and epoch ms
+        profile: profile.json dict or data_loader Profile
+        pumphistory: simdata/pumphistory.json events (boluses, temp basals)
+        carbs: Treatment records with carbs, as for ClosedLoopSimulator.run
+        horizon: Points per curve, including the current reading
+        sensitivity_ratio: Autosens ratio, scalar or (ticks,)
+
+    Returns:
+        Dict with time (ticks,), bgi and deviation (ticks,) and one
+        (ticks, horizon) array per curve: IOB, ZT, COB and UAM
+    """
+    schedule = profile if isinstance(profile, Profile) else Profile(profile)
+    glucose = np.asarray(glucose, dtype=np.float64)
+    dates = np.asarray(dates, dtype=np.int64)
+    n = len(glucose)
+    steps = horizon - 1
+
+    # Insulin delivered over the series plus the dia before it; older doses have no effect left
+    start_ms = int(dates[0]) - int(schedule.dia * 60) * MINUTE_MS
+    n_minutes = int((dates[-1] - start_ms) // MINUTE_MS) + 1
+    basal = schedule.basal_at(start_ms + np.arange(n_minutes, dtype=np.int64) * MINUTE_MS)
+    bolus, basal_net = pumphistory_delivery(pumphistory, start_ms, n_minutes, basal)
+    activity = projected_activity(bolus + basal_net, schedule.dia, start_ms, dates, horizon)
+    zt_activity = activity + zero_temp_activity(schedule.dia, schedule.basal_at(dates), horizon)
+
+    ratio = np.broadcast_to(np.asarray(sensitivity_ratio, dtype=np.float64), (n,))
+    sens = _round(schedule.sens_at(dates) / ratio, 1)[:, None]
+    bgi = _round(-activity * sens * TICK_MINUTES, 2)
+    zt_bgi = _round(-zt_activity * sens * TICK_MINUTES, 2)
+
+    status = glucose_status(*glucose_windows(glucose, dates, window))
+    min_delta = np.minimum(status['delta'], status['short_avgdelta'])
+    ci = _round(min_delta - bgi[:, 0], 1)
+    ahead = np.arange(1, steps + 1)
+    deviation = ci[:, None] * np.maximum(0.0, 1 - ahead / DEVIATION_TICKS)
+    uam = np.maximum(0.0, ci)[:, None] * np.maximum(0.0, 1 - ahead / UAM_TICKS)
+
+    carb_impact = np.zeros((n, steps))
+    times, grams = carb_events(carbs)
+    if len(times):
+        grid_start = int(dates[0]) - DEFAULT_ABSORPTION_MINUTES * 60000
+        n_steps = int((dates[-1] - grid_start) // TICK_MS) + 1
+        per_step = carb_delivery(times, grams, grid_start, n_steps)
+        idx = (dates - grid_start) // TICK_MS
+        carb_sens = sens[:, 0] / schedule.carb_ratio_at(dates)
+        carb_impact = projected_carb_impact(per_step, idx, steps) * carb_sens[:, None]
+
+    insulin = bgi[:, :steps]
+    return {
+        'time': dates,
+        'bgi': bgi[:, 0],
+        'deviation': ci,
+        'IOB': _integrate(glucose, insulin + deviation),
+        'ZT': _integrate(glucose, zt_bgi[:, :steps] + deviation),
+        'COB': _integrate(glucose, insulin + np.minimum(0, deviation) + carb_impact),
+        'UAM': _integrate(glucose, insulin + np.minimum(0, deviation) + uam),
+    }
+
+
+def forecast_records(glucose_data, profile, pumphistory=None, carbs=None, **kwargs):
+    """forecast_series() for simdata/glucose.json records (any order)."""
+    readings = as_series(glucose_data)
+    return forecast_series(readings.glucose.astype(np.float64), readings.date, profile, pumphistory, carbs, **kwargs)
+
+
+def forecast_errors(forecast, glucose, dates, curve='IOB', tolerance_ms=TICK_MS // 2):
+    """
+    Score one forecast curve against what actually happened.
+
+    Returns:
+        Dict of (horizon,) arrays: mae, rmse and n (pairs scored) for each
+        step ahead; steps with no matching reading are skipped
+    """
+    pred = forecast[curve]
+    glucose = np.asarray(glucose, dtype=np.float64)
+    horizon = pred.shape[1]
+    target = forecast['time'][:, None] + np.arange(horizon)[None, :] * TICK_MS
+    nearest = TimeIndex(np.asarray(dates, dtype=np.int64)).nearest(target, tolerance_ms)
+    matched = nearest >= 0
+    error = np.where(matched, pred - glucose[nearest], 0.0)
+    count = matched.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'mae': np.abs(error).sum(axis=0) / count,
+            'rmse': np.sqrt((error ** 2).sum(axis=0) / count),
+            'n': count,
+        }
@@ -0,0 +1,49 @@
+"""
+Insulin action curves used by the simulator.
+Mirrors the bilinear curve from oref0 (lib/iob/calculate.js) so that the IOB
+handed to determine-basal matches what oref0-calculate-iob would produce.
+"""
+
+import numpy as np
+
+DEFAULT_DIA = 3.0
+PEAK_MINUTES = 75
+END_MINUTES = 180
+
+
+def bilinear(minutes_ago, dia):
+    """
+    Fraction of one unit still on board, and its activity (U/min), after
+    `minutes_ago` minutes. Accepts scalars or arrays.
+
+    Returns:
+        (iob_fraction, activity_fraction) as float64 arrays
+    """
+    dia = max(float(dia), DEFAULT_DIA)
+    minutes_ago = np.asarray(minutes_ago, dtype=np.float64)
+    scaled = (DEFAULT_DIA / dia) * minutes_ago
+
+    activity_peak = 2.0 / (dia * 60)
+    slope_up = activity_peak / PEAK_MINUTES
+    slope_down = -activity_peak / (END_MINUTES - PEAK_MINUTES)
+
+    x1 = scaled / 5 + 1
+    x2 = (scaled - PEAK_MINUTES) / 5
+    rising = scaled < PEAK_MINUTES
+    falling = (scaled >= PEAK_MINUTES) & (scaled < END_MINUTES)
+    valid = scaled >= 0
+
+    iob = np.where(rising, -0.001852 * x1 * x1 + 0.001852 * x1 + 1.0,
+                   np.where(falling, 0.001323 * x2 * x2 - 0.054233 * x2 + 0.555560, 0.0))
+    activity = np.where(rising, slope_up * scaled,
+                        np.where(falling, activity_peak + slope_down * (scaled - PEAK_MINUTES), 0.0))
+    return np.where(valid, iob, 0.0), np.where(valid, activity, 0.0)
+
+
+def curve_table(dia, step_minutes=5):
+    """
+    Sample the curve every `step_minutes` from 0 to the end of insulin action.
+    Index k holds the fraction for a dose delivered k steps ago.
+    """
+    n_steps = int(np.ceil(max(float(dia), DEFAULT_DIA) * 60 / step_minutes)) + 1
+    return bilinear(np.arange(n_steps) * step_minutes, dia)
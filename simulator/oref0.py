@@ -0,0 +1,45 @@
+"""
+Persistent oref0 determine-basal worker.
+Starts `node oref0_worker.js` once and sends it one JSON line per decision,
+so a run pays Node startup and module load a single time.
+"""
+
+import os
+import subprocess
+
+from .workers import JsonLinesWorker, WorkerError, WorkerPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OREF0_DIR = os.path.join(ROOT, 'oref0')
+WORKER_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oref0_worker.js')
+
+
+class Oref0Error(WorkerError):
+    """Raised when oref0 is missing or the worker fails."""
+
+
+def oref0_available(oref0_dir=None):
+    """True when the oref0 submodule is checked out."""
+    oref0_dir = oref0_dir or OREF0_DIR
+    return os.path.isfile(os.path.join(oref0_dir, 'lib', 'determine-basal', 'determine-basal.js'))
+
+
+class Oref0Worker(JsonLinesWorker):
+    """One long-lived Node process running oref0's determine-basal."""
+
+    def __init__(self, oref0_dir=None, node='node', stderr=subprocess.DEVNULL):
+        self.oref0_dir = oref0_dir or OREF0_DIR
+        if not oref0_available(self.oref0_dir):
+            raise FileNotFoundError(f"oref0 not found at {self.oref0_dir} (is the submodule checked out?)")
+        super().__init__([node, WORKER_JS, self.oref0_dir], stderr=stderr)
+
+    def request(self, payload):
+        try:
+            return super().request(payload)
+        except WorkerError as e:
+            raise Oref0Error(str(e))
+
+
+def oref0_pool(size=None, workers_per_core=1, oref0_dir=None, node='node'):
+    """WorkerPool of Oref0Worker processes."""
+    return WorkerPool(lambda: Oref0Worker(oref0_dir, node=node), size=size, workers_per_core=workers_per_core)
@@ -0,0 +1,85 @@
+#!/usr/bin/env node
+/*
+ * Long-lived determine-basal worker.
+ *
+ * Loads oref0 once and answers one JSON request per stdin line with one JSON
+ * reply per stdout line:
+ *
+ *   {"id": 1, "iob": [...], "currenttemp": {...}, "glucose": [...], "profile": {...}}
+ *   {"id": 1, "result": {"reason": "...", "rate": 1, "duration": 30, ...}}
+ *
+ * An optional "currentTime" (ISO string or epoch ms) pins the clock for that
+ * request: it is passed to determine-basal and Date/Date.now() return it,
+ * so historical data is judged against the simulated tick.
+ *
+ * Usage: node oref0_worker.js [path/to/oref0]
+ */
+'use strict';
+
+var path = require('path');
+var readline = require('readline');
+
+var oref0Dir = path.resolve(process.argv[2] || path.join(__dirname, '..', 'oref0'));
+var determineBasal = require(path.join(oref0Dir, 'lib', 'determine-basal', 'determine-basal'));
+var tempBasalFunctions = require(path.join(oref0Dir, 'lib', 'basal-set-temp'));
+var getLastGlucose = require(path.join(oref0Dir, 'lib', 'glucose-get-last'));
+
+// determine-basal logs through console; keep stdout for replies only.
+console.log = console.error;
+
+var RealDate = Date;
+
+function pinDate(ms) {
+    global.Date = class extends RealDate {
+        constructor() {
+            if (arguments.length === 0) {
+                super(ms);
+            } else {
+                super(...arguments);
+            }
+        }
+
+        static now() {
+            return ms;
+        }
+    };
+}
+
+function decide(req) {
+    var currentTime = req.currentTime ? new RealDate(req.currentTime) : undefined;
+    if (currentTime) {
+        pinDate(currentTime.getTime());
+    }
+    try {
+        var glucoseStatus = getLastGlucose(req.glucose);
+        return determineBasal(
+            glucoseStatus,
+            req.currenttemp,
+            req.iob,
+            req.profile,
+            req.autosens || {ratio: 1},
+            req.meal || {},
+            tempBasalFunctions,
+            Boolean(req.microbolus),
+            req.reservoir || null,
+            currentTime
+        );
+    } finally {
+        global.Date = RealDate;
+    }
+}
+
+var rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', function (line) {
+    if (!line.trim()) {
+        return;
+    }
+    var reply;
+    try {
+        var req = JSON.parse(line);
+        reply = {id: req.id, result: decide(req)};
+    } catch (e) {
+        reply = {id: req && req.id, error: String(e && e.stack || e)};
+    }
+    process.stdout.write(JSON.stringify(reply) + '\n');
+});
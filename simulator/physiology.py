@@ -0,0 +1,219 @@
+"""
+Vectorized glucose-insulin physiology model for virtual patients.
+
+Every patient is a row of a (patients, states) float64 array, so one call
+to step() advances the whole cohort one 5-minute tick in lockstep.
+
+Compartments (all linear chains, so a dose's total effect is exact):
+    insulin_sc1 -> insulin_sc2 -> insulin_active   subcutaneous absorption, action
+    gut1 -> gut2                                     carb absorption
+    glucose                                          mg/dL
+
+    dG/dt = EGP - ISF * active / tau_i + (ISF / CR) * gut2 / tau_c - SG * (G - Gb)
+
+EGP balances the patient's scheduled basal, so a patient on exactly their
+basal rate with no carbs sits at Gb; each extra unit lowers glucose by ISF
+and each gram of carbs raises it by ISF / CR.
+"""
+
+import numpy as np
+
+from data_loader.timeutil import TICK_MINUTES, TICK_MS
+
+STATES = ('insulin_sc1', 'insulin_sc2', 'insulin_active', 'gut1', 'gut2', 'glucose')
+SC1, SC2, ACTIVE, GUT1, GUT2, GLUCOSE = range(len(STATES))
+
+MIN_GLUCOSE = 39
+MAX_GLUCOSE = 400
+
+
+def _profile_ratio(profile):
+    cr = profile.get('carb_ratio', 10)
+    return cr[0]['ratio'] if isinstance(cr, list) else cr
+
+
+class PatientModel(object):
+    """
+    Lockstep compartmental model for many patients.
+
+    Args:
+        isf, carb_ratio, basal: Per-patient arrays (mg/dL/U, g/U, U/hr)
+        tau_insulin: Minutes per insulin compartment (~55 peaks action near 75-90 min)
+        tau_carbs: Minutes per gut compartment
+        target: Glucose each patient settles at on exactly their basal (Gb)
+        glucose_effectiveness: SG, per-minute pull towards Gb
+        initial_glucose: Starting glucose (defaults to target)
+        substeps: Euler steps per 5-minute tick
+    """
+
+    def __init__(self, isf, carb_ratio, basal, tau_insulin=55.0, tau_carbs=40.0, target=110.0,
+                 glucose_effectiveness=0.0005, initial_glucose=None, substeps=TICK_MINUTES):
+        self.isf = np.asarray(isf, dtype=np.float64)
+        n = self.isf.shape[0]
+        self.carb_ratio = np.broadcast_to(np.asarray(carb_ratio, dtype=np.float64), (n,)).copy()
+        self.basal = np.broadcast_to(np.asarray(basal, dtype=np.float64), (n,)).copy()
+        self.tau_insulin = np.broadcast_to(np.asarray(tau_insulin, dtype=np.float64), (n,)).copy()
+        self.tau_carbs = np.broadcast_to(np.asarray(tau_carbs, dtype=np.float64), (n,)).copy()
+        self.target = np.broadcast_to(np.asarray(target, dtype=np.float64), (n,)).copy()
+        self.glucose_effectiveness = float(glucose_effectiveness)
+        self.substeps = int(substeps)
+        self.egp = self.isf * self.basal / 60  # mg/dL per minute
+
+        self.x = np.zeros((n, len(STATES)))
+        # Start at basal steady state: each insulin compartment holds basal/min * tau
+        steady = self.basal / 60 * self.tau_insulin
+        self.x[:, SC1] = steady
+        self.x[:, SC2] = steady
+        self.x[:, ACTIVE] = steady
+        self.x[:, GLUCOSE] = self.target if initial_glucose is None else initial_glucose
+
+    @classmethod
+    def from_profile(cls, n_patients, profile, seed=None, variability=0.2, **kwargs):
+        """
+        Sample n patients around a simdata/profile.json dict. ISF, carb
+        ratio and basal are lognormal with `variability` as sigma.
+        """
+        rng = np.random.default_rng(seed)
+        spread = lambda value: value * rng.lognormal(0.0, variability, n_patients)
+        kwargs.setdefault('target', profile.get('target_bg', 110))
+        return cls(
+            isf=spread(float(profile.get('sens', 50))),
+            carb_ratio=spread(float(_profile_ratio(profile))),
+            basal=spread(float(profile.get('current_basal', 1.0))),
+            tau_insulin=spread(55.0),
+            tau_carbs=spread(40.0),
+            **kwargs
+        )
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    @property
+    def glucose(self):
+        return self.x[:, GLUCOSE]
+
+    def step(self, insulin=0.0, carbs=0.0):
+        """
+        Advance every patient one 5-minute tick.
+
+        Args:
+            insulin: Units delivered over the tick, scalar or (patients,)
+            carbs: Grams eaten at the start of the tick, scalar or (patients,)
+
+        Returns:
+            Glucose after the tick, (patients,) view
+        """
+        x = self.x
+        x[:, GUT1] += carbs
+        dt = TICK_MINUTES / self.substeps
+        infusion = np.asarray(insulin, dtype=np.float64) / TICK_MINUTES
+        k_i = dt / self.tau_insulin
+        k_c = dt / self.tau_carbs
+        carb_gain = self.isf / self.carb_ratio
+        sg = self.glucose_effectiveness * dt
+        for _ in range(self.substeps):
+            sc1_out = x[:, SC1] * k_i
+            sc2_out = x[:, SC2] * k_i
+            action = x[:, ACTIVE] * k_i
+            gut1_out = x[:, GUT1] * k_c
+            appearance = x[:, GUT2] * k_c
+            x[:, SC1] += infusion * dt - sc1_out
+            x[:, SC2] += sc1_out - sc2_out
+            x[:, ACTIVE] += sc2_out - action
+            x[:, GUT1] -= gut1_out
+            x[:, GUT2] += gut1_out - appearance
+            x[:, GLUCOSE] += (self.egp * dt - self.isf * action + carb_gain * appearance
+                              - sg * (x[:, GLUCOSE] - self.target))
+        np.clip(x[:, GLUCOSE], MIN_GLUCOSE, MAX_GLUCOSE, out=x[:, GLUCOSE])
+        return x[:, GLUCOSE]
+
+
+def sample_meals(n_patients, n_ticks, seed=None, meals_per_day=((7, 45), (12.5, 60), (19, 70))):
+    """
+    Carb schedule of shape (ticks, patients): one meal per (hour, grams)
+    entry each day, with +/-45 min timing jitter and 25% size spread.
+    Tick 0 is midnight.
+    """
+    rng = np.random.default_rng(seed)
+    carbs = np.zeros((n_ticks, n_patients))
+    ticks_per_day = 24 * 60 // TICK_MINUTES
+    patients = np.arange(n_patients)
+    for day_start in range(0, n_ticks, ticks_per_day):
+        for hour, grams in meals_per_day:
+            jitter = rng.normal(0, 45, n_patients) / TICK_MINUTES
+            at = (day_start + hour * 60 / TICK_MINUTES + jitter).round().astype(int)
+            size = np.maximum(0, grams * rng.normal(1, 0.25, n_patients))
+            ok = (at >= 0) & (at < n_ticks)
+            np.add.at(carbs, (at[ok], patients[ok]), size[ok])
+    return carbs
+
+
+def _direction(delta):
+    """Dexcom trend arrow for a 5-minute delta in mg/dL."""
+    rate = delta / TICK_MINUTES
+    if rate <= -3:
+        return 'DoubleDown'
+    if rate <= -2:
+        return 'SingleDown'
+    if rate <= -1:
+        return 'FortyFiveDown'
+    if rate < 1:
+        return 'Flat'
+    if rate < 2:
+        return 'FortyFiveUp'
+    if rate < 3:
+        return 'SingleUp'
+    return 'DoubleUp'
+
+
+class PhysiologySource(object):
+    """
+    Glucose source for ClosedLoopSimulator backed by a one-patient model,
+    so the readings respond to the insulin the controller delivers.
+    """
+
+    def __init__(self, model, n_ticks, start_ms, carbs=None, cgm_noise=0.0, seed=None):
+        if len(model) != 1:
+            raise ValueError("PhysiologySource drives a single-patient model")
+        self.model = model
+        self.n_ticks = n_ticks
+        self.start_ms = int(start_ms)
+        self.carbs = np.zeros(n_ticks) if carbs is None else np.asarray(carbs, dtype=np.float64).reshape(n_ticks)
+        self.cgm_noise = cgm_noise
+        self._rng = np.random.default_rng(seed)
+        self._records = []
+
+    def __len__(self):
+        return self.n_ticks
+
+    def reading(self, tick):
+        while len(self._records) <= tick:
+            self._records.append(self._record(len(self._records)))
+        return self._records[tick]
+
+    def _record(self, tick):
+        glucose = float(self.model.glucose[0])
+        if self.cgm_noise:
+            glucose += self._rng.normal(0, self.cgm_noise)
+        glucose = int(round(min(MAX_GLUCOSE, max(MIN_GLUCOSE, glucose))))
+        previous = self._records[-1]['glucose'] if self._records else glucose
+        return {
+            'date': self.start_ms + tick * TICK_MS,
+            'glucose': glucose,
+            'sgv': glucose,
+            'direction': _direction(glucose - previous),
+            'noise': 1,
+            'filtered': glucose,
+            'unfiltered': glucose,
+            'rssi': 100,
+            'device': 'physiology',
+        }
+
+    def treatments(self):
+        """The carbs eaten, as treatment records the engine can announce."""
+        return [{'date': self.start_ms + int(tick) * TICK_MS, 'carbs': round(float(self.carbs[tick]), 1)}
+                for tick in np.nonzero(self.carbs)[0]]
+
+    def deliver(self, tick, units):
+        self.reading(tick)
+        self.model.step(units, self.carbs[tick])
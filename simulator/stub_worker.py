@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pure-Python stand-in for oref0_worker.js.
+
+Speaks the same JSON-lines protocol and returns decisions in the
+predictions/ format, using a simplified determine-basal rule:
+    eventualBG = bg - iob * sens + 6 * (delta - bgi)
+    rate = basal + 2 * (eventualBG - target_bg) / sens
+Good enough for tests and for exercising the simulator without oref0.
+"""
+
+import json
+import sys
+from datetime import datetime, timezone
+
+
+def _round_basal(rate):
+    return round(round(rate * 20) / 20, 2)
+
+
+def decide(request):
+    """Return one temp-basal decision for a worker request dict."""
+    glucose = request['glucose']
+    profile = request['profile']
+    iob_data = request['iob']
+    iob_data = iob_data[0] if isinstance(iob_data, list) else iob_data
+    currenttemp = request.get('currenttemp') or {}
+
+    bg = glucose[0].get('glucose', glucose[0].get('sgv'))
+    previous = glucose[1] if len(glucose) > 1 else glucose[0]
+    delta = bg - previous.get('glucose', previous.get('sgv'))
+
+    target = profile.get('target_bg', (profile.get('min_bg', 100) + profile.get('max_bg', 120)) / 2)
+    sens = profile.get('sens', 50)
+    basal = profile.get('current_basal', 1.0)
+    max_basal = profile.get('max_basal', 4 * basal)
+    iob = iob_data.get('iob', 0)
+    bgi = -iob_data.get('activity', 0) * sens * 5
+    eventual_bg = round(bg - iob * sens + 6 * (delta - bgi))
+    insulin_req = round((eventual_bg - target) / sens, 2)
+    threshold = profile.get('min_bg', 100) - 0.5 * (profile.get('min_bg', 100) - 40)
+
+    now = datetime.now(timezone.utc)
+    if request.get('currentTime'):
+        now = datetime.fromisoformat(request['currentTime'].replace('Z', '+00:00'))
+    result = {
+        'temp': 'absolute',
+        'bg': bg,
+        'tick': f'{delta:+d}' if isinstance(delta, int) else f'{delta:+.1f}',
+        'eventualBG': eventual_bg,
+        'insulinReq': insulin_req,
+        'deliverAt': now.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        'IOB': iob,
+    }
+    if bg < threshold or eventual_bg < threshold:
+        rate, reason = 0, f"BG {bg} or eventualBG {eventual_bg} below threshold {threshold:g}; setting zero temp"
+    else:
+        rate = _round_basal(min(max_basal, max(0, basal + 2 * insulin_req)))
+        reason = f"eventualBG {eventual_bg}, insulinReq {insulin_req}; temp {rate}U/hr"
+    if currenttemp.get('duration', 0) > 15 and currenttemp.get('rate') == rate:
+        result['reason'] = reason + f", temp {rate} ~ req {rate}U/hr. "
+        return result
+    result.update(reason=reason, duration=30, rate=rate)
+    return result
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            reply = {'id': request.get('id'), 'result': decide(request)}
+        except Exception as e:
+            reply = {'id': request.get('id'), 'error': f'{type(e).__name__}: {e}'}
+        sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Long-lived determine-basal workers and a pool to manage them.
+
+A worker is any process that reads one JSON request per stdin line
+(iob, currenttemp, glucose, profile) and writes one JSON reply per stdout
+line. oref0_worker.js is the real one; stub_worker.py is a pure-Python
+stand-in for machines without the oref0 submodule.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+STUB_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_worker.py')
+
+
+class WorkerError(RuntimeError):
+    """Raised when a worker reports an error or exits unexpectedly."""
+
+
+class JsonLinesWorker(object):
+    """
+    One persistent worker process speaking the JSON-lines protocol.
+    Usable as a context manager; call close() when done otherwise.
+    """
+
+    def __init__(self, cmd, cwd=None, stderr=subprocess.DEVNULL):
+        self._next_id = 0
+        self.proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+            bufsize=1,
+        )
+
+    def request(self, payload):
+        """Send one request dict and return the worker's result dict."""
+        self._next_id += 1
+        request = dict(payload, id=self._next_id)
+        try:
+            self.proc.stdin.write(json.dumps(request) + '\n')
+            self.proc.stdin.flush()
+            line = self.proc.stdout.readline()
+        except (BrokenPipeError, ValueError) as e:
+            raise WorkerError(f"worker is not running: {e}")
+        if not line:
+            raise WorkerError(f"worker exited with code {self.proc.poll()}")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise WorkerError(reply['error'])
+        return reply['result']
+
+    def determine_basal(self, glucose, iob, currenttemp, profile, **extra):
+        """
+        Run one determine-basal decision.
+
+        Args:
+            glucose: Newest-first list of readings (simdata/glucose.json records)
+            iob: IOB array (simdata/iob.json format)
+            currenttemp: Dict in simdata/currenttemp.json format
+            profile: Dict in simdata/profile.json format
+            extra: Optional autosens, meal, microbolus, reservoir inputs
+
+        Returns:
+            Dict in the same format oref0 writes to predictions/
+        """
+        return self.request(dict(extra, glucose=glucose, iob=iob, currenttemp=currenttemp, profile=profile))
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StubWorker(JsonLinesWorker):
+    """Pure-Python stand-in for the oref0 worker (see stub_worker.py)."""
+
+    def __init__(self, stderr=subprocess.DEVNULL):
+        super().__init__([sys.executable, STUB_WORKER], stderr=stderr)
+
+
+def default_pool_size(workers_per_core=1):
+    return max(1, int((os.cpu_count() or 1) * workers_per_core))
+
+
+class WorkerPool(object):
+    """
+    A fixed set of long-lived workers shared between threads.
+
+    determine_basal() borrows whichever worker is idle, so the pool can be
+    handed to several ClosedLoopSimulator instances running in threads.
+    map() fans a batch of independent requests out over every worker.
+
+    Args:
+        factory: Zero-argument callable returning a new worker
+        size: Number of workers (default: workers_per_core * CPU count)
+        workers_per_core: Used when size is not given
+    """
+
+    def __init__(self, factory, size=None, workers_per_core=1):
+        self.size = size or default_pool_size(workers_per_core)
+        self._workers = []
+        self._idle = queue.Queue()
+        try:
+            for _ in range(self.size):
+                worker = factory()
+                self._workers.append(worker)
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+        self._executor = ThreadPoolExecutor(max_workers=self.size)
+
+    def request(self, payload):
+        worker = self._idle.get()
+        try:
+            return worker.request(payload)
+        finally:
+            self._idle.put(worker)
+
+    def determine_basal(self, glucose, iob, currenttemp, profile, **extra):
+        """Same contract as JsonLinesWorker.determine_basal, on any idle worker."""
+        return self.request(dict(extra, glucose=glucose, iob=iob, currenttemp=currenttemp, profile=profile))
+
+    def map(self, payloads):
+        """Run independent requests across all workers; results keep input order."""
+        return list(self._executor.map(self.request, payloads))
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn in the pool's threads, e.g. one simulation per worker."""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def close(self):
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=True)
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -16,22 +16,15 @@ def _load_training_data():
         from data_loader import load_training_data
         X, y, profile = load_training_data()
         if X is not None and len(X) >= 10:
-            return np.array(X).astype(np.float32), np.array(y).astype(np.float32), profile
+            return X, y, profile
     except Exception:
         pass
 
     # Fallback: use profile from simdata
     root = os.path.dirname(os.path.abspath(__file__))
     profile_path = os.path.join(root, 'simdata', 'profile.json')
-    profile = {'target_bg': 110, 'sens': 50, 'carb_ratio': 10}
-    if os.path.exists(profile_path):
-        import json
-        with open(profile_path) as f:
-            p = json.load(f)
-            profile['target_bg'] = p.get('target_bg', p.get('min_bg', 110))
-            profile['sens'] = p.get('sens', 50)
-            cr = p.get('carb_ratio', [{'ratio': 10}])
-            profile['carb_ratio'] = cr[0]['ratio'] if isinstance(cr, list) else 10
+    from data_loader.profile import Profile
+    profile = (Profile.load(profile_path) if os.path.exists(profile_path) else Profile()).params()
 
     # Generate synthetic training data using profile parameters
     target = profile['target_bg']
@@ -42,6 +35,19 @@ def _load_training_data():
     return glucose_train.reshape(-1, 1), insulin_train, profile
 
 
+def _autosens_ratio(root):
+    """Current autosens ratio over the simdata glucose series and pump history."""
+    try:
+        from simulator.autosens import autosens_records
+        from simulator.engine import load_inputs
+        inputs = load_inputs(os.path.join(root, 'simdata'))
+        if not inputs['glucose'] or not inputs['profile']:
+            return 1.0
+        return float(autosens_records(inputs['glucose'], inputs['profile'], inputs['pumphistory'])[-1])
+    except (FileNotFoundError, KeyError, ValueError):
+        return 1.0
+
+
 def _data_driven_formula(glucose, target_bg, sens, beta0=0.05, beta1=None):
     """
     Linear regression formula with data parameters:
@@ -60,6 +66,7 @@ def create_and_train_model():
     with coefficients fit from actual/synthetic glucose-insulin data.
     """
     X, y, profile = _load_training_data()
+    profile = dict(profile, sensitivity_ratio=_autosens_ratio(os.path.dirname(os.path.abspath(__file__))))
     target_bg = profile.get('target_bg', 110)
     sens = profile.get('sens', 50)
 
@@ -82,14 +89,17 @@ def create_and_train_model():
     return model
 
 
-def predict_insulin(model, glucose, target_bg=None, sens=None):
+def predict_insulin(model, glucose, target_bg=None, sens=None, sensitivity_ratio=None):
     """
     Predict insulin dose. Uses profile parameters for centering.
+    The autosens ratio (from training time unless given) scales the
+    centered glucose, so the model doses against the effective ISF, sens / ratio.
     """
     profile = getattr(model, '_profile', {})
     target = target_bg or profile.get('target_bg', 110)
+    ratio = sensitivity_ratio or profile.get('sensitivity_ratio', 1.0)
     glucose_arr = np.atleast_1d(glucose).astype(np.float32)
-    X_centered = (glucose_arr - target).reshape(-1, 1)
+    X_centered = ((glucose_arr - target) * ratio).reshape(-1, 1)
     return model.predict(X_centered, verbose=0).flatten()
 
 
@@ -99,4 +109,5 @@ if __name__ == '__main__':
     predicted = predict_insulin(model, test_glucose)
     print(f"Glucose: {test_glucose}")
     print(f"Predicted Insulin: {predicted}")
-    print(f"Profile: target_bg={model._profile.get('target_bg')}, sens={model._profile.get('sens')}")
+    print(f"Profile: target_bg={model._profile.get('target_bg')}, sens={model._profile.get('sens')}, "
+          f"autosens ratio={model._profile.get('sensitivity_ratio')}")
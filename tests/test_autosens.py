@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.autosens import Autosens, autosens_series
+from simulator.clock import VirtualClock
+from simulator.determine_basal import PythonDetermineBasal
+from simulator.engine import ClosedLoopSimulator, ReplaySource
+
+START = 1735689600000
+TICK = 5 * 60 * 1000
+PROFILE = {'sens': 50, 'current_basal': 1.0, 'dia': 3, 'min_bg': 100, 'max_bg': 120, 'max_iob': 3}
+
+
+class AutosensTestCase(TestCase):
+    """Rolling sensitivity ratio."""
+
+    def ratios(self, glucose, activity=0.0, **kwargs):
+        dates = START + np.arange(len(glucose)) * TICK
+        return autosens_series(glucose, dates, np.broadcast_to(activity, len(glucose)), PROFILE, **kwargs)
+
+    def test_flat_glucose_is_neutral(self):
+        np.testing.assert_array_equal(self.ratios(np.full(300, 120.0)), 1.0)
+
+    def test_falling_faster_than_insulin_explains_is_sensitive(self):
+        ratios = self.ratios(200 - 0.25 * np.arange(300))
+        self.assertLess(ratios[-1], 1.0)
+        self.assertGreaterEqual(ratios.min(), 0.7)
+
+    def test_rising_against_insulin_is_resistant(self):
+        # Each 5 minutes BG holds where insulin should have dropped it 0.5 mg/dL
+        ratios = self.ratios(np.full(300, 150.0), activity=0.002)
+        self.assertEqual(ratios[-1], 1 + 0.5 * 12 / 50)
+
+    def test_old_deviations_leave_the_window(self):
+        detector = Autosens(PROFILE, window_ms=12 * TICK)
+        for i in range(100):
+            detector.update(100 + 2 * i, START + i * TICK, 0.0)
+        self.assertEqual(len(detector), 12)
+        self.assertEqual(detector._sorted, sorted(d for _, d in detector._deviations))
+
+    def test_engine_passes_ratio_to_controller(self):
+        records = [{'date': START + i * TICK, 'glucose': 200 - i} for i in range(80)]
+        sim = ClosedLoopSimulator(PythonDetermineBasal(), PROFILE, autosens=True, clock=VirtualClock(START))
+        ticks = sim.run(ReplaySource(records), start=4)
+        # High temps keep IOB up while BG falls only 1 mg/dL per reading
+        self.assertGreater(ticks[-1]['suggested']['sensitivityRatio'], 1.0)
+        self.assertEqual(ticks[0]['suggested']['sensitivityRatio'], 1.0)
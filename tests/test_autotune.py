@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.autotune import autotune, split_days
+from simulator.cob import cob_series
+from simulator.iob import kernels
+from simulator.physiology import sample_meals
+from data_loader.timeutil import iso
+
+START = 1735689600000
+TICK = 5 * 60 * 1000
+PROFILE = {
+    'sens': 50,
+    'dia': 3,
+    'current_basal': 1.0,
+    'basalprofile': [{'start': '00:00:00', 'minutes': 0, 'rate': 1.0}],
+    'isfProfile': {'sens': [{'i': 0, 'start': '00:00:00', 'sensitivity': 50}]},
+    'carb_ratio': [{'i': 0, 'start': '00:00:00', 'ratio': 10}],
+}
+
+
+def history(days, carb_ratio=10.0, basal=1.0, seed=0):
+    """
+    Readings from a patient who follows the tuner's own insulin and carb
+    curves, bolused by PROFILE for meals and corrected every 3 hours.
+    """
+    n = days * 288
+    meals = sample_meals(1, n, seed)[:, 0]
+    kernel = kernels(3.0)[1]
+    activity = np.zeros(n * 5 + len(kernel))
+    carbs = [{'date': START + int(t) * TICK, 'carbs': round(float(meals[t]), 1)} for t in np.nonzero(meals)[0]]
+    carb_impact = cob_series([c['date'] for c in carbs], [c['carbs'] for c in carbs], START, n,
+                             carb_ratio, 50)['carb_impact']
+    pumphistory = []
+    glucose = []
+    bg = 110.0
+    for t in range(n):
+        units = round(meals[t] / 10, 2) if meals[t] else 0
+        if not units and t % 36 == 0 and bg > 125:
+            units = round((bg - 110) / 50, 2)
+        if units:
+            pumphistory.append({'_type': 'Bolus', 'amount': units, 'timestamp': iso(START + t * TICK)})
+            activity[t * 5:t * 5 + len(kernel)] += units * kernel
+        glucose.append({'date': START + t * TICK, 'glucose': round(bg)})
+        bg += -activity[t * 5:t * 5 + 5].sum() * 50 + carb_impact[t] + (basal - 1.0) * 50 / 12
+    return glucose, pumphistory, carbs
+
+
+class AutotuneTestCase(TestCase):
+    """Profile fitting recovers the settings the data was generated with."""
+
+    def tune(self, **kwargs):
+        glucose, pumphistory, carbs = history(7, **kwargs)
+        return autotune(glucose, PROFILE, pumphistory, carbs, processes=2)
+
+    def test_matching_profile_is_kept(self):
+        tuned, stats = self.tune()
+        self.assertEqual(stats['days'], 7)
+        rates = [b['rate'] for b in tuned['basalprofile']]
+        self.assertEqual(len(rates), 24)
+        np.testing.assert_allclose(rates, 1.0, atol=0.05)
+        self.assertAlmostEqual(tuned['carb_ratio'][0]['ratio'], 10, delta=0.3)
+
+    def test_basal_shortfall_raises_basal(self):
+        tuned, _ = self.tune(basal=1.1)
+        rates = [b['rate'] for b in tuned['basalprofile']]
+        self.assertAlmostEqual(float(np.mean(rates)), 1.1, delta=0.03)
+
+    def test_carb_ratio_is_fit_from_meals(self):
+        tuned, _ = self.tune(carb_ratio=8.0)
+        self.assertAlmostEqual(tuned['carb_ratio'][0]['ratio'], 8, delta=0.4)
+        self.assertEqual(PROFILE['carb_ratio'][0]['ratio'], 10)
+
+    def test_empty_history(self):
+        self.assertEqual(split_days([], PROFILE), [])
@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from data_loader import cache, load_simdata
+from data_loader.series import GlucoseSeries
+
+from tests.test_series import records
+
+
+class CacheTestCase(TestCase):
+    """Parsed datasets cached by source file fingerprint."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'simdata'))
+        self.glucose_path = os.path.join(self.root, 'simdata', 'glucose.json')
+        self.write(records(60))
+        self.cache_dir = os.path.join(self.root, 'data', 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, data):
+        with open(self.glucose_path, 'w') as f:
+            json.dump(data, f)
+
+    def test_round_trip(self):
+        series = GlucoseSeries.from_records(records(10))
+        path = cache.save(os.path.join(self.cache_dir, 'test-0.npz'), series, [(100.0, 0.05)], {'sens': 50})
+        glucose_data, pairs, profile = cache.load(path)
+        self.assertEqual(glucose_data.to_records(), records(10))
+        self.assertEqual(pairs.tolist(), [[100.0, 0.05]])
+        self.assertEqual(profile, {'sens': 50})
+
+    def test_reused_until_the_file_changes(self):
+        glucose_data, _, pairs = load_simdata(self.root)
+        self.assertEqual(len(glucose_data), 60)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        def parse():
+            raise AssertionError('cached entry was not reused')
+        cache.cached('simdata-glucose', [self.glucose_path], 1, parse, self.cache_dir)
+
+        self.write(records(80))
+        os.utime(self.glucose_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        glucose_data, _, _ = load_simdata(self.root)
+        self.assertEqual(len(glucose_data), 80)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_version_changes_the_key(self):
+        paths = [self.glucose_path]
+        self.assertNotEqual(cache.fingerprint(paths, 1), cache.fingerprint(paths, 2))
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.cob import cob_series, meal_data
+
+
+class CobSeriesTestCase(TestCase):
+    """Meal absorption over a whole timeline."""
+
+    def setUp(self):
+        hour = 3600 * 1000
+        self.series = cob_series([0, 4 * hour], [60, 30], 0, 24 * 12, carb_ratio=10, sens=50)
+
+    def test_carbs_are_fully_absorbed(self):
+        np.testing.assert_allclose(self.series['absorbed'].sum(), 90)
+        np.testing.assert_allclose(self.series['carb_impact'].sum(), 90 * 50 / 10)
+        self.assertEqual(self.series['cob'][0], 60)
+        self.assertEqual(self.series['cob'][-1], 0)
+
+    def test_meal_data_tracks_recent_carbs(self):
+        meal = meal_data(self.series)
+        self.assertEqual(meal['carbs'][48], 90)
+        self.assertEqual(meal['lastCarbTime'][47], 0)
+        self.assertEqual(meal['lastCarbTime'][48], 4 * 3600 * 1000)
+        np.testing.assert_array_equal(meal['mealCOB'], self.series['cob'])
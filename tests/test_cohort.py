@@ -0,0 +1,50 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, skipUnless
+
+from simulator import load_inputs
+from simulator import cohort
+from simulator.cohort import run_cohort, virtual_patients
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _worker_pid(_):
+    return cohort._worker.proc.pid
+
+
+class CohortTestCase(TestCase):
+    """Sharded cohort runs merge every patient back in input order."""
+
+    def setUp(self):
+        self.profile = load_inputs(os.path.join(ROOT, 'simdata'))['profile']
+        self.patients = virtual_patients(5, days=0.1, seed=4)
+
+    def run_cohort(self, patients, processes):
+        return run_cohort(patients, self.profile, processes=processes, backend='python')
+
+    def test_independent_of_processes(self):
+        single = self.run_cohort(self.patients, 1)
+        pooled = self.run_cohort(self.patients, 2)
+        self.assertEqual(single, pooled)
+        self.assertEqual([p['id'] for p in single['patients']], [p['id'] for p in self.patients])
+        self.assertEqual(single['cohort']['patients'], 5)
+        self.assertEqual(single['cohort']['ticks'], 5 * self.patients[0]['n_points'])
+
+    def test_generator_and_repeated_ids(self):
+        result = self.run_cohort((spec for spec in self.patients), 2)
+        self.assertEqual(len(result['patients']), 5)
+        twice = [self.patients[0], dict(self.patients[1], id=self.patients[0]['id'])]
+        result = self.run_cohort(twice, 2)
+        self.assertEqual([p['id'] for p in result['patients']], [self.patients[0]['id']] * 2)
+        self.assertNotEqual(result['patients'][0]['summary'], result['patients'][1]['summary'])
+
+    @skipUnless(os.path.isdir('/proc'), 'needs /proc')
+    def test_pool_workers_closed_on_shutdown(self):
+        with ProcessPoolExecutor(1, initializer=cohort._init_worker, initargs=('stub', None)) as executor:
+            pid = executor.submit(_worker_pid, 0).result()
+        deadline = time.time() + 5
+        while os.path.exists(f'/proc/{pid}') and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(os.path.exists(f'/proc/{pid}'))
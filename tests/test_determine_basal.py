@@ -0,0 +1,186 @@
+import glob
+import json
+import os
+import re
+from datetime import datetime
+from unittest import TestCase, skipUnless
+
+import numpy as np
+
+from simulator import ClosedLoopSimulator, Oref0Worker, ReplaySource, VirtualClock, load_inputs, oref0_available
+from simulator import determine_basal
+from simulator.determine_basal import PythonDetermineBasal, determine_basal_batch, glucose_status, known_deviation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+OREF0_FIXTURES = os.path.join(FIXTURES, 'determine_basal_oref0.json')
+
+
+class Recorder(object):
+    """Controller wrapper that keeps every request and decision."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.calls = []
+
+    def determine_basal(self, glucose, iob, currenttemp, profile, **extra):
+        result = self.controller.determine_basal(glucose, iob, currenttemp, profile, **extra)
+        self.calls.append(((glucose, iob, currenttemp, profile), extra, result))
+        return result
+
+
+class RecordedPredictionsTestCase(TestCase):
+    """The Python port reproduces the oref0 outputs stored in predictions/."""
+
+    def test_matches_recorded_predictions(self):
+        inputs = load_inputs(os.path.join(ROOT, 'simdata'))
+        files = sorted(glob.glob(os.path.join(ROOT, 'predictions', 'prediction-*.json')))
+        self.assertTrue(files)
+        for path in files:
+            with open(path) as f:
+                recorded = json.load(f)
+            # e.g. "... read 1052820.9m ago at Thu Aug 24 2023 16:10:00 GMT+0530 (India Standard Time)"
+            match = re.search(r'read ([\d.]+)m ago at \w+ (\w+ \d+ \d+ [\d:]+) GMT([+-]\d{4})', recorded['reason'])
+            bg_time = datetime.strptime(f'{match.group(2)} {match.group(3)}', '%b %d %Y %H:%M:%S %z')
+            glucose = [{'date': int(bg_time.timestamp() * 1000), 'glucose': 120}]
+
+            result = PythonDetermineBasal().determine_basal(
+                glucose, [{'iob': 0, 'activity': 0}], inputs['currenttemp'], inputs['profile'],
+                currentTime=recorded['deliverAt'])
+
+            for key in ['temp', 'duration', 'rate', 'deliverAt']:
+                self.assertEqual(result[key], recorded[key], f'{key} differs for {path}')
+            self.assertIn(f'read {match.group(1)}m ago', result['reason'])
+            self.assertIn('BG data is too old', result['reason'])
+
+
+def _load_fixtures():
+    with open(os.path.join(FIXTURES, 'determine_basal.json')) as f:
+        return json.load(f)
+
+
+def _port(case, fixtures):
+    return PythonDetermineBasal().determine_basal(case['glucose'], case['iob'], case['currenttemp'],
+                                                  fixtures['profile'], currentTime=fixtures['currentTime'])
+
+
+def _known_deviation(ours, theirs, profile):
+    """True when oref0's minPredBG/minGuardBG put the decision on one of the port's known deviations."""
+    match = re.search(r'minPredBG (-?[\d.]+), minGuardBG (-?[\d.]+)', theirs.get('reason', ''))
+    if match is None or 'eventualBG' not in ours:
+        return False
+    return bool(known_deviation(ours['bg'], ours['eventualBG'], float(match.group(1)), float(match.group(2)),
+                                profile)[0])
+
+
+def _assert_same_decision(test, ours, theirs, profile, msg):
+    """Exact temp/rate/duration, unless a known deviation; returns whether the decision was compared."""
+    if _known_deviation(ours, theirs, profile):
+        return False
+    test.assertEqual('rate' in ours, 'rate' in theirs, f'only one side sets a rate: {msg}')
+    for key in ['temp', 'rate', 'duration']:
+        test.assertEqual(ours.get(key), theirs.get(key), f'{key} differs: {msg}')
+    return True
+
+
+class BranchFixturesTestCase(TestCase):
+    """One checked-in case per branch of the ladder."""
+
+    def test_branches(self):
+        fixtures = _load_fixtures()
+        for case in fixtures['cases']:
+            glucose = case['glucose']
+            status = glucose_status(np.array([[g['glucose'] for g in glucose]], dtype=np.float64),
+                                    np.array([[g['date'] for g in glucose]], dtype=np.float64))
+            temp = case['currenttemp']
+            now = datetime.fromisoformat(fixtures['currentTime'].replace('Z', '+00:00')).timestamp() * 1000
+            out = determine_basal_batch(status, case['iob'][0]['iob'], case['iob'][0]['activity'],
+                                        temp.get('rate', 0), temp.get('duration', 0), fixtures['profile'], now)
+            self.assertEqual(int(out['code'][0]), getattr(determine_basal, case['branch']), case['name'])
+
+    def test_kept_temp_reason_names_required_rate(self):
+        fixtures = _load_fixtures()
+        cases = {case['name']: case for case in fixtures['cases']}
+        # Flat at 100 with 0.02 U IOB: eventualBG 99, insulinReq 2 * (99 - 110) / 50 = -0.44,
+        # so the low temp wanted is basal + 2 * insulinReq = 0.12, rounded to 0.1
+        below = _port(cases['below_keep_temp'], fixtures)
+        self.assertNotIn('rate', below)
+        self.assertTrue(below['reason'].endswith('temp 0.1 ~< req 0.1U/hr. '), below['reason'])
+        # Rising 1 mg/dL per 5m from 180: eventualBG 186, insulinReq (186 - 110) / 50 = 1.52, so
+        # basal + 2 * insulinReq = 4.04, capped at 3 * max_daily_basal = 3
+        above = _port(cases['above_keep_temp'], fixtures)
+        self.assertNotIn('rate', above)
+        self.assertTrue(above['reason'].endswith('temp 4 >~ req 3U/hr. '), above['reason'])
+
+    def test_negative_iob_rising_skips_low_suspend(self):
+        fixtures = _load_fixtures()
+        case = dict(next(c for c in fixtures['cases'] if c['name'] == 'low_suspend'))
+        # Rising 2 mg/dL per 5m at 65 with IOB below -20 minutes of basal
+        case['glucose'] = [dict(g, glucose=65 - 2 * i) for i, g in enumerate(case['glucose'])]
+        case['iob'] = [{'iob': -1, 'activity': 0}]
+        result = _port(case, fixtures)
+        self.assertNotIn('< threshold', result['reason'])
+        self.assertNotEqual(result.get('rate'), 0)
+
+    def test_known_deviations(self):
+        profile = _load_fixtures()['profile']
+        # bg, eventualBG, minPredBG, minGuardBG; threshold is 70
+        deviates = known_deviation([80, 80, 150, 150, 110], [90, 90, 150, 150, 110], [90, 90, 150, 130, 60],
+                                   [75, 60, 150, 150, 60], profile)
+        self.assertEqual(deviates.tolist(), [False, True, False, True, True])
+
+
+@skipUnless(os.path.exists(OREF0_FIXTURES), 'no recorded oref0 decisions (run scripts/record_oref0_fixtures.py)')
+class Oref0FixturesTestCase(TestCase):
+    """The port against oref0's decisions for the same cases, recorded by scripts/record_oref0_fixtures.py."""
+
+    def test_matches_recorded_oref0(self):
+        fixtures = _load_fixtures()
+        with open(OREF0_FIXTURES) as f:
+            recorded = json.load(f)['cases']
+        self.assertEqual(sorted(recorded), sorted(case['name'] for case in fixtures['cases']))
+        for case in fixtures['cases']:
+            theirs = recorded[case['name']]
+            _assert_same_decision(self, _port(case, fixtures), theirs, fixtures['profile'],
+                                  f"{case['name']}: {theirs.get('reason')}")
+
+
+class BatchTestCase(TestCase):
+    """One batched call gives the same decisions as one call per case."""
+
+    def test_batch_matches_single_cases(self):
+        inputs = load_inputs(os.path.join(ROOT, 'simdata'))
+        glucose = sorted(inputs['glucose'], key=lambda g: g['date'], reverse=True)
+        windows = [glucose[i:i + 36] for i in range(0, 400, 10)]
+        values = np.array([[g['glucose'] for g in w] for w in windows], dtype=np.float64)
+        dates = np.array([[g['date'] for g in w] for w in windows], dtype=np.float64)
+        iob = np.linspace(-1, 4, len(windows))
+        temp_rate = np.tile([0, 1.0, 2.5, 4.0], len(windows) // 4)
+        now = dates[:, 0] + 60000
+
+        batch = determine_basal_batch(glucose_status(values, dates), iob, iob / 100, temp_rate, 20,
+                                      inputs['profile'], now)
+        for i in range(len(windows)):
+            single = determine_basal_batch(glucose_status(values[i:i + 1], dates[i:i + 1]), iob[i], iob[i] / 100,
+                                           temp_rate[i], 20, inputs['profile'], now[i])
+            np.testing.assert_array_equal(batch['code'][i:i + 1], single['code'])
+            np.testing.assert_array_equal(batch['rate'][i:i + 1], single['rate'])
+            np.testing.assert_array_equal(batch['duration'][i:i + 1], single['duration'])
+
+
+@skipUnless(oref0_available(), 'oref0 submodule not checked out')
+class Oref0ParityTestCase(TestCase):
+    """Python port against oref0 on every tick of the simdata/ fixtures."""
+
+    def test_simdata_fixtures(self):
+        inputs = load_inputs(os.path.join(ROOT, 'simdata'))
+        recorder = Recorder(PythonDetermineBasal())
+        ClosedLoopSimulator(recorder, inputs['profile'], clock=VirtualClock()).run(
+            ReplaySource(inputs['glucose']), currenttemp=inputs['currenttemp'], pumphistory=inputs['pumphistory'])
+
+        compared = 0
+        with Oref0Worker() as worker:
+            for tick, (args, extra, ours) in enumerate(recorder.calls):
+                theirs = worker.determine_basal(*args, **extra)
+                compared += _assert_same_decision(self, ours, theirs, args[3], f"tick {tick}: {theirs['reason']}")
+        self.assertTrue(compared)
@@ -0,0 +1,84 @@
+import os
+from unittest import TestCase
+
+from simulator import ClosedLoopSimulator, ReplaySource, StubWorker, VirtualClock, load_inputs
+from simulator.engine import PROJECTION_TICKS
+from data_loader.timeutil import TICK_MS, iso, parse_ms
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Scripted(object):
+    """Controller returning queued suggestions (then none) and keeping every request."""
+
+    def __init__(self, *suggestions):
+        self.suggestions = list(suggestions)
+        self.calls = []
+
+    def determine_basal(self, glucose, iob, currenttemp, profile, **extra):
+        self.calls.append({'glucose': glucose, 'iob': iob, 'currenttemp': currenttemp, 'extra': extra})
+        return self.suggestions.pop(0) if self.suggestions else {'reason': 'no change'}
+
+
+class ClosedLoopSimulatorTestCase(TestCase):
+    """The engine loop over the simdata/ fixtures."""
+
+    def setUp(self):
+        self.inputs = load_inputs(os.path.join(ROOT, 'simdata'))
+        self.source = ReplaySource(self.inputs['glucose'])
+        self.profile = self.inputs['profile']
+        self.basal = self.profile['current_basal']
+
+    def simulator(self, controller, **kwargs):
+        return ClosedLoopSimulator(controller, self.profile, clock=VirtualClock(), **kwargs)
+
+    def test_warm_up_fills_window_newest_first(self):
+        controller = Scripted()
+        results = self.simulator(controller, window=12).run(self.source, start=len(self.source) - 1)
+        self.assertEqual(len(results), 1)
+        glucose = controller.calls[0]['glucose']
+        self.assertEqual(len(glucose), 12)
+        self.assertEqual(glucose[0]['date'], self.source.reading(len(self.source) - 1)['date'])
+        self.assertEqual([g['date'] for g in glucose], sorted((g['date'] for g in glucose), reverse=True))
+        self.assertEqual(parse_ms(controller.calls[0]['extra']['currentTime']), glucose[0]['date'])
+
+    def test_bolus_iob_projection(self):
+        start_ms = self.source.reading(0)['date']
+        pumphistory = [{'_type': 'Bolus', 'amount': 2.0, 'timestamp': iso(start_ms)}]
+        controller = Scripted()
+        self.simulator(controller).run(self.source, pumphistory=pumphistory, stop=12)
+        first = controller.calls[0]['iob']
+        self.assertEqual(len(first), PROJECTION_TICKS)
+        self.assertEqual(first[0]['iob'], 2.0)
+        self.assertEqual(first[1]['time'], iso(start_ms + TICK_MS))
+        projected = [tick['iob'] for tick in first]
+        self.assertEqual(projected, sorted(projected, reverse=True))
+        self.assertLess(projected[-1], 0.1)
+        # Later ticks see the bolus decayed as the projection said
+        self.assertEqual([call['iob'][0]['iob'] for call in controller.calls], projected[:12])
+        # A zero temp from now on only ever lowers IOB
+        self.assertTrue(all(t['iobWithZeroTemp']['iob'] <= t['iob'] for t in first))
+
+    def test_temp_runs_for_its_duration_then_expires(self):
+        controller = Scripted({'rate': 2.0, 'duration': 30, 'temp': 'absolute'})
+        results = self.simulator(controller).run(self.source, stop=9)
+        self.assertEqual([r['rate'] for r in results], [2.0] * 6 + [self.basal] * 3)
+        self.assertEqual([c['currenttemp']['duration'] for c in controller.calls], [0, 25, 20, 15, 10, 5, 0, 0, 0])
+        self.assertEqual(results[0]['delivered'], round(2.0 * 5 / 60, 4))
+        # Above-basal delivery shows up as basal IOB on the next tick
+        self.assertGreater(controller.calls[1]['iob'][0]['basaliob'], 0)
+
+    def test_cancel_with_zero_duration(self):
+        controller = Scripted({'rate': 0, 'duration': 60}, {'rate': 0, 'duration': 0})
+        results = self.simulator(controller).run(self.source, stop=3)
+        self.assertEqual([r['rate'] for r in results], [0, self.basal, self.basal])
+
+    def test_stub_worker_loop(self):
+        with StubWorker() as worker:
+            results = self.simulator(worker).run(self.source, currenttemp=self.inputs['currenttemp'],
+                                                 pumphistory=self.inputs['pumphistory'], stop=24)
+        self.assertEqual(len(results), 24)
+        for result in results:
+            self.assertIn('reason', result['suggested'])
+            self.assertGreaterEqual(result['rate'], 0)
+            self.assertAlmostEqual(result['delivered'], result['rate'] * 5 / 60, places=4)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.forecast import forecast_errors, forecast_series
+
+START = 1735689600000
+HOUR = 3600 * 1000
+
+
+class ForecastTestCase(TestCase):
+    """Forecast curves for a whole series."""
+
+    def setUp(self):
+        self.dates = START + np.arange(72) * 5 * 60 * 1000
+        self.glucose = np.full(72, 120.0)
+        self.profile = {'sens': 50, 'carb_ratio': 10, 'current_basal': 1.0, 'dia': 3}
+
+    def test_flat_series_forecasts_flat(self):
+        forecast = forecast_series(self.glucose, self.dates, self.profile)
+        self.assertEqual(forecast['IOB'].shape, (72, 48))
+        np.testing.assert_allclose(forecast['IOB'], 120)
+        np.testing.assert_allclose(forecast['COB'], 120)
+        # A zero temp withholds basal, so glucose is forecast to rise
+        self.assertGreater(forecast['ZT'][-1, -1], 120)
+
+    def test_bolus_lowers_iob_curve_by_isf(self):
+        bolus = [{'_type': 'Bolus', 'amount': 1.0, 'timestamp': int(self.dates[12])}]
+        forecast = forecast_series(self.glucose, self.dates, self.profile, pumphistory=bolus)
+        # Just after the bolus nearly all of its effect is still ahead
+        self.assertAlmostEqual(forecast['IOB'][12, -1], 120 - 50, delta=3)
+        self.assertGreater(forecast['IOB'][40, -1], forecast['IOB'][12, -1])
+
+    def test_carbs_raise_cob_curve(self):
+        carbs = [{'date': int(self.dates[12]), 'carbs': 30}]
+        forecast = forecast_series(self.glucose, self.dates, self.profile, carbs=carbs)
+        self.assertAlmostEqual(forecast['COB'][12, -1], 120 + 30 * 50 / 10, delta=3)
+        np.testing.assert_allclose(forecast['IOB'][12], 120)
+
+    def test_errors_per_step(self):
+        forecast = forecast_series(self.glucose, self.dates, self.profile)
+        errors = forecast_errors(forecast, self.glucose, self.dates)
+        np.testing.assert_allclose(errors['mae'], 0)
+        self.assertEqual(errors['n'][0], 72)
+        self.assertEqual(errors['n'][-1], 72 - 47)
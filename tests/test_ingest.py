@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from data_loader.ingest import ingest, load_external
+from data_loader.registry import discover
+from data_loader.store import CGMStore
+
+from tests.test_loaders import AZT1D_HEADER, write_ohio_xml
+
+
+class IngestTestCase(TestCase):
+    """Multi-subject ingestion across sources."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.external = os.path.join(self.dir, 'external')
+        for subject in range(1, 4):
+            folder = os.path.join(self.external, 'azt1d', f'Subject {subject}')
+            os.makedirs(folder)
+            with open(os.path.join(folder, f'Subject {subject}.csv'), 'w') as f:
+                f.write(AZT1D_HEADER)
+                for i in range(30):
+                    f.write(f'2024-03-0{subject} 08:{i:02d}:00,0,Standard,0.8,,,{100 + i}\n')
+        os.makedirs(os.path.join(self.external, 'ohiot1dm'))
+        write_ohio_xml(os.path.join(self.external, 'ohiot1dm', '559-ws-training.xml'), days=1)
+        with open(os.path.join(self.external, 'ohiot1dm', 'broken.xml'), 'w') as f:
+            f.write('<patient><glucose_level>')
+        self.cache = os.path.join(self.dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_discover(self):
+        subjects = [t['subject'] for t in discover(self.external)]
+        self.assertEqual(subjects, ['azt1d/Subject 1/Subject 1', 'azt1d/Subject 2/Subject 2',
+                                    'azt1d/Subject 3/Subject 3', 'ohiot1dm/559-ws-training', 'ohiot1dm/broken'])
+
+    def test_pool_into_store_and_cache(self):
+        store = CGMStore(os.path.join(self.dir, 'store'))
+        results = ingest(self.external, self.cache, store, processes=2)
+        errors = {task['subject']: error for task, _, _, error in results if error}
+        self.assertEqual(list(errors), ['ohiot1dm/broken'])
+        self.assertEqual(len(store.subjects), 4)
+        self.assertEqual(len(store.read('ohiot1dm/559-ws-training')[0]), 288)
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+
+        # A second run is served by the cache and leaves the store alone
+        ingest(self.external, self.cache, store, processes=1)
+        self.assertEqual(len(store), 3 * 30 + 288)
+
+    def test_changed_subject_replaced_in_store(self):
+        store = CGMStore(os.path.join(self.dir, 'store'))
+        ingest(self.external, self.cache, store, processes=1)
+        path = os.path.join(self.external, 'azt1d', 'Subject 2', 'Subject 2.csv')
+        with open(path, 'a') as f:
+            f.write('2024-03-02 09:00:00,0,Standard,0.8,,,250\n')
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+
+        store = CGMStore(os.path.join(self.dir, 'store'))
+        ingest(self.external, self.cache, store, processes=1)
+        dates, glucose = store.read('azt1d/Subject 2/Subject 2')
+        self.assertEqual(len(dates), 31)
+        self.assertEqual(glucose[-1], 250)
+        self.assertEqual(len(store.read('azt1d/Subject 1/Subject 1')[0]), 30)
+        self.assertEqual(len(store.subjects), 4)
+
+    def test_sources_combined(self):
+        with self.assertWarns(UserWarning):
+            glucose_data, pairs, profile = load_external(self.external, processes=1)
+        self.assertEqual(len(glucose_data), 3 * 30 + 288)
+        self.assertEqual(len(pairs), len(glucose_data))
+        self.assertEqual({r['device'] for r in glucose_data}, {'azt1d', 'ohiot1dm'})
+        self.assertEqual(profile['target_bg'], 110)
+
+    def test_similar_subject_names_cached_apart(self):
+        folder = os.path.join(self.external, 'azt1d', 'Subject_1')
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'Subject 1.csv'), 'w') as f:
+            f.write(AZT1D_HEADER + '2024-03-09 08:00:00,0,Standard,0.8,,,180\n')
+        ingest(self.external, self.cache, processes=1, sources=['azt1d'])
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+        results = ingest(self.external, self.cache, processes=1, sources=['azt1d'])
+        self.assertEqual([len(series) for _, series, _, _ in results], [30, 30, 30, 1])
+        self.assertEqual(len(os.listdir(self.cache)), 4)
@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.insulin import bilinear
+from simulator.iob import iob_from_pumphistory, temp_basal_delivery
+
+
+class IobSeriesTestCase(TestCase):
+    """Convolution against the per-event bilinear curve."""
+
+    PROFILE = {'dia': 4, 'current_basal': 1.0}
+
+    def test_boluses_match_per_event_curve(self):
+        history = [
+            {'_type': 'Bolus', 'amount': 2.0, 'timestamp': '2025-08-24T10:00:00Z'},
+            {'_type': 'Bolus', 'amount': 1.5, 'timestamp': '2025-08-24T11:10:00Z'},
+        ]
+        series = iob_from_pumphistory(history, self.PROFILE)
+        minutes = np.arange(len(series['iob']))
+        expected = 2.0 * bilinear(minutes, 4)[0] + 1.5 * bilinear(minutes - 70, 4)[0]
+        np.testing.assert_allclose(series['iob'], expected)
+        np.testing.assert_allclose(series['bolusiob'], series['iob'])
+
+    def test_temp_basal_is_net_of_scheduled_basal_and_cut_by_next_temp(self):
+        start = 0
+        net = temp_basal_delivery([0, 20 * 60000], [3.0, 0.0], [30, 30], start, 60, 1.0)
+        np.testing.assert_allclose(net[:20], 2.0 / 60)
+        np.testing.assert_allclose(net[20:50], -1.0 / 60)
+        np.testing.assert_allclose(net[50:], 0)
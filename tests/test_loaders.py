@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader import CGMStore, load_simdata, load_training_data
+from data_loader.load_azt1d import iter_azt1d, load_azt1d
+from data_loader.events import EventStore
+from data_loader.load_ohiot1dm import align_boluses, load_ohiot1dm
+
+AZT1D_HEADER = 'EventDateTime,DeviceMode,BolusType,Basal,TotalBolusInsulinDelivered,CarbSize,CGM\n'
+
+
+class Azt1dTestCase(TestCase):
+    """Streaming AZT1D CSV loader."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for subject in range(1, 5):
+            folder = os.path.join(self.dir, f'Subject {subject}')
+            os.makedirs(folder)
+            with open(os.path.join(folder, f'Subject {subject}.csv'), 'w') as f:
+                f.write(AZT1D_HEADER)
+                for i in range(30):
+                    bolus = '2.5' if i == 10 else ''
+                    f.write(f'2024-03-0{subject} 08:{i:02d}:00,0,Standard,0.8,{bolus},,{100 + i}\n')
+                f.write('not a time,0,,0.8,,,120\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_every_file_with_real_timestamps(self):
+        glucose, pairs, _ = load_azt1d(self.dir)
+        self.assertEqual(len(glucose), 4 * 30)
+        self.assertEqual(glucose[0]['date'], 1709280000000)  # 2024-03-01T08:00:00Z
+        self.assertEqual(glucose[1]['date'] - glucose[0]['date'], 60 * 1000)
+        self.assertEqual(pairs[10], (110.0, 2.5))
+
+    def test_fixed_size_chunks(self):
+        sizes = [len(chunk) for chunk, _ in iter_azt1d(self.dir, chunk_size=50)]
+        self.assertEqual(sizes, [50, 50, 20])
+
+
+def write_ohio_xml(path, days=2):
+    """A small OhioT1DM-format file: 5-minute glucose and a bolus every 6 hours."""
+    start = datetime(2022, 1, 7, tzinfo=timezone.utc)
+    with open(path, 'w') as f:
+        f.write('<patient id="559" weight="99" insulin_type="Novalog">\n<glucose_level>\n')
+        for i in range(days * 288):
+            ts = (start + timedelta(minutes=5 * i)).strftime('%d-%m-%Y %H:%M:%S')
+            f.write(f'<event ts="{ts}" value="{100 + i % 50}"/>\n')
+        f.write('</glucose_level>\n<finger_stick>\n<event ts="07-01-2022 07:00:00" value="130"/>\n</finger_stick>\n')
+        f.write('<bolus>\n')
+        for i in range(days * 4):
+            ts = (start + timedelta(hours=6 * i, minutes=2)).strftime('%d-%m-%Y %H:%M:%S')
+            f.write(f'<event ts_begin="{ts}" ts_end="{ts}" type="normal" dose="{1 + i % 3}" bwz_carb_input="30"/>\n')
+        f.write('</bolus>\n<meal>\n<event ts="07-01-2022 06:02:00" type="Breakfast" carbs="30"/>\n</meal>\n</patient>\n')
+
+
+class OhioTestCase(TestCase):
+    """Streaming OhioT1DM XML loader."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        write_ohio_xml(os.path.join(self.dir, '559-ws-training.xml'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_glucose_and_boluses(self):
+        glucose, pairs, _ = load_ohiot1dm(self.dir)
+        self.assertEqual(len(glucose), 2 * 288)
+        self.assertEqual(glucose[0]['date'], 1641513600000)  # 2022-01-07T00:00:00Z
+        self.assertEqual(glucose[0]['device'], 'ohiot1dm')
+        # A bolus goes to the first reading within 15 minutes of it
+        self.assertEqual(pairs[0], (100.0, 1.0))
+        self.assertEqual(pairs[70], (120.0, 2.0))  # 06:02 bolus, 05:50 reading
+        self.assertEqual(pairs[72][1], (122 - 110) / 50)
+
+    def test_align_boluses(self):
+        dates = [0, 300000, 600000]
+        np.testing.assert_array_equal(align_boluses(dates, [120000, 1400000, 2000000]), [0, 2, -1])
+
+
+class EventStoreTestCase(TestCase):
+    """Columnar OhioT1DM channels."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, '559-ws-training.xml')
+        write_ohio_xml(self.path)
+        self.store = EventStore.from_xml(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_channels(self):
+        self.assertEqual(self.store.patient['id'], '559')
+        self.assertEqual(set(self.store.channels), {'glucose_level', 'finger_stick', 'bolus', 'meal'})
+        glucose = self.store['glucose_level']
+        self.assertEqual(glucose.time.dtype, np.int64)
+        self.assertEqual(glucose['value'].dtype, np.float64)
+        self.assertEqual(len(glucose), 2 * 288)
+        bolus = self.store['bolus']
+        self.assertEqual(bolus['ts_end'].dtype, np.int64)
+        self.assertEqual(bolus.text('type'), ['normal'] * 8)
+        self.assertEqual(len(self.store['exercise']), 0)
+
+    def test_between(self):
+        start = 1641513600000 + 3600000
+        window = self.store.between(start, start + 3600000)
+        self.assertEqual(len(window['glucose_level']), 12)
+        self.assertEqual(window['glucose_level']['value'][0], 112)
+        self.assertEqual(len(window['bolus']), 0)
+
+    def test_simulator_records(self):
+        history = self.store.pumphistory()
+        self.assertEqual(len(history), 8)
+        self.assertEqual(history[0], {'_type': 'Bolus', 'amount': 1.0, 'timestamp': '2022-01-07T00:02:00Z'})
+        self.assertEqual(self.store.treatments(), [{'date': 1641535320000, 'carbs': 30.0}])
+
+
+class TrainingDataTestCase(TestCase):
+    """Training arrays straight from the glucose columns."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'simdata'))
+        with open(os.path.join(self.root, 'simdata', 'glucose.json'), 'w') as f:
+            json.dump([{'date': i * 300000, 'glucose': 80 + i, 'sgv': 80 + i} for i in range(100)], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_float32_arrays(self):
+        X, y, profile = load_training_data(self.root, use_cache=False)
+        self.assertEqual((X.shape, X.dtype, y.shape, y.dtype), ((100, 1), np.float32, (100,), np.float32))
+        self.assertTrue(X.flags['C_CONTIGUOUS'] and y.flags['C_CONTIGUOUS'])
+        self.assertEqual(y[0], np.float32(0.05))
+        self.assertEqual(y[-1], np.float32((179 - 110) / 50))
+        _, _, pairs = load_simdata(self.root, use_cache=False)
+        self.assertEqual(pairs[-1], (179.0, (179 - 110) / 50))
+
+    def test_from_store(self):
+        store = CGMStore(os.path.join(self.root, 'store'))
+        store.append('559', np.arange(10) * 300000, 100 + 10 * np.arange(10))
+        store.append('563', np.arange(10) * 300000, np.full(10, 210))
+        X, y, profile = load_training_data(self.root, store=store.path, profile={'target_bg': 100, 'sens': 40},
+                                           subjects=['559'], start_ms=300000, end_ms=3 * 300000)
+        self.assertEqual(X[:, 0].tolist(), [110, 120])
+        self.assertEqual(y.tolist(), [np.float32(0.25), np.float32(0.5)])
+        X, _, profile = load_training_data(self.root, store=store)
+        self.assertEqual((len(X), profile), (20, {}))
@@ -0,0 +1,47 @@
+import os
+from unittest import TestCase
+
+import numpy as np
+
+from simulator import LockstepSimulator, load_inputs
+from simulator.determine_basal import HIGH_NO_TEMP, IN_RANGE, LOW_SUSPEND
+from simulator.physiology import PatientModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_MS = 1756029600000
+
+
+class LockstepSimulatorTestCase(TestCase):
+    """Every patient gets its own decision from one batched call per tick."""
+
+    def setUp(self):
+        self.profile = load_inputs(os.path.join(ROOT, 'simdata'))['profile']
+
+    def model(self, initial_glucose):
+        n = len(initial_glucose)
+        return PatientModel(isf=np.full(n, 50.0), carb_ratio=10, basal=1.0, target=110,
+                            initial_glucose=initial_glucose)
+
+    def test_decisions_per_patient(self):
+        out = LockstepSimulator(self.model([65.0, 110.0, 250.0]), self.profile).run(36, START_MS)
+        self.assertEqual(out['glucose'].shape, (36, 3))
+        np.testing.assert_array_equal(out['dates'], START_MS + np.arange(36) * 300000)
+        np.testing.assert_array_equal(out['code'][0], [LOW_SUSPEND, IN_RANGE, HIGH_NO_TEMP])
+        self.assertEqual(out['rate'][0, 0], 0)
+        self.assertEqual(out['rate'][0, 1], 1.0)
+        self.assertGreater(out['rate'][0, 2], 1.0)
+        # Suspending raises the low patient, high temps bring the high one down
+        self.assertGreater(out['glucose'][-1, 0], 65)
+        self.assertLess(out['glucose'][-1, 2], 250)
+        np.testing.assert_allclose(out['glucose'][:, 1], 110, atol=1)
+
+    def test_same_as_separate_runs(self):
+        together = LockstepSimulator(self.model([80.0, 200.0]), self.profile).run(24, START_MS)
+        for i, glucose in enumerate([80.0, 200.0]):
+            alone = LockstepSimulator(self.model([glucose]), self.profile).run(24, START_MS)
+            np.testing.assert_array_equal(together['code'][:, i], alone['code'][:, 0])
+            np.testing.assert_allclose(together['glucose'][:, i], alone['glucose'][:, 0])
+
+    def test_delivery_follows_rate(self):
+        out = LockstepSimulator(self.model([250.0]), self.profile).run(12, START_MS)
+        np.testing.assert_allclose(out['delivered'], out['rate'] * 5 / 60, rtol=1e-6)
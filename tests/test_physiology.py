@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+import numpy as np
+
+from simulator.physiology import PatientModel
+
+
+class PatientModelTestCase(TestCase):
+    """Mass balance of the lockstep compartmental model."""
+
+    def setUp(self):
+        self.model = PatientModel(isf=[40, 50, 60], carb_ratio=[8, 10, 12], basal=[0.8, 1.0, 1.2],
+                                  glucose_effectiveness=0.0)
+        self.basal_units = self.model.basal * 5 / 60
+
+    def run_ticks(self, n):
+        for _ in range(n):
+            self.model.step(self.basal_units)
+
+    def test_basal_is_steady_state(self):
+        self.run_ticks(288)
+        np.testing.assert_allclose(self.model.glucose, 110)
+
+    def test_bolus_lowers_glucose_by_isf(self):
+        self.model.x[:, -1] = 250
+        self.model.step(self.basal_units + 1)
+        self.run_ticks(200)
+        np.testing.assert_allclose(self.model.glucose, 250 - self.model.isf, atol=0.5)
+
+    def test_carbs_raise_glucose_by_isf_over_cr(self):
+        self.model.step(self.basal_units, carbs=30)
+        self.run_ticks(200)
+        np.testing.assert_allclose(self.model.glucose, 110 + 30 * self.model.isf / self.model.carb_ratio, atol=0.5)
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.profile import Profile
+
+
+class ProfileTestCase(TestCase):
+    """Compiled time-of-day schedules."""
+
+    def setUp(self):
+        self.profile = Profile({
+            'sens': 50,
+            'current_basal': 0.9,
+            'basalprofile': [
+                {'start': '00:00:00', 'minutes': 0, 'rate': 0.8},
+                {'start': '06:30:00', 'minutes': 390, 'rate': 1.2},
+            ],
+            'isfProfile': {'sens': [
+                {'i': 0, 'start': '00:00:00', 'sensitivity': 60},
+                {'i': 1, 'start': '12:00:00', 'sensitivity': 40},
+            ]},
+            'carb_ratios': {'schedule': [
+                {'start': '04:00:00', 'offset': 240, 'ratio': 8},
+                {'start': '20:00:00', 'offset': 1200, 'ratio': 12},
+            ]},
+        }, utc_offset_minutes=0)
+
+    def test_tables_cover_the_day(self):
+        self.assertEqual(self.profile.basal.shape, (1440,))
+        self.assertEqual(self.profile.basal[389], 0.8)
+        self.assertEqual(self.profile.basal[390], 1.2)
+        self.assertEqual(self.profile.sens[719], 60)
+        self.assertEqual(self.profile.sens[720], 40)
+        # Before the first entry the previous day's last one still applies
+        self.assertEqual(self.profile.carb_ratio[0], 12)
+        self.assertEqual(self.profile.carb_ratio[240], 8)
+
+    def test_lookup_by_timestamp(self):
+        day = 24 * 3600 * 1000
+        times = np.array([0, 7 * 3600 * 1000, day + 13 * 3600 * 1000])
+        np.testing.assert_array_equal(self.profile.basal_at(times), [0.8, 1.2, 1.2])
+        np.testing.assert_array_equal(self.profile.sens_at(times), [60, 60, 40])
+        self.assertEqual(self.profile.at(times[1])['current_basal'], 1.2)
+
+    def test_utc_offset_shifts_schedule(self):
+        shifted = Profile(self.profile.data, utc_offset_minutes=-60)
+        self.assertEqual(float(shifted.basal_at(7 * 3600 * 1000)), 0.8)
+
+    def test_utc_offset_defaults_to_profile(self):
+        self.assertEqual(Profile({}).utc_offset_minutes, 0)
+        stored = Profile(dict(self.profile.data, utc_offset_minutes=-60))
+        self.assertEqual(float(stored.basal_at(7 * 3600 * 1000)), 0.8)
+
+    def test_flat_profile_params(self):
+        params = Profile({'min_bg': 100, 'sens': 45, 'carb_ratio': [{'start': '00:00:00', 'ratio': 9}]}).params()
+        self.assertEqual(params, {'target_bg': 100, 'sens': 45, 'carb_ratio': 9.0})
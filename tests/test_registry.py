@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from data_loader import registry
+from data_loader.ingest import load_external
+from data_loader.series import GlucoseSeries
+
+from tests.test_loaders import AZT1D_HEADER
+
+# This module doubles as the loader plugin registered below
+LOADER_VERSION = 1
+DEFAULT_PROFILE = {'target_bg': 100, 'sens': 40, 'carb_ratio': 12}
+
+
+def read_subject(path, profile):
+    with open(path) as f:
+        values = [float(line) for line in f if line.strip()]
+    dates = [i * 300000 for i in range(len(values))]
+    return GlucoseSeries(dates, values, device='plain'), [(v, 0.05) for v in values]
+
+
+class RegistryTestCase(TestCase):
+    """Dataset registry, lazy loader imports and the manifest."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.external = os.path.join(self.dir, 'external')
+        os.makedirs(os.path.join(self.external, 'plain'))
+        for subject in ('a', 'b'):
+            with open(os.path.join(self.external, 'plain', f'{subject}.txt'), 'w') as f:
+                f.write('100\n110\n120\n')
+        self.dataset = registry.register('plain', ['*.txt'], 'tests.test_registry')
+        self.cache = os.path.join(self.dir, 'cache')
+
+    def tearDown(self):
+        registry.unregister('plain')
+        shutil.rmtree(self.dir)
+
+    def test_discovery_does_not_import(self):
+        self.assertIn('plain', registry.datasets())
+        tasks = registry.discover(self.external)
+        self.assertEqual([t['subject'] for t in tasks], ['plain/a', 'plain/b'])
+        registry.scan(self.external)
+        self.assertFalse(self.dataset.loaded)
+
+    def test_plugin_and_manifest(self):
+        glucose_data, pairs, profile = load_external(self.external, self.cache, processes=1)
+        self.assertTrue(self.dataset.loaded)
+        self.assertEqual(len(glucose_data), 6)
+        self.assertEqual(profile, DEFAULT_PROFILE)
+
+        path = os.path.join(self.cache, registry.MANIFEST_FILE)
+        with open(path) as f:
+            manifest = json.load(f)
+        self.assertEqual(list(manifest['datasets']), ['plain'])
+        self.assertEqual(manifest['datasets']['plain']['files']['plain/a']['size'], 12)
+        self.assertEqual(registry.changed(registry.scan(self.external), manifest), [])
+
+        with open(os.path.join(self.external, 'plain', 'c.txt'), 'w') as f:
+            f.write('90\n')
+        self.assertEqual(registry.changed(registry.scan(self.external), manifest), ['plain'])
+
+    def test_differing_profiles_warn(self):
+        folder = os.path.join(self.external, 'azt1d', 'Subject 1')
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'Subject 1.csv'), 'w') as f:
+            f.write(AZT1D_HEADER + '2024-03-01 08:00:00,0,Standard,0.8,,,100\n')
+        with self.assertWarnsRegex(UserWarning, 'different profiles'):
+            _, _, profile = load_external(self.external, processes=1)
+        self.assertEqual(profile['sens'], 50)
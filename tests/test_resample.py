@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.resample import GRID_MS, resample, resample_series
+from data_loader.series import GlucoseSeries
+
+START = 1700000000000 - 1700000000000 % GRID_MS
+
+
+class ResampleTestCase(TestCase):
+    """Snapping irregular readings to the 5-minute grid."""
+
+    def test_jitter_duplicates_and_gaps(self):
+        minutes = np.array([0, 5.5, 5.5, 8.8, 10.9, 15, 30, 95, 100])
+        dates = START + (minutes * 60000).astype(np.int64)
+        glucose = [100, 110, 999, 118, 121, 130, 160, 200, 210]
+        order = [8, 7, 6, 5, 4, 3, 1, 2, 0]  # unsorted; the first 5.5 reading comes first
+        r = resample(dates[order], np.array(glucose)[order])
+        self.assertEqual(r['date'][0], START)
+        self.assertEqual(len(r['date']), 21)
+        np.testing.assert_array_equal(np.diff(r['date']), GRID_MS)
+        # 5.5 kept over its duplicate; 10.9 beats 8.8 for the 10-minute slot
+        np.testing.assert_array_equal(r['glucose'][:4], [100, 110, 121, 130])
+        # 15 -> 30 is short enough to interpolate, 30 -> 95 is not
+        np.testing.assert_array_equal(r['interpolated'][4:6], [True, True])
+        np.testing.assert_array_equal(r['glucose'][4:6], [140, 150])
+        self.assertTrue(r['gap'][7:19].all())
+        self.assertTrue(np.isnan(r['glucose'][7:19]).all())
+        self.assertEqual(r['observed'].sum(), 7)
+        self.assertFalse((r['observed'] & r['interpolated']).any())
+
+    def test_series(self):
+        series = GlucoseSeries(START + np.array([0, 600000, 4 * 3600000]), [100, 120, 140],
+                               direction=['Flat', 'SingleUp', 'Flat'], device='ohiot1dm')
+        resampled, result = resample_series(series)
+        self.assertEqual(len(resampled), 4)
+        self.assertEqual(resampled[1]['glucose'], 110)
+        self.assertEqual(resampled[1]['direction'], 'Flat')
+        self.assertEqual(resampled[2]['direction'], 'SingleUp')
+        self.assertEqual(resampled[-1]['date'], START + 4 * 3600000)
+        self.assertEqual(result['gap'].sum(), 4 * 12 + 1 - 4)
+        self.assertEqual(len(resample_series(series, keep_gaps=True)[0]), 49)
+
+    def test_empty(self):
+        self.assertEqual(len(resample([], [])['date']), 0)
@@ -0,0 +1,63 @@
+import json
+import sys
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.series import GlucoseSeries, as_series
+
+
+def records(n, start=1700000000000):
+    return [{
+        'date': start + i * 300000,
+        'glucose': 100 + i % 40,
+        'sgv': 100 + i % 40,
+        'direction': ['Flat', 'SingleUp'][i % 2],
+        'noise': 1 + i % 2,
+        'filtered': 100 + i % 40,
+        'unfiltered': 100 + i % 40,
+        'rssi': 100,
+        'device': 'synthetic',
+    } for i in range(n)]
+
+
+def _size(obj):
+    return sys.getsizeof(obj) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+
+
+class GlucoseSeriesTestCase(TestCase):
+    """Array-backed glucose readings."""
+
+    def test_records_round_trip(self):
+        original = records(100)
+        series = GlucoseSeries.from_records(original)
+        self.assertEqual(series.date.dtype, np.int64)
+        self.assertEqual(series.glucose.dtype, np.float32)
+        self.assertEqual(series.directions, ['Flat', 'SingleUp'])
+        self.assertIsNone(series.filtered)
+        self.assertEqual(series.to_records(), original)
+        self.assertEqual(series[-1], original[-1])
+        self.assertEqual(json.loads(json.dumps(series.to_records())), original)
+
+    def test_memory(self):
+        original = records(10000)
+        series = GlucoseSeries.from_records(original)
+        as_dicts = sys.getsizeof(original) + sum(_size(r) for r in original)
+        self.assertGreater(as_dicts / series.nbytes, 10)
+
+    def test_concat_sorted_and_slices(self):
+        first = GlucoseSeries([600000, 0], [120, 100], direction=['Flat', 'SingleUp'], device='azt1d')
+        second = GlucoseSeries([300000], [110.5], direction='FortyFiveDown', device='ohiot1dm')
+        series = as_series(GlucoseSeries.concat([first, second]))
+        self.assertEqual(series.date.tolist(), [0, 300000, 600000])
+        self.assertEqual([r['direction'] for r in series], ['SingleUp', 'FortyFiveDown', 'Flat'])
+        self.assertEqual([r['device'] for r in series], ['azt1d', 'ohiot1dm', 'azt1d'])
+        self.assertEqual(series[1]['glucose'], 110.5)
+        self.assertEqual(len(series[1:]), 2)
+        self.assertIs(as_series(series), series)
+
+    def test_column_length_checked(self):
+        with self.assertRaises(ValueError):
+            GlucoseSeries([0, 300000], [100, 110], noise=[1, 1, 1])
+        with self.assertRaises(ValueError):
+            GlucoseSeries([0, 300000], [100, 110], rssi=[100])
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.store import CGMStore
+
+DAY_MS = 24 * 3600 * 1000
+
+
+class CGMStoreTestCase(TestCase):
+    """Memory-mapped per-subject CGM columns."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = CGMStore(os.path.join(self.dir, 'store'))
+        self.dates = np.arange(0, 2 * DAY_MS, 300000, dtype=np.int64)
+        self.store.append('559', self.dates, 100 + np.arange(len(self.dates)) % 50)
+        self.store.append('563', self.dates[::-1], np.full(len(self.dates), 150))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_index_and_reopen(self):
+        store = CGMStore(self.store.path)
+        self.assertEqual(store.subjects, ['559', '563'])
+        self.assertEqual(len(store), 2 * len(self.dates))
+        dates, glucose = store.read('563')
+        np.testing.assert_array_equal(dates, self.dates)
+        self.assertEqual(glucose.dtype, np.float32)
+        self.assertEqual(os.path.getsize(os.path.join(store.path, 'date.i64')), 8 * len(store))
+
+    def test_time_range_is_a_view(self):
+        dates, glucose = self.store.read('559', DAY_MS, DAY_MS + 3600000)
+        self.assertIsInstance(dates, np.memmap)
+        self.assertEqual(len(dates), 12)
+        self.assertEqual(dates[0], DAY_MS)
+        self.assertEqual(glucose[0], 100 + 288 % 50)
+
+    def test_append_adds_segments(self):
+        self.store.append('559', [2 * DAY_MS], [120])
+        dates, glucose = self.store.read('559', 2 * DAY_MS - 300000)
+        self.assertEqual(dates.tolist(), [2 * DAY_MS - 300000, 2 * DAY_MS])
+        self.assertEqual(glucose.tolist(), [100 + 575 % 50, 120])
+        self.assertEqual(len(self.store.read('unknown')[0]), 0)
+        self.assertEqual(self.store.series('563', 0, 600000)[1]['device'], '563')
+
+    def test_compact_drops_unreferenced_rows(self):
+        self.store.append('559', [2 * DAY_MS], [120])
+        self.store.remove('563')
+        self.assertEqual(self.store.compact(), len(self.dates))
+        store = CGMStore(self.store.path)
+        self.assertEqual((store.subjects, len(store)), (['559'], len(self.dates) + 1))
+        self.assertEqual(len(store.index['subjects']['559']), 1)
+        self.assertEqual(os.path.getsize(os.path.join(store.path, 'glucose.f32')), 4 * len(store))
+        dates, glucose = store.read('559')
+        self.assertIsInstance(dates, np.memmap)
+        np.testing.assert_array_equal(dates[:-1], self.dates)
+        self.assertEqual(glucose[-1], 120)
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.synthetic_cohort import generate_cohort, iter_cohort
+from data_loader.synthetic_data import DIRECTIONS, ar1, generate_synthetic_t1d_data
+
+
+class SyntheticDataTestCase(TestCase):
+    """Vectorized synthetic T1D generator."""
+
+    def setUp(self):
+        self.simdata = tempfile.mkdtemp()  # no profile.json: defaults
+
+    def tearDown(self):
+        shutil.rmtree(self.simdata)
+
+    def generate(self, n, pairs=200, seed=7):
+        return generate_synthetic_t1d_data(self.simdata, n, pairs, seed=seed, start_ms=1700000000000)
+
+    def test_reproducible(self):
+        first, pairs, _ = self.generate(2000)
+        second, same_pairs, _ = self.generate(2000)
+        other, _, _ = self.generate(2000, seed=8)
+        self.assertEqual(first.to_records(), second.to_records())
+        self.assertEqual(pairs, same_pairs)
+        self.assertFalse(np.array_equal(first.glucose, other.glucose))
+
+    def test_autocorrelated_with_matching_trends(self):
+        series, _, _ = self.generate(20000)
+        g = series.glucose.astype(np.float64)
+        self.assertGreater(np.corrcoef(g[1:], g[:-1])[0, 1], 0.9)
+        self.assertTrue(((g >= 40) & (g <= 400)).all())
+        records = series.to_records()
+        for prev, rec in zip(records[:-1], records[1:]):
+            rate = (rec['glucose'] - prev['glucose']) / 5
+            if rate >= 3:
+                self.assertEqual(rec['direction'], 'DoubleUp')
+            elif -1 < rate < 1:
+                self.assertEqual(rec['direction'], 'Flat')
+            elif rate <= -3:
+                self.assertEqual(rec['direction'], 'DoubleDown')
+        self.assertEqual(set(series.directions), set(DIRECTIONS))
+
+    def test_training_pairs(self):
+        series, pairs, profile = self.generate(500, pairs=400)
+        self.assertEqual(len(pairs), 400)
+        glucose, insulin = np.array(pairs).T
+        np.testing.assert_array_equal(glucose, series.glucose[:400])
+        self.assertTrue((insulin >= 0).all())
+        high = glucose > profile['target_bg'] + 50
+        self.assertGreater(insulin[high].mean(), insulin[~high].mean())
+
+    def test_ar1_stationary(self):
+        x = ar1(np.random.default_rng(0), 200000, phi=0.9, sd=10)
+        self.assertAlmostEqual(x.std(), 10, delta=0.5)
+        self.assertAlmostEqual(np.corrcoef(x[1:], x[:-1])[0, 1], 0.9, delta=0.01)
+
+    def test_ar1_small_phi_and_first_value(self):
+        x = ar1(np.random.default_rng(0), 200000, phi=0.2, sd=10)
+        self.assertTrue(np.isfinite(x).all())
+        self.assertAlmostEqual(x.std(), 10, delta=0.5)
+        self.assertAlmostEqual(np.corrcoef(x[1:], x[:-1])[0, 1], 0.2, delta=0.01)
+        first = [ar1(np.random.default_rng(seed), 2, phi=0.9, sd=10)[0] for seed in range(4000)]
+        self.assertAlmostEqual(np.std(first), 10, delta=0.5)
+
+    def test_seeded_meals_follow_utc(self):
+        seeded, _, _ = self.generate(2000)
+        utc = generate_synthetic_t1d_data(self.simdata, 2000, 200, seed=7, start_ms=1700000000000,
+                                          utc_offset_minutes=0)[0]
+        eastern = generate_synthetic_t1d_data(self.simdata, 2000, 200, seed=7, start_ms=1700000000000,
+                                              utc_offset_minutes=-300)[0]
+        np.testing.assert_array_equal(seeded.glucose, utc.glucose)
+        self.assertFalse(np.array_equal(seeded.glucose, eastern.glucose))
+
+    def test_sharded_cohort(self):
+        out = os.path.join(self.simdata, 'cohort')
+        manifest = generate_cohort(out, self.simdata, 5, 1, patients_per_shard=2, processes=2, seed=3,
+                                   start_ms=1700006400000)
+        self.assertEqual([s['patients'] for s in manifest['shards']], [2, 2, 1])
+        self.assertEqual(manifest['readings'], 5 * 288)
+        with open(os.path.join(out, 'manifest.json')) as f:
+            self.assertEqual(json.load(f)['shards'], manifest['shards'])
+
+        patients = list(iter_cohort(out))
+        self.assertEqual([p for p, _, _ in patients], [0, 1, 2, 3, 4])
+        series, insulin = patients[3][1], patients[3][2]
+        self.assertEqual(len(series), 288)
+        self.assertEqual(len(insulin), 288)
+        self.assertEqual(series[0]['date'], 1700006400000)
+
+        # A patient's data depends on the seed and its index, not the sharding
+        other = os.path.join(self.simdata, 'other')
+        generate_cohort(other, self.simdata, 5, 1, patients_per_shard=5, processes=1, seed=3, start_ms=1700006400000)
+        np.testing.assert_array_equal(list(iter_cohort(other))[3][1].glucose, series.glucose)
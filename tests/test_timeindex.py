@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+import numpy as np
+
+from data_loader.series import GlucoseSeries
+from data_loader.timeindex import HOUR_MS, TimeIndex
+from tests.test_series import records
+
+
+class TimeIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.records = records(48)
+        self.dates = np.array([r['date'] for r in self.records])
+
+    def test_sorts_records_and_slices_are_views(self):
+        index = TimeIndex(self.records[::-1])
+        self.assertEqual(list(index.dates), sorted(self.dates))
+        window = index.range(self.dates[10], self.dates[20])
+        self.assertEqual(len(window), 10)
+        self.assertEqual(window[0]['date'], self.dates[10])
+        self.assertTrue(np.shares_memory(window.glucose, index.series.glucose))
+        self.assertTrue(np.shares_memory(window.noise, index.series.noise))
+
+    def test_last(self):
+        index = TimeIndex(GlucoseSeries.from_records(self.records))
+        window = index.last(hours=1)
+        self.assertEqual(window[-1]['date'], self.dates[-1])
+        self.assertTrue((window.date > self.dates[-1] - HOUR_MS).all())
+        self.assertEqual(len(window), np.sum(self.dates > self.dates[-1] - HOUR_MS))
+        self.assertEqual(list(index.last(hours=0.5, at_ms=self.dates[5]).date),
+                         list(self.dates[(self.dates <= self.dates[5]) & (self.dates > self.dates[5] - HOUR_MS // 2)]))
+        self.assertEqual(len(TimeIndex([]).last(hours=1)), 0)
+
+    def test_nearest(self):
+        index = TimeIndex(self.dates)
+        self.assertEqual(index.nearest(self.dates[3] + 1000), 3)
+        self.assertEqual(index.nearest(self.dates[0] - HOUR_MS), 0)
+        self.assertEqual(index.nearest(self.dates[-1] + HOUR_MS, tolerance_ms=60000), -1)
+        at = self.dates[[1, 7]] - 1000
+        np.testing.assert_array_equal(index.nearest(at), [1, 7])
+        self.assertEqual(TimeIndex([]).nearest(0), -1)
+
+    def test_bounds_take_arrays(self):
+        index = TimeIndex(self.dates)
+        lo, hi = index.bounds(self.dates[[0, 10]], self.dates[[5, 12]])
+        np.testing.assert_array_equal(lo, [0, 10])
+        np.testing.assert_array_equal(hi, [5, 12])
+
+    def test_unsorted_times_rejected(self):
+        with self.assertRaises(ValueError):
+            TimeIndex(self.dates[::-1])
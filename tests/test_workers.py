@@ -0,0 +1,46 @@
+import os
+from datetime import datetime
+from unittest import TestCase
+
+from simulator import ClosedLoopSimulator, ReplaySource, StubWorker, VirtualClock, WorkerPool, load_inputs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubWorkerPoolTestCase(TestCase):
+    """Worker pool behaviour, using the pure-Python stand-in worker."""
+
+    def setUp(self):
+        self.inputs = load_inputs(os.path.join(ROOT, 'simdata'))
+        glucose = sorted(self.inputs['glucose'], key=lambda g: g['date'], reverse=True)
+        self.request = {
+            'glucose': glucose[:36],
+            'iob': [{'iob': 0.5, 'activity': 0.01}],
+            'currenttemp': {'duration': 0, 'temp': 'absolute', 'rate': 0},
+            'profile': self.inputs['profile'],
+        }
+
+    def test_map_keeps_request_order(self):
+        low = dict(self.request, glucose=[dict(g, glucose=50) for g in self.request['glucose']])
+        with WorkerPool(StubWorker, size=2) as pool:
+            results = pool.map([self.request, low, self.request, low])
+        self.assertEqual([r['bg'] for r in results[1::2]], [50, 50])
+        self.assertEqual([r['rate'] for r in results[1::2]], [0, 0])
+        self.assertEqual(results[0], dict(results[2], deliverAt=results[0]['deliverAt']))
+
+    def test_pool_drives_closed_loop(self):
+        source = ReplaySource(self.inputs['glucose'][:60])
+        with WorkerPool(StubWorker, size=1) as pool:
+            ticks = ClosedLoopSimulator(pool, self.inputs['profile']).run(source)
+        self.assertEqual(len(ticks), 60)
+        for tick in ticks:
+            self.assertIn('reason', tick['suggested'])
+            self.assertGreaterEqual(tick['rate'], 0)
+
+    def test_virtual_clock_pins_worker_time(self):
+        source = ReplaySource(self.inputs['glucose'][:3])
+        with StubWorker() as worker:
+            ticks = ClosedLoopSimulator(worker, self.inputs['profile'], clock=VirtualClock()).run(source)
+        for tick in ticks:
+            deliver_at = datetime.fromisoformat(tick['suggested']['deliverAt'].replace('Z', '+00:00'))
+            self.assertEqual(int(deliver_at.timestamp() * 1000), tick['date'])